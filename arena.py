@@ -0,0 +1,466 @@
+"""Headless tournaments between blackjack bots, thousands of tables at a time.
+
+Every table seats several bots, each with its own bankroll, and plays the
+rounds of game.py: the same deal order, insurance, splits and doubles,
+dealer play and settlement, through the engine's own functions. Tables deal
+from their own compact ``Shoe`` and hands are ``SeatHand`` objects whose
+totals update card by card, so no hand is ever re-evaluated. The tables of a
+worker are played round-robin, one round each in turn, so they all progress
+together.
+
+A bot is a ``Strategy`` object. The arena makes one for every seat, so a bot
+may keep state between rounds, and asks it how much to bet, whether to take
+insurance and how to play each hand. Anything that subclasses ``Strategy``
+can enter as ``module:Class``.
+
+Balances are sampled into a preallocated (tables, seats, points) array, and
+per-seat results are summed into preallocated arrays. Each table's shuffles
+come from its own stream derived from ``--seed``, so results do not depend on
+the number of workers.
+
+    python arena.py --tables 2000 --rounds 500 --strategy basic hi-lo martingale dealer never-bust
+"""
+import argparse
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from blackjack_logic import (CUT_CARD_PENETRATION, MAX_SEATS, can_double_down, can_insure, can_split, create_player,
+                             dealer_play, determine_winners, double_hand, draw, insure_hand, split_current_hand,
+                             strategy_for)
+from cards import Hand, SeatHand
+from count_eval import DEFAULT_RAMPS
+from counting import SYSTEM_NAMES, CountTracker
+from game import DECKS, RULES
+from history import DEALER_SEAT
+from rng import create_rng
+from rules import parse_payout, rules_to_dict
+from shoe import Shoe
+from sweep import Z_95
+
+DEFAULT_CONFIG = {
+    'decks': DECKS,
+    'penetration': CUT_CARD_PENETRATION,
+    'bankroll': 1000,
+    'unit': 10,
+    # Shuffle backend; the secure one cannot be seeded
+    'rng': 'random',
+}
+
+# Balance samples per seat, spread evenly over the rounds
+DEFAULT_POINTS = 100
+
+# Hi-Lo true count at which the counting bot insures
+INSURANCE_COUNT = 3
+
+# Basic-strategy actions by (rules, total, soft, upcard, decks, can double, pair card)
+_basic_actions = {}
+
+
+def basic_action(table, hand, can_double, can_split):
+    """The basic-strategy action for a hand, looked up once per situation."""
+    rules = table['rules']
+    key = (rules, hand.total, hand.is_soft, table['dealerHand'][0], table['shoe'].decks, can_double,
+           hand[0] if can_split else None)
+    action = _basic_actions.get(key)
+    if action is None:
+        action = _basic_actions[key] = strategy_for(rules).best_action(*key[1:], rules.double_after_split)[0]
+    return action
+
+
+class Strategy:
+    """A bot at one seat: flat bets, no insurance and basic strategy for the table's rules.
+
+    ``table`` is the table's game state and ``player`` the seat's player
+    dict, as the engine keeps them; ``player['hand']`` is the hand to play.
+    """
+
+    name = 'basic'
+
+    def __init__(self, unit=DEFAULT_CONFIG['unit']):
+        self.unit = unit
+
+    def bet(self, table, player):
+        """Chips to wager this round; 0 sits it out, and more than the balance bets the balance."""
+        return self.unit
+
+    def insure(self, table, player):
+        """True to insure the hand against a dealer Ace, for half its bet."""
+        return False
+
+    def play(self, table, player, can_double, can_split):
+        """'hit', 'stand', 'double' or 'split'; an action not allowed stands."""
+        return basic_action(table, player['hand'], can_double, can_split)
+
+    def settled(self, table, player, won):
+        """Called after each round the seat played, with the chips it won (negative when lost)."""
+
+
+class MimicDealer(Strategy):
+    """Hit below 17, never double, split or insure."""
+
+    name = 'dealer'
+
+    def play(self, table, player, can_double, can_split):
+        return 'hit' if player['hand'].total < 17 else 'stand'
+
+
+class NeverBust(Strategy):
+    """Hit only while no card can bust the hand."""
+
+    name = 'never-bust'
+
+    def play(self, table, player, can_double, can_split):
+        return 'hit' if player['hand'].hard <= 11 else 'stand'
+
+
+class Martingale(Strategy):
+    """Basic strategy, doubling the bet after every losing round and going back to one unit after a win."""
+
+    name = 'martingale'
+
+    def __init__(self, unit=DEFAULT_CONFIG['unit']):
+        super().__init__(unit)
+        self.next_bet = unit
+
+    def bet(self, table, player):
+        return self.next_bet
+
+    def settled(self, table, player, won):
+        self.next_bet = 2 * self.next_bet if won < 0 else self.unit
+
+
+class HiLoCounter(Strategy):
+    """Basic strategy with count_eval's Hi-Lo bet ramp, insuring at a true count of +3 or more."""
+
+    name = 'hi-lo'
+    ramp = DEFAULT_RAMPS['hi-lo']
+    system = SYSTEM_NAMES.index('hi-lo')
+
+    def true_count(self, table):
+        return table['count'].betting_counts()[self.system]
+
+    def bet(self, table, player):
+        count = self.true_count(table)
+        units = 1
+        for threshold, step_units in self.ramp:
+            if count >= threshold:
+                units = step_units
+        return units * self.unit
+
+    def insure(self, table, player):
+        return self.true_count(table) >= INSURANCE_COUNT
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (Strategy, MimicDealer, NeverBust, Martingale, HiLoCounter)}
+
+
+def resolve_strategy(name):
+    """A registered strategy class, or a 'module:Class' path."""
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    module, _, attr = name.partition(':')
+    return getattr(importlib.import_module(module), attr)
+
+
+def sample_rounds(rounds, points):
+    """Rounds played at each balance sample, from 0 to ``rounds`` (``points`` must not exceed it)."""
+    return [point * rounds // points for point in range(points + 1)]
+
+
+def seating(table, strategies, seats):
+    """Strategy index at each seat of a table; tables rotate the order so every bot plays every seat."""
+    return [(table + seat) % strategies for seat in range(seats)]
+
+
+def play_hand(table, player, bot):
+    """Play one of the seat's hands to the end, as the engine's hit/stand/double/split actions would."""
+    rules = table['rules']
+    seat = player['id'] - 1
+    while True:
+        hand = player['hand']
+        if hand.total >= 21:
+            return
+        can_double = can_double_down(player, rules)
+        splittable = can_split(player)
+        action = bot.play(table, player, can_double, splittable)
+        if action == 'hit':
+            hand.append(draw(table, seat))
+        elif action == 'double' and can_double:
+            double_hand(table, player)
+            return
+        elif action == 'split' and splittable:
+            if split_current_hand(table, player):
+                # Split aces get one card each and the seat's turn moves past both
+                return
+        else:
+            return
+
+
+def play_round(table, bots):
+    """Play one round at a table; returns each seat's winnings, or None for seats that sat out."""
+    players = table['players']
+    seated = []
+    for player, bot in zip(players, bots):
+        bet = min(bot.bet(table, player), player['balance']) if player['balance'] > 0 else 0
+        player['bet'] = bet
+        player['insurance'] = 0
+        player['hands'] = []
+        if bet > 0:
+            seated.append(player)
+    if not seated:
+        return [None] * len(players)
+
+    # Dealt in the order of place_bet: the dealer's two cards, then two per seat
+    shoe = table['shoe']
+    if shoe.needs_shuffle:
+        shoe.shuffle()
+    table['dealerHand'] = Hand([draw(table, DEALER_SEAT), draw(table, DEALER_SEAT, face_up=False)])
+    for player in seated:
+        seat = player['id'] - 1
+        hand = SeatHand([draw(table, seat), draw(table, seat)], player['bet'])
+        player['hands'] = [hand]
+        player['hand'] = hand
+        player['handIndex'] = 0
+        player['isFinished'] = hand.is_blackjack
+
+    for player in seated:
+        if player['isFinished']:
+            continue
+        bot = bots[player['id'] - 1]
+        if can_insure(table, player) and bot.insure(table, player):
+            insure_hand(table, player)
+        while player['handIndex'] < len(player['hands']):
+            player['hand'] = player['hands'][player['handIndex']]
+            play_hand(table, player, bot)
+            player['handIndex'] += 1
+        player['isFinished'] = True
+
+    balances = [player['balance'] for player in players]
+    dealer_play(table)
+    determine_winners(table)
+    results = []
+    for player, bot, balance in zip(players, bots, balances):
+        if player['bet']:
+            won = player['balance'] - balance
+            bot.settled(table, player, won)
+            results.append(won)
+        else:
+            results.append(None)
+    return results
+
+
+def play_tables(first_table, tables, rounds, strategy_names, seats, config, seed, points):
+    """Play tables ``first_table`` to ``first_table + tables - 1``; returns their balance samples and seat sums.
+
+    Sums are (tables, seats, 4) integers: rounds played, chips won, chips
+    won squared and chips wagered.
+    """
+    config = {**DEFAULT_CONFIG, **config}
+    classes = [resolve_strategy(name) for name in strategy_names]
+    decks = config['decks']
+    all_tables = []
+    all_bots = []
+    for index in range(first_table, first_table + tables):
+        # Only what the engine functions used here read from a table's state
+        shoe = Shoe(decks, config['penetration'], create_rng(config['rng'], seed, table=f'arena-{index}'))
+        order = seating(index, len(classes), seats)
+        all_tables.append({
+            'shoe': shoe,
+            'rules': config['rules'],
+            'count': CountTracker(decks),
+            'players': [create_player(seat + 1, strategy_names[strategy], config['bankroll'])
+                        for seat, strategy in enumerate(order)],
+            'dealerHand': Hand(),
+            'dealerTotal': 0,
+        })
+        all_bots.append([classes[strategy](config['unit']) for strategy in order])
+
+    samples = np.zeros((tables, seats, points + 1), dtype=np.int64)
+    samples[:, :, 0] = config['bankroll']
+    sample_at = {rounds_played: point for point, rounds_played in enumerate(sample_rounds(rounds, points))}
+    # [rounds, won, won squared, wagered] per seat; plain ints are far cheaper to bump than array cells
+    seat_sums = [[[0, 0, 0, 0] for _ in range(seats)] for _ in range(tables)]
+    for round_ in range(1, rounds + 1):
+        for table, bots, sums in zip(all_tables, all_bots, seat_sums):
+            for seat_sum, player, won in zip(sums, table['players'], play_round(table, bots)):
+                if won is not None:
+                    seat_sum[0] += 1
+                    seat_sum[1] += won
+                    seat_sum[2] += won * won
+                    seat_sum[3] += player['bet']
+        point = sample_at.get(round_)
+        if point:
+            samples[:, :, point] = [[player['balance'] for player in table['players']] for table in all_tables]
+    return samples, np.array(seat_sums, dtype=np.int64).reshape(tables, seats, 4)
+
+
+def _play_tables(args):
+    return play_tables(*args)
+
+
+def confidence(mean, variance, n):
+    """95% interval of a mean of ``n`` results with the given variance."""
+    margin = Z_95 * (variance / n) ** 0.5 if n else 0.0
+    return [mean - margin, mean + margin]
+
+
+def leaderboard(strategy_names, order, samples, sums, config):
+    """Per-strategy results from the seats each strategy held, best mean final bankroll first."""
+    final = samples[:, :, -1]
+    best = final.max(axis=1, keepdims=True)
+    bankroll = config['bankroll']
+    entries = []
+    for strategy, name in enumerate(strategy_names):
+        held = order == strategy
+        if not held.any():
+            continue
+        played, won, squared, wagered = (int(total) for total in sums[held].sum(axis=0))
+        mean = won / played if played else 0.0
+        variance = squared / played - mean * mean if played else 0.0
+        low, high = confidence(mean, variance, played)
+        edge = won / wagered if wagered else 0.0
+        balances = final[held]
+        trajectories = samples[held]
+        entries.append({
+            'strategy': name,
+            'seats': int(held.sum()),
+            'rounds': played,
+            'evPerRound': mean,
+            'ci95': [low, high],
+            'edge': edge,
+            'edgeCi95': [low * played / wagered, high * played / wagered] if wagered else [0.0, 0.0],
+            'averageBet': wagered / played if played else 0.0,
+            'meanFinalBankroll': float(balances.mean()),
+            'medianFinalBankroll': float(np.median(balances)),
+            'ruined': float((balances <= 0).mean()),
+            'doubledUp': float((balances >= 2 * bankroll).mean()),
+            'tableWins': int((final == best)[held].sum()),
+            'meanTrajectory': trajectories.mean(axis=0).tolist(),
+            'trajectoryP10': np.percentile(trajectories, 10, axis=0).tolist(),
+            'trajectoryP90': np.percentile(trajectories, 90, axis=0).tolist(),
+        })
+    entries.sort(key=lambda entry: -entry['meanFinalBankroll'])
+    for rank, entry in enumerate(entries, 1):
+        entry['rank'] = rank
+    return entries
+
+
+def run(tables, rounds, strategies, config=None, seed=0, workers=1, points=DEFAULT_POINTS, seats=None):
+    """Play a tournament and return its leaderboard, with every seat's balance samples.
+
+    ``strategies`` are names from STRATEGIES or 'module:Class' paths to
+    ``Strategy`` subclasses importable by the workers. A table seats up to
+    MAX_SEATS of them.
+    """
+    config = {**DEFAULT_CONFIG, 'rules': RULES, **(config or {})}
+    seats = seats or min(len(strategies), MAX_SEATS)
+    points = min(points, rounds)
+    workers = max(min(workers, tables), 1)
+    shares = [tables // workers + (i < tables % workers) for i in range(workers)]
+    starts = [sum(shares[:i]) for i in range(workers)]
+    jobs = [(start, share, rounds, strategies, seats, config, seed, points) for start, share in zip(starts, shares)]
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = [_play_tables(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_play_tables, jobs))
+    elapsed = time.perf_counter() - start
+
+    samples = np.concatenate([result[0] for result in results])
+    sums = np.concatenate([result[1] for result in results])
+    order = np.array([seating(table, len(strategies), seats) for table in range(tables)])
+    seat_rounds = int(sums[:, :, 0].sum())
+    report = {
+        'tables': tables,
+        'rounds': rounds,
+        'seatsPerTable': seats,
+        'seed': seed,
+        'workers': workers,
+        'config': {**{key: value for key, value in config.items() if key != 'rules'},
+                   'rules': rules_to_dict(config['rules'])},
+        'sampleRounds': sample_rounds(rounds, points),
+        'leaderboard': leaderboard(strategies, order, samples, sums, config),
+        'seatRounds': seat_rounds,
+        'seconds': elapsed,
+        'seatRoundsPerSec': seat_rounds / elapsed,
+    }
+    return report, samples
+
+
+def format_leaderboard(report):
+    lines = [f'{"#":>2} {"strategy":<12} {"final mean":>10} {"median":>8} {"ruined %":>8} {"wins":>6} '
+             f'{"EV/round":>9} {"95% CI":>17} {"edge %":>7}']
+    for entry in report['leaderboard']:
+        low, high = entry['ci95']
+        lines.append(f'{entry["rank"]:>2} {entry["strategy"]:<12} {entry["meanFinalBankroll"]:>10.1f} '
+                     f'{entry["medianFinalBankroll"]:>8.0f} {100 * entry["ruined"]:>8.1f} {entry["tableWins"]:>6} '
+                     f'{entry["evPerRound"]:>9.3f} {low:>8.3f} {high:>8.3f} {100 * entry["edge"]:>7.2f}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tournament of blackjack bots over many tables.')
+    parser.add_argument('--tables', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=500, help='rounds played at every table')
+    parser.add_argument('--strategy', nargs='+', default=list(STRATEGIES),
+                        help=f'bots to enter: {", ".join(STRATEGIES)} or module:Class')
+    parser.add_argument('--seats', type=int, help=f'seats per table (default: one per bot, at most {MAX_SEATS})')
+    parser.add_argument('--bankroll', type=int, default=DEFAULT_CONFIG['bankroll'], help='starting chips per seat')
+    parser.add_argument('--unit', type=int, default=DEFAULT_CONFIG['unit'], help='base bet in chips')
+    parser.add_argument('--decks', type=int, default=DEFAULT_CONFIG['decks'])
+    parser.add_argument('--penetration', type=float, default=DEFAULT_CONFIG['penetration'])
+    parser.add_argument('--payout', default=None, help='blackjack payout (default: game.py rules)')
+    parser.add_argument('--dealer', choices=['S17', 'H17'], default=None)
+    parser.add_argument('--das', choices=['yes', 'no'], default=None, help='whether doubling after a split is allowed')
+    parser.add_argument('--rng', choices=['random', 'numpy'], default=DEFAULT_CONFIG['rng'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--points', type=int, default=DEFAULT_POINTS, help='balance samples per seat')
+    parser.add_argument('--output', help='also write the report as JSON to this file')
+    parser.add_argument('--trajectories', help='save every seat\'s balance samples to this .npy file')
+    args = parser.parse_args(argv)
+
+    if args.seats is not None and not 1 <= args.seats <= MAX_SEATS:
+        parser.error(f'--seats must be between 1 and {MAX_SEATS}')
+    if args.tables < 1 or args.rounds < 1 or args.points < 1:
+        parser.error('--tables, --rounds and --points must be positive')
+    if not 0 < args.penetration <= 1:
+        parser.error('--penetration must be in (0, 1]')
+    for name in args.strategy:
+        try:
+            strategy = resolve_strategy(name)
+        except (ImportError, AttributeError, ValueError) as e:
+            parser.error(f'unknown strategy {name!r}: {e}')
+        if not (isinstance(strategy, type) and issubclass(strategy, Strategy)):
+            parser.error(f'{name} is not a Strategy subclass')
+    rules = RULES
+    if args.payout is not None:
+        rules = rules._replace(blackjack_payout=parse_payout(args.payout))
+    if args.dealer is not None:
+        rules = rules._replace(dealer_hits_soft_17=args.dealer == 'H17')
+    if args.das is not None:
+        rules = rules._replace(double_after_split=args.das == 'yes')
+    config = {'decks': args.decks, 'penetration': args.penetration, 'bankroll': args.bankroll, 'unit': args.unit,
+              'rng': args.rng, 'rules': rules}
+
+    report, samples = run(args.tables, args.rounds, args.strategy, config, args.seed, args.workers, args.points,
+                          args.seats)
+    print(format_leaderboard(report))
+    print(f'{report["tables"]} tables x {report["rounds"]} rounds, {report["seatRounds"]} seat-rounds '
+          f'in {report["seconds"]:.1f}s ({report["seatRoundsPerSec"]:,.0f}/s)')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.trajectories:
+        np.save(args.trajectories, samples)
+
+
+if __name__ == '__main__':
+    main()
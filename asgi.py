@@ -0,0 +1,204 @@
+"""Asyncio ASGI server for the game API.
+
+Serves the same /api/* routes as app.py through the shared GameService, so
+responses are identical. Moves on one table are serialized by a per-table
+asyncio.Lock while other tables proceed concurrently; session stores that
+do I/O are called from a worker thread to keep the event loop free.
+With BLACKJACK_STATIC=memory it also serves the built client from memory
+(static_files.py); otherwise put the client behind a web server.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import time
+import weakref
+
+from asgi_http import (CORS_HEADERS, etag_matches, header, lifespan, read_json, send_body, send_empty, send_json,
+                       table_headers, table_id)
+from blackjack_logic import ACTIONS
+from broadcast import KEEPALIVE_SECONDS
+from metrics import CONTENT_TYPE, REQUEST_SECONDS, render
+from service import NOT_STARTED, GameService
+from sessions import new_table_id
+from static_files import static_index_from_env
+
+service = GameService()
+game_sessions = service.sessions
+
+# The built client, read into memory once when BLACKJACK_STATIC=memory
+static_index = static_index_from_env()
+
+# Locks disappear once no request for the table holds or awaits them.
+_table_locks = weakref.WeakValueDictionary()
+
+# Actions that compute for long enough to stall other tables on the event loop
+CPU_BOUND_ACTIONS = {'exact-hint', 'batch'}
+
+
+def table_lock(session_id):
+    """The asyncio.Lock guarding one table."""
+    lock = _table_locks.get(session_id)
+    if lock is None:
+        lock = _table_locks[session_id] = asyncio.Lock()
+    return lock
+
+
+async def call_service(fn, *args, offload=False):
+    """Call into the service, off the event loop if the session store blocks."""
+    if offload or game_sessions.blocking:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+# Known paths, used as request-metric labels; anything else is "unmatched"
+ROUTES = {'/api/start', '/api/batch', '/api/stream', '/api/sessions/stats', '/metrics'} | {f'/api/{name}' for name in ACTIONS}
+
+
+async def send_state(scope, send, session_id):
+    """GET /api/state from the table's cached snapshot, honouring If-None-Match."""
+    async with table_lock(session_id):
+        snapshot = await call_service(service.snapshot, session_id)
+    if snapshot is None:
+        return await send_json(send, NOT_STARTED)
+    etag = f'"{snapshot[0]}"'
+    headers = [(b'etag', etag.encode())]
+    if etag_matches(scope, etag):
+        return await send_empty(send, 304, headers)
+    await send_body(send, snapshot[1], headers=headers)
+
+
+async def stream_state(receive, send, session_id):
+    """Server-Sent Events feed for a table, same format as app.py's /api/stream."""
+    # Events arrive on this loop, so an open stream holds no executor thread
+    async with table_lock(session_id):
+        subscription = await call_service(service.subscribe, session_id, asyncio.get_running_loop())
+    if subscription is None:
+        return await send_json(send, NOT_STARTED)
+    subscriber, snapshot = subscription
+    broadcaster = service.broadcaster
+
+    async def end_on_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        # Wake the loop below so the feed ends now rather than at the next keepalive
+        subscriber.close()
+
+    watcher = asyncio.ensure_future(end_on_disconnect())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream'),
+                        (b'cache-control', b'no-cache')] + CORS_HEADERS,
+        })
+        event = snapshot
+        while event is not None and not watcher.done():
+            await send({'type': 'http.response.body', 'body': event.encode(), 'more_body': True})
+            try:
+                event = await subscriber.get(KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                event = ': keepalive\n\n'
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+        broadcaster.unsubscribe(session_id, subscriber)
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    start = time.perf_counter()
+    try:
+        await handle_http(scope, receive, send)
+    finally:
+        path = scope['path']
+        if path in ROUTES:
+            route = path
+        elif static_index is not None and not path.startswith('/api/'):
+            route = 'static'
+        else:
+            route = 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route, scope['method'])
+
+
+async def handle_http(scope, receive, send):
+    method = scope['method']
+    path = scope['path']
+    session_id = table_id(scope)
+
+    if method == 'OPTIONS':
+        return await send_empty(send, 204)
+
+    name = path[len('/api/'):] if path.startswith('/api/') else None
+    if name == 'start' and method == 'POST':
+        try:
+            data = await read_json(receive)
+        except ValueError:
+            return await send_json(send, {'success': False, 'message': 'Invalid JSON'}, 400)
+        session_id = session_id or new_table_id()
+        async with table_lock(session_id):
+            response = await call_service(service.start, session_id, data)
+        return await send_json(send, response, headers=table_headers(response))
+
+    if name == 'batch' and method == 'POST':
+        try:
+            data = await read_json(receive)
+        except ValueError:
+            return await send_json(send, {'success': False, 'message': 'Invalid JSON'}, 400)
+        # GameService.batch takes each table's threading lock itself; a batch
+        # for the caller's own table also holds its asyncio lock.
+        session_id = session_id or new_table_id()
+        async with table_lock(session_id):
+            response = await call_service(service.batch, session_id, data, offload=True)
+        return await send_json(send, response, headers=table_headers(response))
+
+    if name == 'state' and method == 'GET':
+        return await send_state(scope, send, session_id)
+
+    if name in ACTIONS and method == 'POST' and name != 'state':
+        try:
+            data = await read_json(receive)
+        except ValueError:
+            return await send_json(send, {'success': False, 'message': 'Invalid JSON'}, 400)
+        async with table_lock(session_id):
+            response = await call_service(service.perform, name, session_id, data,
+                                          offload=name in CPU_BOUND_ACTIONS)
+        return await send_json(send, response)
+
+    if name == 'stream' and method == 'GET':
+        return await stream_state(receive, send, session_id)
+
+    if name == 'sessions/stats' and method == 'GET':
+        return await send_json(send, await call_service(game_sessions.stats))
+
+    if path == '/metrics' and method == 'GET':
+        body = (await call_service(render)).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', CONTENT_TYPE.encode()),
+                        (b'content-length', str(len(body)).encode())],
+        })
+        return await send({'type': 'http.response.body', 'body': body})
+
+    if static_index is not None and method in ('GET', 'HEAD') and name is None:
+        return await send_static(scope, send)
+
+    await send_json(send, {'success': False, 'message': 'Not found'}, 404)
+
+
+async def send_static(scope, send):
+    """A file of the built client from the in-memory index."""
+    result = static_index.respond(scope['path'], header(scope, b'accept-encoding'), header(scope, b'if-none-match'))
+    if result is None:
+        return await send_json(send, {'success': False, 'message': 'Not found'}, 404)
+    status, headers, body = result
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode(), value.encode('latin-1')) for name, value in headers],
+    })
+    await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
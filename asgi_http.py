@@ -0,0 +1,96 @@
+"""ASGI request and response helpers shared by asgi.py and router.py."""
+import json
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+from encoding import dumps
+from sessions import TABLE_ID_HEADER, TABLE_ID_PARAM, checked_table_id
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-headers', b'content-type, x-table-id'),
+    (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+]
+
+_TABLE_ID_HEADER = TABLE_ID_HEADER.lower().encode()
+
+
+async def read_body(receive):
+    body = b''
+    more = True
+    while more:
+        message = await receive()
+        body += message.get('body', b'')
+        more = message.get('more_body', False)
+    return body
+
+
+async def read_json(receive):
+    body = await read_body(receive)
+    return json.loads(body) if body else {}
+
+
+async def send_json(send, payload, status=200, headers=()):
+    await send_body(send, dumps(payload), status, headers)
+
+
+async def send_body(send, body, status=200, headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())] + list(headers) + CORS_HEADERS,
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_empty(send, status, headers=()):
+    await send({'type': 'http.response.start', 'status': status, 'headers': list(headers) + CORS_HEADERS})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+def header(scope, name):
+    """Value of a request header (lower-case bytes name), or None."""
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def etag_matches(scope, etag):
+    """True if the request's If-None-Match header lists ``etag`` (or is ``*``)."""
+    value = header(scope, b'if-none-match')
+    if value is None:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in value.split(',')]
+    return '*' in tags or etag in tags
+
+
+def table_id(scope):
+    """Table id from the X-Table-Id header, the tableId query parameter or cookie, if any."""
+    value = header(scope, _TABLE_ID_HEADER)
+    if value is None and scope.get('query_string'):
+        value = parse_qs(scope['query_string'].decode('latin-1')).get(TABLE_ID_PARAM, [None])[0]
+    if value is None:
+        cookies = header(scope, b'cookie')
+        if cookies:
+            morsel = SimpleCookie(cookies).get(TABLE_ID_PARAM)
+            value = morsel.value if morsel else None
+    return checked_table_id(value)
+
+
+def table_headers(payload):
+    """Set-Cookie header remembering the table a response names, for clients that keep cookies."""
+    if 'tableId' not in payload:
+        return ()
+    return [(b'set-cookie', f'{TABLE_ID_PARAM}={payload["tableId"]}; Path=/api; HttpOnly; SameSite=Lax'.encode())]
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
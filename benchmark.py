@@ -0,0 +1,254 @@
+"""Benchmarks for the hot paths: hand evaluation, dealing, rounds and the HTTP API.
+
+Each benchmark reports ops/sec, latency percentiles and allocations, and the
+results can be compared against a stored baseline:
+
+    python benchmark.py                       # run, save benchmark_results.json
+    python benchmark.py --compare             # fail on regressions vs the baseline
+    python benchmark.py --save-baseline       # record a new baseline
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from blackjack_logic import create_game_state, create_player, place_bet, stand
+from cards import Hand, calculate_hand, create_deck
+from rng import RNG_MODES, create_rng
+from shoe import Shoe
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+RESULTS_PATH = 'benchmark_results.json'
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark; the function returns the operation to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark('calculate_hand')
+def bench_calculate_hand():
+    rng = random.Random(0)
+    hands = [[rng.randrange(52) for _ in range(rng.randint(2, 6))] for _ in range(1024)]
+    it = iter(range(1 << 62))
+    return lambda: calculate_hand(hands[next(it) & 1023])
+
+
+@benchmark('hand_accumulate')
+def bench_hand_accumulate():
+    rng = random.Random(0)
+    hands = [[rng.randrange(52) for _ in range(rng.randint(2, 6))] for _ in range(1024)]
+    it = iter(range(1 << 62))
+    return lambda: Hand(hands[next(it) & 1023]).total
+
+
+@benchmark('create_deck')
+def bench_create_deck():
+    return create_deck
+
+
+@benchmark('shoe_shuffle_6_decks')
+def bench_shoe_shuffle():
+    shoe = Shoe(6, rng=random.Random(0))
+    return shoe.shuffle
+
+
+def bench_rng_shuffle(mode):
+    shoe = Shoe(6, rng=create_rng(mode, None if mode == 'secure' else 0))
+    return shoe.shuffle
+
+
+for _mode in RNG_MODES:
+    benchmark(f'shuffle_{_mode}_6_decks')(functools.partial(bench_rng_shuffle, _mode))
+
+
+@benchmark('shoe_deal')
+def bench_shoe_deal():
+    shoe = Shoe(6, rng=random.Random(0))
+
+    def deal():
+        if shoe.needs_shuffle:
+            shoe.shuffle()
+        return shoe.deal()
+    return deal
+
+
+@benchmark('full_round')
+def bench_full_round():
+    """Deal, play both seats to 17 and settle through determine_winners."""
+    random.seed(0)
+    game_state = create_game_state(6)
+    game_state['players'] = [create_player(1, 'A', 10 ** 9), create_player(2, 'B', 10 ** 9)]
+
+    def round_():
+        game_state['gamePhase'] = 'betting'
+        game_state['currentPlayerIndex'] = 0
+        game_state['players'][0]['isActive'] = True
+        for player in game_state['players']:
+            place_bet(game_state, {'playerId': player['id'], 'bet': 10})
+        # The last stand plays the dealer and settles through determine_winners.
+        while game_state['gamePhase'] == 'playing':
+            stand(game_state, {'playerId': game_state['currentPlayerIndex'] + 1})
+    return round_
+
+
+def _api_client():
+    from app import app
+    random.seed(0)
+    return app.test_client()
+
+
+@benchmark('api_cycle')
+def bench_api_cycle():
+    """/api/start -> /api/bet x2 -> /api/hit -> /api/stand... -> /api/next-round."""
+    client = _api_client()
+
+    def cycle():
+        client.post('/api/start', json={'player1Name': 'A', 'player2Name': 'B', 'balance': 1000})
+        client.post('/api/bet', json={'playerId': 1, 'bet': 10})
+        game = client.post('/api/bet', json={'playerId': 2, 'bet': 10}).get_json()['gameState']
+        if game['gamePhase'] == 'playing':
+            player_id = game['players'][game['currentPlayerIndex']]['id']
+            game = client.post('/api/hit', json={'playerId': player_id}).get_json()['gameState']
+        while game['gamePhase'] == 'playing':
+            player_id = game['players'][game['currentPlayerIndex']]['id']
+            game = client.post('/api/stand', json={'playerId': player_id}).get_json()['gameState']
+        client.post('/api/next-round')
+    return cycle
+
+
+@benchmark('api_state')
+def bench_api_state():
+    client = _api_client()
+    client.post('/api/start', json={'player1Name': 'A', 'player2Name': 'B'})
+    return lambda: client.get('/api/state')
+
+
+@benchmark('api_state_not_modified')
+def bench_api_state_not_modified():
+    """Conditional /api/state poll of an unchanged table (304)."""
+    client = _api_client()
+    client.post('/api/start', json={'player1Name': 'A', 'player2Name': 'B'})
+    etag = client.get('/api/state').headers['ETag']
+    return lambda: client.get('/api/state', headers={'If-None-Match': etag})
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def measure(op, min_time=0.5, max_samples=200_000):
+    """Time ``op`` call by call, then count its allocations with tracemalloc."""
+    for _ in range(10):
+        op()
+
+    samples = []
+    clock = time.perf_counter_ns
+    deadline = clock() + int(min_time * 1e9)
+    while len(samples) < max_samples:
+        start = clock()
+        op()
+        end = clock()
+        samples.append(end - start)
+        if end > deadline:
+            break
+    samples.sort()
+    total = sum(samples)
+
+    alloc_ops = max(1, min(len(samples), 1000))
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(alloc_ops):
+        op()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    growth = after.compare_to(before, 'filename')
+
+    return {
+        'samples': len(samples),
+        'opsPerSec': len(samples) / (total / 1e9),
+        'meanUs': total / len(samples) / 1e3,
+        'p50Us': percentile(samples, 0.50) / 1e3,
+        'p90Us': percentile(samples, 0.90) / 1e3,
+        'p99Us': percentile(samples, 0.99) / 1e3,
+        'netBlocksPerOp': sum(stat.count_diff for stat in growth) / alloc_ops,
+        'netBytesPerOp': sum(stat.size_diff for stat in growth) / alloc_ops,
+        'peakTracedKiB': peak / 1024,
+    }
+
+
+def run(names, min_time):
+    results = {}
+    for name in names:
+        results[name] = measure(BENCHMARKS[name](), min_time)
+        r = results[name]
+        print(f'{name:<22}{r["opsPerSec"]:>14,.0f} ops/s  p50 {r["p50Us"]:>9.2f}us  '
+              f'p99 {r["p99Us"]:>9.2f}us  {r["netBytesPerOp"]:>9.1f} B/op')
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Names of benchmarks whose throughput fell more than ``threshold`` below the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if not base:
+            continue
+        change = result['opsPerSec'] / base['opsPerSec'] - 1
+        flag = 'REGRESSION' if change < -threshold else ''
+        print(f'{name:<22}{change:>+9.1%} vs baseline {flag}')
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the blackjack hot paths.')
+    parser.add_argument('names', nargs='*', help=f'benchmarks to run (default: all of {", ".join(BENCHMARKS)})')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds to time each benchmark')
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--compare', action='store_true', help='exit non-zero on regressions vs the baseline')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.20, help='allowed ops/sec drop before flagging')
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(unknown)}')
+    if args.compare and not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f'no baseline at {args.baseline}; record one with --save-baseline')
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'benchmarks': run(args.names or list(BENCHMARKS), args.min_time),
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(report['benchmarks'], baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,719 @@
+"""Game engine shared by the Flask and ASGI servers and the command-line game.
+
+Each action takes the table's game state plus the decoded JSON payload,
+mutates the state in place and returns the response body as a dict.
+
+A seat plays one ``SeatHand`` per wager. Splitting a pair gives it several,
+which are played in order; ``player['hand']`` is the one being played and
+``player['bet']`` is the seat's total wager across them.
+"""
+import time
+
+from cards import CARD_IS_ACE, Hand, SeatHand, card_name, hand_to_dicts
+from counting import CountTracker
+from history import (BET, DEAL, DEALER_SEAT, DOUBLE, HIT, INSURANCE, NO_SEAT, OUTCOME_CODES, PAYOUT, SHUFFLE, SPLIT,
+                     STAND)
+from metrics import COUNT_FLAGS, ROUNDS, SETTLEMENT_SECONDS
+from rules import DEFAULT_RULES, blackjack_win, dealer_hits, rules_from_dict, rules_to_dict
+from shoe import MAX_DECKS, MIN_DECKS, Shoe
+
+# Basic-strategy tables per dealer rule, loaded the first time a table needs
+# them: S17 from the cache on disk next to strategy.py, H17 built in memory
+_strategy_tables = {}
+
+# Composition-dependent EVs for the cards actually left in a shoe, per dealer
+# rule. exact_ev pulls in NumPy, so it is imported on the first exact hint.
+_ev_calculators = {}
+
+# Hand-history writer (history.HandHistoryWriter); None disables recording
+hand_history = None
+
+# Seats per table
+MIN_SEATS = 1
+MAX_SEATS = 7
+
+# Most hands a seat can hold by splitting (and re-splitting) pairs
+MAX_SPLIT_HANDS = 4
+
+# Shoe settings used when /api/start does not override them
+DEFAULT_DECKS = 1
+CUT_CARD_PENETRATION = 0.75
+
+# Chip amounts are whole numbers; the hand history stores them as 64-bit ints
+MAX_BALANCE = 2**63 - 1
+
+def is_chip_amount(value):
+    """True for a whole number of chips from 1 to MAX_BALANCE (JSON true/false are not numbers)."""
+    return isinstance(value, int) and not isinstance(value, bool) and 0 < value <= MAX_BALANCE
+
+def deal_card(shoe):
+    """Deal one card from the shoe."""
+    return shoe.deal()
+
+def strategy_for(rules):
+    """Basic-strategy tables for a table's dealer rule, loaded on first use."""
+    tables = _strategy_tables.get(rules.dealer_hits_soft_17)
+    if tables is None:
+        from strategy import StrategyTables
+        if rules.dealer_hits_soft_17:
+            tables = StrategyTables.build(hits_soft_17=True)
+        else:
+            tables = StrategyTables.load_or_build()
+        _strategy_tables[rules.dealer_hits_soft_17] = tables
+    return tables
+
+def ev_calculator_for(rules):
+    """Exact EV calculator for a table's dealer rule, created on first use."""
+    calculator = _ev_calculators.get(rules.dealer_hits_soft_17)
+    if calculator is None:
+        from exact_ev import ExactEVCalculator
+        calculator = ExactEVCalculator(hits_soft_17=rules.dealer_hits_soft_17)
+        _ev_calculators[rules.dealer_hits_soft_17] = calculator
+    return calculator
+
+def set_hand_history(writer):
+    """Record table events to ``writer``, or stop recording with None."""
+    global hand_history
+    hand_history = writer
+
+def record(game_state, event, seat=NO_SEAT, value=0, amount=0):
+    """Append an event to the hand history if one is being kept."""
+    if hand_history is not None:
+        hand_history.append(game_state.get('tableKey', 0), game_state.get('round', 0),
+                            event, seat, value, amount)
+
+def count_tracker(game_state):
+    """The table's CountTracker, created on first use.
+
+    Tables saved before counting was added have none; theirs starts from
+    zero mid-shoe and is accurate from the next shuffle.
+    """
+    tracker = game_state.get('count')
+    if tracker is None:
+        tracker = game_state['count'] = CountTracker(game_state['shoe'].decks)
+    return tracker
+
+def draw(game_state, seat, face_up=True):
+    """Deal one card from the table's shoe and record which seat received it.
+
+    Face-up cards are counted as they are dealt; the dealer's hole card is
+    counted by ``dealer_play`` when it is turned over.
+    """
+    shoe = game_state['shoe']
+    card = deal_card(shoe)
+    record(game_state, DEAL, seat, card)
+    # Looked up directly on this hot path; count_tracker only for a table without one
+    tracker = game_state.get('count') or count_tracker(game_state)
+    if shoe.cursor == 1:
+        # First card of a freshly shuffled shoe
+        tracker.reset()
+    if face_up:
+        tracker.observe(card)
+    return card
+
+def create_player(player_id, name, balance):
+    """Create a new player."""
+    return {
+        'id': player_id,
+        'name': name,
+        'hand': SeatHand(),
+        'hands': [],
+        'handIndex': 0,
+        'total': 0,
+        'balance': balance,
+        'bet': 0,
+        'insurance': 0,
+        'canDoubleDown': False,
+        'canSplit': False,
+        'canInsure': False,
+        'isActive': False,
+        'isFinished': False,
+        'winner': None,
+        'decisions': 0,
+        'mistakes': 0,
+        'evLoss': 0.0
+    }
+
+def create_game_state(decks=DEFAULT_DECKS, rng=None, rules=DEFAULT_RULES):
+    """Create initial multiplayer game state; ``rng`` is the shoe's shuffle backend (see rng.py)."""
+    return {
+        'shoe': Shoe(decks, CUT_CARD_PENETRATION, rng),
+        'rules': rules,
+        # Card-counting analytics (see counting.py)
+        'count': CountTracker(decks),
+        'players': [],
+        'dealerHand': Hand(),
+        'dealerTotal': 0,
+        'gamePhase': 'setup',
+        'currentPlayerIndex': 0,
+        'message': '',
+        'allPlayersFinished': False,
+        # Seat indices still to act this round, and the position in that list
+        'turnOrder': [],
+        'turn': 0,
+        # Hand-history key of the table and number of the current round
+        'tableKey': 0,
+        'round': 1,
+        # Bumped on every saved change; cached encodings are tagged with it
+        'version': 0
+    }
+
+def format_player(player):
+    """Format a seat for the frontend; ``hand`` repeats the cards of the hand being played."""
+    hands = [{'cards': hand_to_dicts(hand.cards), 'total': hand.total, 'bet': hand.bet, 'outcome': hand.outcome}
+             for hand in player['hands']]
+    current = hands[player['handIndex']]['cards'] if hands else []
+    return dict(player, hand=current, hands=hands)
+
+def format_game_state(game_state):
+    """Format game state for frontend."""
+    return {
+        'players': [format_player(player) for player in game_state['players']],
+        'dealerHand': hand_to_dicts(game_state['dealerHand']),
+        'dealerTotal': game_state['dealerTotal'],
+        'gamePhase': game_state['gamePhase'],
+        'currentPlayerIndex': game_state['currentPlayerIndex'],
+        'message': game_state['message'],
+        'allPlayersFinished': game_state['allPlayersFinished'],
+        'rules': rules_to_dict(game_state['rules'])
+    }
+
+def check_all_players_finished(game_state):
+    """Check if all players have finished their turns."""
+    return all(player['isFinished'] for player in game_state['players'])
+
+def dealer_play(game_state):
+    """Play dealer's turn."""
+    dealer_hand = game_state['dealerHand']
+    if len(dealer_hand) > 1:
+        count_tracker(game_state).observe(dealer_hand[1])
+    while dealer_hits(dealer_hand, game_state['rules']):
+        dealer_hand.append(draw(game_state, DEALER_SEAT))
+    game_state['dealerTotal'] = dealer_hand.total
+
+def can_double_down(player, rules=DEFAULT_RULES):
+    """Check if player can double down."""
+    hand = player['hand']
+    return (len(hand) == 2 and  # Only on first two cards
+            (not hand.split or rules.double_after_split) and
+            player['balance'] >= player['bet'] + player['insurance'] + hand.bet and  # Must cover the doubled hand
+            not player['isFinished'])  # Player hasn't finished their turn
+
+def can_split(player):
+    """Check if player can split their current hand into two."""
+    hand = player['hand']
+    return (hand.is_pair and
+            len(player['hands']) < MAX_SPLIT_HANDS and
+            player['balance'] >= player['bet'] + player['insurance'] + hand.bet and
+            not player['isFinished'])
+
+def can_insure(game_state, player):
+    """Insurance is offered against a dealer Ace before the first decision on a hand."""
+    hand = player['hand']
+    return (CARD_IS_ACE[game_state['dealerHand'][0]] and
+            len(player['hands']) == 1 and len(hand) == 2 and
+            not player['insurance'] and
+            hand.bet >= 2 and player['balance'] >= player['bet'] + hand.bet // 2 and
+            not player['isFinished'])
+
+def update_options(game_state, player):
+    """Refresh the current hand's total and the actions offered for it."""
+    player['total'] = player['hand'].total
+    player['canDoubleDown'] = can_double_down(player, game_state['rules'])
+    player['canSplit'] = can_split(player)
+    player['canInsure'] = can_insure(game_state, player)
+
+def basic_strategy(game_state, player):
+    """Best action and action EVs for a player's hand against the dealer upcard."""
+    hand = player['hand']
+    rules = game_state['rules']
+    pair = hand[0] if can_split(player) else None
+    return strategy_for(rules).best_action(hand.total, hand.is_soft, game_state['dealerHand'][0],
+                                           game_state['shoe'].decks, can_double_down(player, rules),
+                                           pair, rules.double_after_split)
+
+def score_decision(game_state, player, action):
+    """Record how much EV an action gave up compared to basic strategy."""
+    best, evs = basic_strategy(game_state, player)
+    player['decisions'] += 1
+    if action != best:
+        player['mistakes'] += 1
+        player['evLoss'] += (evs[best] - evs[action]) * player['hand'].bet
+
+def settle_hand(hand, dealer_total, rules):
+    """Set a hand's outcome and return the chips it wins (negative when lost)."""
+    total = hand.total
+    if total > 21:
+        # Player busted
+        hand.outcome = 'lose'
+        return -hand.bet
+    if dealer_total > 21 or total > dealer_total:
+        # Dealer busted or player wins
+        hand.outcome = 'win'
+        # Blackjack pays the table's payout (3:2 by default)
+        return blackjack_win(hand.bet, rules) if hand.is_blackjack else hand.bet
+    if total < dealer_total:
+        # Dealer wins
+        hand.outcome = 'lose'
+        return -hand.bet
+    # Push
+    hand.outcome = 'push'
+    return 0
+
+def determine_winners(game_state):
+    """Determine winners for all players."""
+    dealer_total = game_state['dealerTotal']
+    rules = game_state['rules']
+    
+    for player in game_state['players']:
+        balance = player['balance']
+        hands = player['hands']
+        if len(hands) == 1:
+            won = settle_hand(hands[0], dealer_total, rules)
+            player['winner'] = hands[0].outcome
+        else:
+            # A seat with split hands wins, loses or pushes on the hands taken together
+            won = 0
+            for hand in hands:
+                won += settle_hand(hand, dealer_total, rules)
+            player['winner'] = 'win' if won > 0 else 'lose' if won < 0 else 'push'
+        player['balance'] += won
+        if player['insurance']:
+            # Insurance pays 2:1 when the dealer has blackjack
+            if game_state['dealerHand'].is_blackjack:
+                player['balance'] += 2 * player['insurance']
+            else:
+                player['balance'] -= player['insurance']
+        record(game_state, PAYOUT, player['id'] - 1, OUTCOME_CODES[player['winner']], player['balance'] - balance)
+
+def get_player(game_state, player_id):
+    """Look up a seat by player id; ids are 1-based seat numbers."""
+    players = game_state['players']
+    if isinstance(player_id, int) and 1 <= player_id <= len(players):
+        return players[player_id - 1]
+    return None
+
+def get_active_player(game_state, data):
+    """The player named in the payload if it is their turn, else None."""
+    player = get_player(game_state, data.get('playerId'))
+    if not player or not player['isActive']:
+        return None
+    return player
+
+def finish_round(game_state):
+    """Play the dealer's hand and settle every bet."""
+    game_state['gamePhase'] = 'dealer'
+    start = time.perf_counter()
+    dealer_play(game_state)
+    played = time.perf_counter()
+    determine_winners(game_state)
+    SETTLEMENT_SECONDS.observe(played - start, 'dealer_play')
+    SETTLEMENT_SECONDS.observe(time.perf_counter() - played, 'determine_winners')
+    ROUNDS.inc()
+    game_state['gamePhase'] = 'results'
+    game_state['message'] = 'Round complete! Check results.'
+
+def end_hand(game_state, player):
+    """Finish the current hand and return a message for whoever acts next.
+
+    The seat moves on to its next split hand if it has one; otherwise its
+    turn ends and the next seat (or the dealer) plays.
+    """
+    index = player['handIndex'] + 1
+    if index < len(player['hands']):
+        player['handIndex'] = index
+        player['hand'] = player['hands'][index]
+        update_options(game_state, player)
+        return f' {player["name"]}, play hand {index + 1} of {len(player["hands"])}.'
+    
+    player['isFinished'] = True
+    player['isActive'] = False
+    player['canDoubleDown'] = player['canSplit'] = player['canInsure'] = False
+    next_player = advance_turn(game_state)
+    if next_player:
+        return f' {next_player["name"]}, your turn!'
+    return ''
+
+def advance_turn(game_state):
+    """Activate the next seat still to act and return it, or finish the round."""
+    order = game_state['turnOrder']
+    game_state['turn'] += 1
+    if game_state['turn'] < len(order):
+        game_state['currentPlayerIndex'] = order[game_state['turn']]
+        next_player = game_state['players'][game_state['currentPlayerIndex']]
+        next_player['isActive'] = True
+        return next_player
+    finish_round(game_state)
+    return None
+
+# The state changes behind /api/double, /api/split and /api/insurance, shared
+# with the headless arena (arena.py) so both play a hand by the same rules.
+# Callers check can_double_down, can_split or can_insure first.
+
+def double_hand(game_state, player):
+    """Double the current hand's bet and deal its one card; returns the card."""
+    hand = player['hand']
+    player['bet'] += hand.bet
+    hand.bet *= 2
+    record(game_state, DOUBLE, player['id'] - 1, amount=hand.bet)
+    card = draw(game_state, player['id'] - 1)
+    hand.append(card)
+    return card
+
+def split_current_hand(game_state, player):
+    """Split the current pair into two hands with equal bets, each dealt a second card.
+
+    Returns True for split aces, which get one card each: the second of them
+    is made the current hand, so ending it moves the seat's turn past both.
+    Otherwise the first is current and is played on.
+    """
+    seat = player['id'] - 1
+    hand = player['hand']
+    index = player['handIndex']
+    record(game_state, SPLIT, seat, amount=hand.bet)
+    first, second = hand.split_pair(draw(game_state, seat), draw(game_state, seat))
+    player['hands'][index:index + 1] = [first, second]
+    player['bet'] += hand.bet
+    if CARD_IS_ACE[hand[0]]:
+        player['handIndex'] = index + 1
+        player['hand'] = second
+        return True
+    player['hand'] = first
+    return False
+
+def insure_hand(game_state, player):
+    """Stake half the current hand's bet on the dealer having blackjack."""
+    player['insurance'] = player['hand'].bet // 2
+    record(game_state, INSURANCE, player['id'] - 1, amount=player['insurance'])
+
+def start_game(data, rng=None, rules=DEFAULT_RULES):
+    """Create a new table from the /api/start payload; returns (game_state, response)."""
+    names = data.get('playerNames')
+    if names is None:
+        names = [data.get('player1Name', 'Player 1'), data.get('player2Name', 'Player 2')]
+    balance = data.get('balance', 100)
+    decks = data.get('decks', DEFAULT_DECKS)
+    
+    if not isinstance(names, list) or not MIN_SEATS <= len(names) <= MAX_SEATS:
+        return None, {'success': False, 'message': f'Number of players must be between {MIN_SEATS} and {MAX_SEATS}'}
+    
+    if not isinstance(decks, int) or not MIN_DECKS <= decks <= MAX_DECKS:
+        return None, {'success': False, 'message': f'Number of decks must be between {MIN_DECKS} and {MAX_DECKS}'}
+    
+    if not is_chip_amount(balance):
+        return None, {'success': False, 'message': f'Balance must be a whole number from 1 to {MAX_BALANCE}'}
+    
+    if 'rules' in data:
+        try:
+            rules = rules_from_dict(data['rules'], rules)
+        except ValueError as e:
+            return None, {'success': False, 'message': str(e)}
+    
+    game_state = create_game_state(decks, rng, rules)
+    game_state['players'] = [create_player(seat + 1, name, balance) for seat, name in enumerate(names)]
+    game_state['gamePhase'] = 'betting'
+    game_state['currentPlayerIndex'] = 0
+    game_state['players'][0]['isActive'] = True
+    game_state['message'] = f'{names[0]}, place your bet!'
+    
+    return game_state, {
+        'success': True,
+        'gameState': format_game_state(game_state)
+    }
+
+def place_bet(game_state, data):
+    """Place the active player's bet and deal once every seat has bet."""
+    bet = data.get('bet', 0)
+    
+    if game_state['gamePhase'] != 'betting':
+        return {'success': False, 'message': 'Not in betting phase'}
+    
+    player = get_active_player(game_state, data)
+    if not player:
+        return {'success': False, 'message': 'Invalid player or not active'}
+    
+    if not is_chip_amount(bet) or bet > player['balance']:
+        return {'success': False, 'message': 'Invalid bet amount'}
+    
+    record(game_state, BET, player['id'] - 1, amount=bet)
+    player['bet'] = bet
+    player['isActive'] = False
+    if count_tracker(game_state).observe_bet(player['id'] - 1, bet):
+        COUNT_FLAGS.inc()
+    
+    # Move to next player or start dealing
+    if game_state['currentPlayerIndex'] < len(game_state['players']) - 1:
+        game_state['currentPlayerIndex'] += 1
+        next_player = game_state['players'][game_state['currentPlayerIndex']]
+        next_player['isActive'] = True
+        game_state['message'] = f'{next_player["name"]}, place your bet!'
+    else:
+        # All bets placed, deal cards
+        shoe = game_state['shoe']
+        if shoe.needs_shuffle:
+            shoe.shuffle()
+            record(game_state, SHUFFLE, value=shoe.decks)
+        game_state['dealerHand'] = Hand([draw(game_state, DEALER_SEAT), draw(game_state, DEALER_SEAT, face_up=False)])
+        game_state['dealerTotal'] = game_state['dealerHand'].total
+        
+        # Deal cards to players; blackjacks are finished and skip their turn
+        for seat, player in enumerate(game_state['players']):
+            hand = SeatHand([draw(game_state, seat), draw(game_state, seat)], player['bet'])
+            player['hands'] = [hand]
+            player['handIndex'] = 0
+            player['hand'] = hand
+            player['isFinished'] = hand.is_blackjack
+            update_options(game_state, player)
+        
+        game_state['gamePhase'] = 'playing'
+        game_state['turnOrder'] = [seat for seat, player in enumerate(game_state['players'])
+                                   if not player['isFinished']]
+        game_state['turn'] = -1
+        game_state['currentPlayerIndex'] = 0
+        next_player = advance_turn(game_state)
+        if next_player:
+            game_state['message'] = f'{next_player["name"]}, choose your action!'
+    
+    return {
+        'success': True,
+        'gameState': format_game_state(game_state)
+    }
+
+def hit(game_state, data):
+    """Deal one card to the active player."""
+    if game_state['gamePhase'] != 'playing':
+        return {'success': False, 'message': 'Not in playing phase'}
+    
+    player = get_active_player(game_state, data)
+    if not player:
+        return {'success': False, 'message': 'Invalid player or not active'}
+    
+    score_decision(game_state, player, 'hit')
+    record(game_state, HIT, player['id'] - 1)
+    
+    # Deal card to player
+    new_card = draw(game_state, player['id'] - 1)
+    player['hand'].append(new_card)
+    update_options(game_state, player)
+    
+    if player['total'] > 21:
+        # Player busted
+        game_state['message'] = f'{player["name"]} busted!'
+        next_message = end_hand(game_state, player)
+        game_state['message'] += next_message
+    else:
+        game_state['message'] = f'{player["name"]} drew {card_name(new_card)}. Choose your action.'
+    
+    return {
+        'success': True,
+        'gameState': format_game_state(game_state)
+    }
+
+def stand(game_state, data):
+    """End the active player's turn."""
+    if game_state['gamePhase'] != 'playing':
+        return {'success': False, 'message': 'Not in playing phase'}
+    
+    player = get_active_player(game_state, data)
+    if not player:
+        return {'success': False, 'message': 'Invalid player or not active'}
+    
+    score_decision(game_state, player, 'stand')
+    record(game_state, STAND, player['id'] - 1)
+    
+    # Player stands
+    game_state['message'] = f'{player["name"]} stands.'
+    next_message = end_hand(game_state, player)
+    game_state['message'] += next_message
+    
+    return {
+        'success': True,
+        'gameState': format_game_state(game_state)
+    }
+
+def double_down(game_state, data):
+    """Double the active player's bet and deal exactly one card."""
+    if game_state['gamePhase'] != 'playing':
+        return {'success': False, 'message': 'Not in playing phase'}
+    
+    player = get_active_player(game_state, data)
+    if not player:
+        return {'success': False, 'message': 'Invalid player or not active'}
+    
+    if not can_double_down(player, game_state['rules']):
+        return {'success': False, 'message': 'Cannot double down - insufficient balance or invalid timing'}
+    
+    score_decision(game_state, player, 'double')
+    
+    new_card = double_hand(game_state, player)
+    player['total'] = player['hand'].total
+    
+    if player['total'] > 21:
+        game_state['message'] = f'{player["name"]} doubled down and busted!'
+    else:
+        game_state['message'] = f'{player["name"]} doubled down and drew {card_name(new_card)}.'
+    
+    next_message = end_hand(game_state, player)
+    game_state['message'] += next_message
+    
+    return {
+        'success': True,
+        'gameState': format_game_state(game_state)
+    }
+
+def split_hand(game_state, data):
+    """Split the active player's pair into two hands with equal bets."""
+    if game_state['gamePhase'] != 'playing':
+        return {'success': False, 'message': 'Not in playing phase'}
+    
+    player = get_active_player(game_state, data)
+    if not player:
+        return {'success': False, 'message': 'Invalid player or not active'}
+    
+    if not can_split(player):
+        return {'success': False, 'message': 'Cannot split - not a pair, insufficient balance or too many hands'}
+    
+    score_decision(game_state, player, 'split')
+    
+    pair = player['hand']
+    game_state['message'] = f'{player["name"]} splits {card_name(pair[0])} and {card_name(pair[1])}.'
+    
+    if split_current_hand(game_state, player):
+        # Split aces get one card each and the seat's turn moves past both
+        next_message = end_hand(game_state, player)
+        game_state['message'] += next_message
+    else:
+        update_options(game_state, player)
+        game_state['message'] += f' {player["name"]}, play hand {player["handIndex"] + 1} of {len(player["hands"])}.'
+    
+    return {
+        'success': True,
+        'gameState': format_game_state(game_state)
+    }
+
+def take_insurance(game_state, data):
+    """Insure the active player's hand against a dealer blackjack for half its bet."""
+    if game_state['gamePhase'] != 'playing':
+        return {'success': False, 'message': 'Not in playing phase'}
+    
+    player = get_active_player(game_state, data)
+    if not player:
+        return {'success': False, 'message': 'Invalid player or not active'}
+    
+    if not can_insure(game_state, player):
+        return {'success': False, 'message': 'Insurance is only offered against a dealer Ace before the first decision'}
+    
+    insure_hand(game_state, player)
+    update_options(game_state, player)
+    game_state['message'] = f'{player["name"]} takes insurance for {player["insurance"]}. Choose your action.'
+    
+    return {
+        'success': True,
+        'gameState': format_game_state(game_state)
+    }
+
+def hint(game_state, data):
+    """Basic-strategy advice for the active player."""
+    if game_state['gamePhase'] != 'playing':
+        return {'success': False, 'message': 'Not in playing phase'}
+    
+    player = get_active_player(game_state, data)
+    if not player:
+        return {'success': False, 'message': 'Invalid player or not active'}
+    
+    action, evs = basic_strategy(game_state, player)
+    return {
+        'success': True,
+        'action': action,
+        'ev': evs
+    }
+
+def exact_hint(game_state, data):
+    """Exact action EVs for the active player given the cards not yet seen."""
+    if game_state['gamePhase'] != 'playing':
+        return {'success': False, 'message': 'Not in playing phase'}
+    
+    player = get_active_player(game_state, data)
+    if not player:
+        return {'success': False, 'message': 'Invalid player or not active'}
+    
+    from exact_ev import unseen_composition
+    counts = unseen_composition(game_state)
+    calculator = ev_calculator_for(game_state['rules'])
+    action, evs = calculator.best_action(counts, player['hand'], game_state['dealerHand'][0],
+                                         can_double_down(player, game_state['rules']))
+    return {
+        'success': True,
+        'action': action,
+        'ev': evs,
+        'cardsUnseen': sum(counts)
+    }
+
+def next_round(game_state, data):
+    """Reset hands and bets for the next round."""
+    if game_state['gamePhase'] != 'results':
+        return {'success': False, 'message': 'Not in results phase'}
+    
+    # Reset for next round
+    game_state['round'] += 1
+    game_state['dealerHand'] = Hand()
+    game_state['dealerTotal'] = 0
+    game_state['gamePhase'] = 'betting'
+    game_state['currentPlayerIndex'] = 0
+    
+    for player in game_state['players']:
+        player['hand'] = SeatHand()
+        player['hands'] = []
+        player['handIndex'] = 0
+        player['total'] = 0
+        player['bet'] = 0
+        player['insurance'] = 0
+        player['canDoubleDown'] = False
+        player['canSplit'] = False
+        player['canInsure'] = False
+        player['isActive'] = False
+        player['isFinished'] = False
+        player['winner'] = None
+    
+    # Check if players have money left
+    active_players = [p for p in game_state['players'] if p['balance'] > 0]
+    if len(active_players) == 0:
+        game_state['gamePhase'] = 'finished'
+        game_state['message'] = 'Game over! All players are out of money.'
+    else:
+        game_state['players'][0]['isActive'] = True
+        game_state['message'] = f'{game_state["players"][0]["name"]}, place your bet!'
+    
+    return {
+        'success': True,
+        'gameState': format_game_state(game_state)
+    }
+
+def count_stats(game_state, data):
+    """Running and true counts for the shoe and how each seat's bets follow them."""
+    return {
+        'success': True,
+        'count': count_tracker(game_state).to_dict()
+    }
+
+def get_state(game_state, data):
+    """Current state of the table."""
+    return {
+        'success': True,
+        'gameState': format_game_state(game_state)
+    }
+
+# Table actions by /api/<name> route: (handler, whether a success changes the state)
+ACTIONS = {
+    'bet': (place_bet, True),
+    'hit': (hit, True),
+    'stand': (stand, True),
+    'double': (double_down, True),
+    'split': (split_hand, True),
+    'insurance': (take_insurance, True),
+    'next-round': (next_round, True),
+    'hint': (hint, False),
+    'exact-hint': (exact_hint, False),
+    'count': (count_stats, False),
+    'state': (get_state, False),
+}
@@ -0,0 +1,182 @@
+"""Server-Sent Events fan-out of game state changes.
+
+Each subscriber first receives a full ``snapshot`` event, then ``delta``
+events holding only what changed since the last state it was sent. Every
+subscriber keeps its own diff base, so one joining mid-game never changes
+what the others are sent. Subscribers sent the same state share one
+serialized event per publish.
+The hub lives in one process, so subscribers only see tables served by the
+same worker; router.py sends every request for a table, streams included,
+to the worker that owns it.
+"""
+import asyncio
+import json
+import queue
+import threading
+
+KEEPALIVE_SECONDS = 15
+MAX_PENDING_EVENTS = 256
+
+
+def diff_state(old, new):
+    """Fields of ``new`` that differ from ``old``.
+
+    Players are diffed per seat as ``{'players': {index: {field: value}}}``;
+    the whole list is sent when the number of seats changes.
+    """
+    delta = {}
+    for key, value in new.items():
+        if key == 'players' and len(value) == len(old.get('players', ())):
+            seats = {}
+            for index, (old_player, player) in enumerate(zip(old['players'], value)):
+                changed = {k: v for k, v in player.items() if old_player.get(k) != v}
+                if changed:
+                    seats[str(index)] = changed
+            if seats:
+                delta['players'] = seats
+        elif old.get(key) != value:
+            delta[key] = value
+    return delta
+
+
+def format_event(event, data, seq):
+    """Encode one Server-Sent Event."""
+    return f'id: {seq}\nevent: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+class AsyncSubscriber:
+    """Events for a subscriber awaiting them on an asyncio event loop.
+
+    Publishers may run on any thread: events are handed to the loop with
+    ``call_soon_threadsafe``, so no thread waits on behalf of the subscriber.
+    Like a bounded ``queue.Queue``, ``put_nowait`` raises ``queue.Full`` once
+    MAX_PENDING_EVENTS are waiting. The publisher and the loop each bump
+    only their own counter, so the pending count needs no lock.
+    """
+
+    def __init__(self, loop, maxsize=MAX_PENDING_EVENTS):
+        self.loop = loop
+        self.maxsize = maxsize
+        self.events = asyncio.Queue()
+        self.sent = 0
+        self.received = 0
+
+    def put_nowait(self, event):
+        if self.sent - self.received >= self.maxsize:
+            raise queue.Full
+        self.sent += 1
+        try:
+            self.loop.call_soon_threadsafe(self.events.put_nowait, event)
+        except RuntimeError:
+            # The loop has closed; its stream is gone and will unsubscribe
+            pass
+
+    def close(self):
+        """End the feed; safe from any thread, and the events still waiting are skipped."""
+        try:
+            self.loop.call_soon_threadsafe(self._close)
+        except RuntimeError:
+            pass
+
+    def _close(self):
+        while not self.events.empty():
+            self.events.get_nowait()
+        self.events.put_nowait(None)
+
+    async def get(self, timeout):
+        """The next event, None once the feed has ended; raises TimeoutError after ``timeout`` seconds."""
+        event = await asyncio.wait_for(self.events.get(), timeout)
+        self.received += 1
+        return event
+
+
+class _Channel:
+    __slots__ = ('subscribers', 'seq')
+
+    def __init__(self):
+        self.subscribers = {}  # subscriber -> the last state it was sent
+        self.seq = 0
+
+
+class Broadcaster:
+    """Publishes formatted game states to the subscribers of each table."""
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def has_subscribers(self, table_id):
+        return table_id in self._channels
+
+    def subscribe(self, table_id, state, loop=None):
+        """Register a subscriber and return (subscriber, snapshot event).
+
+        The subscriber is a ``queue.Queue``, or an ``AsyncSubscriber`` for a
+        consumer on the asyncio event loop ``loop``.
+        """
+        subscriber = queue.Queue(MAX_PENDING_EVENTS) if loop is None else AsyncSubscriber(loop)
+        with self._lock:
+            channel = self._channels.get(table_id)
+            if channel is None:
+                channel = self._channels[table_id] = _Channel()
+            channel.subscribers[subscriber] = state
+            snapshot = format_event('snapshot', state, channel.seq)
+        return subscriber, snapshot
+
+    def unsubscribe(self, table_id, subscriber):
+        with self._lock:
+            channel = self._channels.get(table_id)
+            if channel is None:
+                return
+            channel.subscribers.pop(subscriber, None)
+            if not channel.subscribers:
+                del self._channels[table_id]
+
+    def publish(self, table_id, state):
+        """Send each subscriber the delta between the last state it was sent and ``state``."""
+        with self._lock:
+            channel = self._channels.get(table_id)
+            if channel is None:
+                return
+            seq = channel.seq + 1
+            # Delta event (None when nothing changed) per diff base; the list
+            # keeps every base alive, so their ids stay distinct
+            events = {}
+            for subscriber, base in list(channel.subscribers.items()):
+                if id(base) not in events:
+                    delta = diff_state(base, state)
+                    events[id(base)] = format_event('delta', delta, seq) if delta else None
+                event = events[id(base)]
+                channel.subscribers[subscriber] = state
+                if event is None:
+                    continue
+                channel.seq = seq
+                try:
+                    subscriber.put_nowait(event)
+                except queue.Full:
+                    # A stalled client is dropped; it can reconnect for a fresh snapshot.
+                    del channel.subscribers[subscriber]
+                    if isinstance(subscriber, AsyncSubscriber):
+                        subscriber.close()
+                    else:
+                        with subscriber.mutex:
+                            subscriber.queue.clear()
+                        subscriber.put_nowait(None)
+            if not channel.subscribers:
+                del self._channels[table_id]
+
+    def stream(self, table_id, subscriber, snapshot):
+        """Generator of SSE text for a subscriber from ``subscribe``; unsubscribes when closed."""
+        try:
+            yield snapshot
+            while True:
+                try:
+                    event = subscriber.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            self.unsubscribe(table_id, subscriber)
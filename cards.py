@@ -0,0 +1,150 @@
+"""Compact card representation shared by game.py and app.py.
+
+A card is a small int in ``range(52)``: ``suit * 13 + rank``, where rank 0 is
+'2' and rank 12 is 'Ace'. Point values and display names are precomputed per
+card so the hot path is a tuple lookup instead of string parsing.
+"""
+
+SUITS = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
+VALUES = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace']
+RANK_POINTS = (2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11)
+ACE = 12
+DECK_SIZE = len(SUITS) * len(VALUES)
+
+CARD_POINTS = tuple(RANK_POINTS[card % 13] for card in range(DECK_SIZE))
+CARD_HARD_POINTS = tuple(1 if card % 13 == ACE else RANK_POINTS[card % 13] for card in range(DECK_SIZE))
+CARD_IS_ACE = tuple(int(card % 13 == ACE) for card in range(DECK_SIZE))
+_CARD_DICTS = tuple({'value': VALUES[card % 13], 'suit': SUITS[card // 13]} for card in range(DECK_SIZE))
+
+
+def make_card(value, suit):
+    """Encode a card from its value and suit names."""
+    return SUITS.index(suit) * 13 + VALUES.index(value)
+
+
+def card_rank(card):
+    """Rank code (0 for '2' through 12 for 'Ace') of a card."""
+    return card % 13
+
+
+def card_name(card):
+    """Human readable name, e.g. 'Ace of Spades'."""
+    card_dict = _CARD_DICTS[card]
+    return f"{card_dict['value']} of {card_dict['suit']}"
+
+
+def card_to_dict(card):
+    """Convert a card to the {'value', 'suit'} dict sent to the client."""
+    return _CARD_DICTS[card]
+
+
+def hand_to_dicts(hand):
+    """Convert a hand of cards to the client's list of dicts."""
+    return [_CARD_DICTS[card] for card in hand]
+
+
+def create_deck():
+    """Create a deck of cards."""
+    return list(range(DECK_SIZE))
+
+
+def calculate_hand(hand):
+    """Calculate the total value of a hand."""
+    total = 0
+    aces = 0
+    for card in hand:
+        total += CARD_POINTS[card]
+        aces += CARD_IS_ACE[card]
+    while total > 21 and aces:
+        total -= 10
+        aces -= 1
+    return total
+
+
+class Hand:
+    """Cards in a hand with running totals updated in O(1) per card.
+
+    ``hard`` counts every ace as 1; at most one ace can ever count as 11, so
+    the best total is ``hard + 10`` whenever an ace is held and that fits.
+    """
+
+    __slots__ = ('cards', 'hard', 'aces')
+
+    def __init__(self, cards=()):
+        self.cards = []
+        self.hard = 0
+        self.aces = 0
+        for card in cards:
+            self.append(card)
+
+    def append(self, card):
+        """Add a card and update the running totals."""
+        self.cards.append(card)
+        self.hard += CARD_HARD_POINTS[card]
+        self.aces += CARD_IS_ACE[card]
+
+    @property
+    def is_soft(self):
+        """True when an ace is currently counted as 11."""
+        return self.aces > 0 and self.hard <= 11
+
+    @property
+    def total(self):
+        """Best total of the hand."""
+        return self.hard + 10 if self.aces and self.hard <= 11 else self.hard
+
+    @property
+    def is_blackjack(self):
+        """True for a two-card 21."""
+        return len(self.cards) == 2 and self.total == 21
+
+    @property
+    def is_bust(self):
+        """True when the hand is over 21."""
+        return self.hard > 21
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __getitem__(self, index):
+        return self.cards[index]
+
+    def __repr__(self):
+        return f'Hand({self.cards!r})'
+
+
+class SeatHand(Hand):
+    """A player's hand with its own wager; a seat holds several after a split.
+
+    ``split`` marks hands made by splitting a pair: a two-card 21 on one is
+    not a blackjack. ``outcome`` is set once the hand is settled.
+    """
+
+    __slots__ = ('bet', 'split', 'outcome')
+
+    def __init__(self, cards=(), bet=0, split=False):
+        super().__init__(cards)
+        self.bet = bet
+        self.split = split
+        self.outcome = None
+
+    @property
+    def is_blackjack(self):
+        """True for a two-card 21 that did not come from a split."""
+        return not self.split and len(self.cards) == 2 and self.total == 21
+
+    @property
+    def is_pair(self):
+        """True for two cards of the same point value, which may be split."""
+        return len(self.cards) == 2 and CARD_POINTS[self.cards[0]] == CARD_POINTS[self.cards[1]]
+
+    def split_pair(self, first_card, second_card):
+        """The two hands made by splitting this pair, completed with the given cards."""
+        return (SeatHand([self.cards[0], first_card], self.bet, split=True),
+                SeatHand([self.cards[1], second_card], self.bet, split=True))
+
+    def __repr__(self):
+        return f'SeatHand({self.cards!r}, bet={self.bet})'
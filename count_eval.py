@@ -0,0 +1,213 @@
+"""Edge and risk of ruin of card-counting bet ramps, simulated shoe by shoe.
+
+A batch of shoes is shuffled at once, one row of composition slots (the
+slots of sweep.py) per shoe, and dealt from a cursor per row round after
+round until the cut card. Every round, each row still in play is played with
+basic strategy by ``sweep.play_hands``. Counting changes what is bet but not
+how hands are played here, so one simulation serves every system: a
+system's ramp turns its count at the start of the round into a number of
+units and the round's result scales with it. Running counts are prefix sums
+of the tags along each row, so reading one is an index.
+
+    python count_eval.py --shoes 200000 --decks 6 --workers 8
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from counting import CARDS_PER_DECK, SYSTEMS, initial_running_count
+from rules import DEFAULT_RULES, parse_payout, rules_to_dict
+from sweep import Z_95, play_hands, strategy_arrays
+
+# Composition slots in a deck: 2-9 four times, sixteen tens and four aces
+DECK_SLOTS = np.repeat(np.arange(10, dtype=np.int8), [4] * 8 + [16, 4])
+
+# Each system's tag per composition slot; the ten slot takes the tag of '10'
+SLOT_TAGS = np.array([system.tags[:9] + system.tags[12:] for system in SYSTEMS], dtype=np.int8)
+
+# Bet units from a count up: (count, units) steps, one unit below the first
+DEFAULT_RAMPS = {
+    'hi-lo': ((2, 2), (3, 4), (4, 8), (5, 12)),
+    'ko': ((2, 2), (3, 4), (4, 8), (5, 12)),
+    'omega-ii': ((4, 2), (6, 4), (8, 8), (10, 12)),
+}
+DEFAULT_BANKROLL = 1000
+FLAT = 'flat'
+
+
+def parse_ramp(value):
+    """((count, units), ...) from '2:2,3:4,4:8'; raises ValueError."""
+    steps = []
+    for step in value.split(','):
+        count, units = step.split(':')
+        steps.append((int(count), int(units)))
+    if not steps or [count for count, _ in steps] != sorted({count for count, _ in steps}):
+        raise ValueError('ramp counts must increase, e.g. "2:2,3:4,4:8"')
+    if any(units < 0 for _, units in steps):
+        raise ValueError('ramp units must not be negative')
+    return tuple(steps)
+
+
+def ramp_units(ramp, counts):
+    """Units bet at each count; counts between steps round down."""
+    thresholds = np.array([count for count, _ in ramp])
+    units = np.array([1] + [units for _, units in ramp], dtype=np.int64)
+    return units[np.searchsorted(thresholds, np.floor(counts), side='right')]
+
+
+def play_shoes(shoes, decks, penetration, rules, strategy, ramps, rng, bet=10):
+    """Deal ``shoes`` shoes to the cut card; returns per-ramp [units bet, units won, squared] sums and rounds.
+
+    The last row of the sums is flat betting, one unit a round.
+    """
+    cards = decks * CARDS_PER_DECK
+    cut = int(cards * penetration)
+    rows = rng.permuted(np.tile(np.tile(DECK_SLOTS, decks), (shoes, 1)), axis=1)
+    # A spare deck per row stands in for the reshuffle if a round outlasts the shoe
+    rows = np.hstack([rows, rng.permuted(np.tile(DECK_SLOTS, (shoes, 1)), axis=1)])
+    running = np.zeros((len(SYSTEMS), shoes, cut + 1), dtype=np.int16)
+    np.cumsum(SLOT_TAGS[:, rows[:, :cut]], axis=2, out=running[:, :, 1:])
+    running += np.array([initial_running_count(system, decks) for system in SYSTEMS],
+                        dtype=np.int16)[:, None, None]
+    balanced = np.array([system.balanced for system in SYSTEMS])
+
+    sums = np.zeros((len(SYSTEMS) + 1, 3))
+    pos = np.zeros(shoes, dtype=np.intp)
+    active = np.arange(shoes)
+    played = 0
+    while active.size:
+        start = pos[active]
+        decks_remaining = (cards - start) / CARDS_PER_DECK
+        counts = running[:, active, start].astype(np.float64)
+        counts[balanced] /= decks_remaining
+
+        def deal(index, active=active):
+            shoe_rows = active[index]
+            slots = rows[shoe_rows, pos[shoe_rows]]
+            pos[shoe_rows] += 1
+            return slots
+
+        won = play_hands(active.size, rules, strategy, deal, bet) / bet
+        for i, ramp in enumerate(ramps):
+            units = ramp_units(ramp, counts[i])
+            result = units * won
+            sums[i] += units.sum(), result.sum(), (result * result).sum()
+        sums[-1] += active.size, won.sum(), (won * won).sum()
+        played += active.size
+        active = active[pos[active] < cut]
+    return sums, played
+
+
+def _play_shoes(args):
+    return play_shoes(*args[:-1], np.random.default_rng(args[-1]))
+
+
+def evaluate(shoes, decks=6, penetration=0.75, rules=DEFAULT_RULES, ramps=None, bankroll=DEFAULT_BANKROLL,
+             seed=0, batch_shoes=10_000, workers=1):
+    """Simulate ``shoes`` shoes and report each system's edge and risk of ruin with its ramp.
+
+    Batches get independent RNG streams spawned from ``seed``.
+    """
+    start = time.perf_counter()
+    ramps = dict(DEFAULT_RAMPS, **(ramps or {}))
+    ordered = [ramps[system.name] for system in SYSTEMS]
+    strategy = strategy_arrays(decks, rules)
+    sizes = [min(batch_shoes, shoes - done) for done in range(0, shoes, batch_shoes)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(size, decks, penetration, rules, strategy, ordered, batch_seed)
+            for size, batch_seed in zip(sizes, seeds)]
+    if workers == 1:
+        results = [_play_shoes(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_play_shoes, jobs))
+    sums = sum(batch_sums for batch_sums, _ in results)
+    rounds = sum(played for _, played in results)
+
+    systems = []
+    for name, ramp, (units, won, squared) in zip([system.name for system in SYSTEMS] + [FLAT],
+                                                 ordered + [()], sums):
+        mean = won / rounds
+        variance = squared / rounds - mean * mean
+        edge = won / units
+        margin = Z_95 * (variance / rounds) ** 0.5 * rounds / units
+        # Diffusion approximation of the chance of ever losing the bankroll, playing on indefinitely
+        ruin = float(np.exp(-2 * mean * bankroll / variance)) if mean > 0 else 1.0
+        systems.append({
+            'system': name,
+            'ramp': [list(step) for step in ramp],
+            'averageBet': units / rounds,
+            'playerEdge': edge,
+            'ci95': [edge - margin, edge + margin],
+            'unitsPer100': 100 * mean,
+            'stdDevPerRound': variance ** 0.5,
+            'riskOfRuin': ruin,
+        })
+    return {
+        'rules': rules_to_dict(rules),
+        'decks': decks,
+        'penetration': penetration,
+        'shoes': shoes,
+        'rounds': rounds,
+        'bankrollUnits': bankroll,
+        'systems': systems,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def format_table(report):
+    lines = [f'{"system":>9} {"avg bet":>7} {"edge %":>7} {"95% CI %":>17} {"units/100":>9} {"SD":>6} {"RoR %":>7}']
+    for result in report['systems']:
+        low, high = result['ci95']
+        lines.append(f'{result["system"]:>9} {result["averageBet"]:>7.2f} {100 * result["playerEdge"]:>7.3f} '
+                     f'{100 * low:>8.3f} {100 * high:>8.3f} {result["unitsPer100"]:>9.2f} '
+                     f'{result["stdDevPerRound"]:>6.2f} {100 * result["riskOfRuin"]:>7.2f}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Edge and risk of ruin of card-counting bet ramps.')
+    parser.add_argument('--shoes', type=int, default=100_000)
+    parser.add_argument('--decks', type=int, default=6)
+    parser.add_argument('--penetration', type=float, default=0.75, help='share of the shoe dealt before the cut card')
+    parser.add_argument('--payout', default='3:2', help='blackjack payout')
+    parser.add_argument('--dealer', choices=['S17', 'H17'], default='S17')
+    parser.add_argument('--das', choices=['yes', 'no'], default='yes', help='whether doubling after a split is allowed')
+    parser.add_argument('--ramp', action='append', default=[], metavar='SYSTEM=COUNT:UNITS,...',
+                        help='bet ramp for a system, e.g. hi-lo=1:2,2:4,3:8 (repeatable)')
+    parser.add_argument('--bankroll', type=float, default=DEFAULT_BANKROLL, help='bankroll in betting units')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch', type=int, default=10_000, help='shoes per batch')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', help='also write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    if not 0 < args.penetration <= 1:
+        parser.error('--penetration must be in (0, 1]')
+    ramps = {}
+    for value in args.ramp:
+        name, _, steps = value.partition('=')
+        if name not in DEFAULT_RAMPS:
+            parser.error(f'unknown system {name!r}; choose from {", ".join(DEFAULT_RAMPS)}')
+        try:
+            ramps[name] = parse_ramp(steps)
+        except ValueError as e:
+            parser.error(f'--ramp {value}: {e}')
+    rules = DEFAULT_RULES._replace(blackjack_payout=parse_payout(args.payout),
+                                   dealer_hits_soft_17=args.dealer == 'H17', double_after_split=args.das == 'yes')
+
+    report = evaluate(args.shoes, args.decks, args.penetration, rules, ramps, args.bankroll, args.seed,
+                      args.batch, args.workers)
+    print(format_table(report))
+    print(f'{report["shoes"]} shoes, {report["rounds"]} rounds in {report["seconds"]:.1f}s')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
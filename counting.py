@@ -0,0 +1,149 @@
+"""Running and true counts of card-counting systems, kept per table.
+
+Each table carries a ``CountTracker`` (``game_state['count']``) that sees
+every card as it is shown: the engine passes it each card it deals, except
+the dealer's hole card, which is counted when ``dealer_play`` turns it over.
+A card costs one tuple lookup and an addition per system, and the counts
+start again whenever the shoe is reshuffled.
+
+The tracker also keeps, per seat, running sums of each bet against the true
+count when it was placed. A seat whose bets correlate with the count over
+enough rounds is flagged, which is what a counter's bet ramp looks like;
+``count_eval.py`` measures what such ramps are worth.
+"""
+import math
+from collections import namedtuple
+
+from cards import DECK_SIZE
+
+# Tags by rank code ('2' through 'Ace'). Balanced systems sum to zero over a
+# deck and are converted to a true count; KO is unbalanced and bets on the
+# running count, started at 4 - 4 * decks so that +4 is its pivot.
+System = namedtuple('System', 'name tags balanced')
+
+SYSTEMS = (
+    System('hi-lo', (1, 1, 1, 1, 1, 0, 0, 0, -1, -1, -1, -1, -1), True),
+    System('ko', (1, 1, 1, 1, 1, 1, 0, 0, -1, -1, -1, -1, -1), False),
+    System('omega-ii', (1, 1, 2, 2, 2, 1, 0, -1, -2, -2, -2, -2, 0), True),
+)
+SYSTEM_NAMES = tuple(system.name for system in SYSTEMS)
+
+# Every system's tag for each card, so counting a card is one lookup
+CARD_TAGS = tuple(tuple(system.tags[card % 13] for system in SYSTEMS) for card in range(DECK_SIZE))
+BALANCED = tuple(system.balanced for system in SYSTEMS)
+
+CARDS_PER_DECK = 52
+
+# A seat is flagged once this many of its bets correlate with some system's count at least this strongly
+MIN_FLAG_BETS = 50
+FLAG_CORRELATION = 0.5
+
+
+def initial_running_count(system, decks):
+    """Running count off the top of a fresh shoe."""
+    return 0 if system.balanced else 4 - 4 * decks
+
+
+def betting_count(system, running, decks_remaining):
+    """The count a system sizes bets by: the true count, or KO's running count."""
+    return running / decks_remaining if system.balanced else running
+
+
+def correlation(n, sum_x, sum_y, sum_xx, sum_yy, sum_xy):
+    """Pearson correlation from running sums; 0.0 while either side is constant."""
+    spread = (n * sum_xx - sum_x * sum_x) * (n * sum_yy - sum_y * sum_y)
+    if spread <= 0:
+        return 0.0
+    return (n * sum_xy - sum_x * sum_y) / math.sqrt(spread)
+
+
+class CountTracker:
+    """Running counts of every system for one table's shoe, plus per-seat bet statistics."""
+
+    __slots__ = ('decks', 'seen', 'running', 'bets', 'flagged')
+
+    def __init__(self, decks):
+        self.decks = decks
+        # seat -> [bets, sum of bets, sum of squared bets] followed by, per
+        # system, the sums of counts, squared counts and bet * count
+        self.bets = {}
+        self.flagged = set()
+        self.reset()
+
+    def reset(self):
+        """Start counting a freshly shuffled shoe."""
+        self.seen = 0
+        self.running = [initial_running_count(system, self.decks) for system in SYSTEMS]
+
+    def observe(self, card):
+        """Count one card that has been shown."""
+        self.seen += 1
+        # Updated in place, one line per system in SYSTEMS: this runs for every card dealt
+        running = self.running
+        hi_lo, ko, omega_ii = CARD_TAGS[card]
+        running[0] += hi_lo
+        running[1] += ko
+        running[2] += omega_ii
+
+    @property
+    def decks_remaining(self):
+        """Decks not yet seen, including a hole card still face down (at least one card's worth)."""
+        unseen = self.decks * CARDS_PER_DECK - self.seen
+        return (unseen if unseen > 1 else 1) / CARDS_PER_DECK
+
+    def betting_counts(self):
+        """Each system's betting count at this point in the shoe."""
+        decks_remaining = self.decks_remaining
+        return [running / decks_remaining if balanced else running
+                for balanced, running in zip(BALANCED, self.running)]
+
+    def observe_bet(self, seat, bet):
+        """Add a bet to the seat's statistics; returns True if this bet gets the seat flagged."""
+        sums = self.bets.get(seat)
+        if sums is None:
+            sums = self.bets[seat] = [0] * (3 + 3 * len(SYSTEMS))
+        sums[0] += 1
+        sums[1] += bet
+        sums[2] += bet * bet
+        decks_remaining = self.decks_remaining
+        base = 3
+        for balanced, running in zip(BALANCED, self.running):
+            count = running / decks_remaining if balanced else running
+            sums[base] += count
+            sums[base + 1] += count * count
+            sums[base + 2] += bet * count
+            base += 3
+        if seat in self.flagged or sums[0] < MIN_FLAG_BETS:
+            return False
+        if sums[0] * sums[2] == sums[1] * sums[1]:
+            # Every bet has been the same size, which follows no count
+            return False
+        if max(self.correlations(seat)) >= FLAG_CORRELATION:
+            self.flagged.add(seat)
+            return True
+        return False
+
+    def correlations(self, seat):
+        """Correlation of the seat's bets with each system's count."""
+        sums = self.bets.get(seat)
+        if sums is None:
+            return [0.0] * len(SYSTEMS)
+        n, sum_bets, sum_squares = sums[:3]
+        return [correlation(n, sum_bets, sums[base], sum_squares, sums[base + 1], sums[base + 2])
+                for base in range(3, len(sums), 3)]
+
+    def to_dict(self):
+        """JSON form of the counts and of each seat's bet statistics."""
+        decks_remaining = self.decks_remaining
+        return {
+            'cardsSeen': self.seen,
+            'decksRemaining': decks_remaining,
+            'systems': {system.name: {'running': running,
+                                      'betting': betting_count(system, running, decks_remaining)}
+                        for system, running in zip(SYSTEMS, self.running)},
+            'seats': [{'seat': seat + 1, 'bets': sums[0],
+                       'correlation': dict(zip(SYSTEM_NAMES, self.correlations(seat))),
+                       'flagged': seat in self.flagged}
+                      for seat, sums in sorted(self.bets.items())],
+            'flagged': bool(self.flagged),
+        }
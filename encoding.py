@@ -0,0 +1,25 @@
+"""JSON encoding for API responses.
+
+Uses orjson when it is installed, which encodes game states several times
+faster than the standard library, and falls back to ``json`` otherwise.
+"""
+import json
+import time
+
+from metrics import SERIALIZATION_SECONDS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(payload):
+    """Encode a response body as compact UTF-8 JSON bytes, timing the encoding."""
+    start = time.perf_counter()
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, separators=(',', ':')).encode()
+    SERIALIZATION_SECONDS.observe(time.perf_counter() - start)
+    return body
@@ -0,0 +1,264 @@
+"""Composition-dependent expected values for hit, stand and double.
+
+The basic-strategy tables in strategy.py assume a full shoe. This module
+answers the same question for the cards actually left: the unseen cards
+(the shoe past its cursor plus the dealer's hole card) become a rank-count
+vector over the ten point slots, and both the player's draws and the
+dealer's are taken from that vector exactly.
+
+A dealer outcome depends only on which cards the dealer draws, not their
+order, and every order of the same cards is equally likely. So each upcard
+has a fixed list of possible draw multisets (about two thousand at most),
+and the distribution for any composition is one vectorized product of
+falling factorials over that list. Distributions are memoized by
+composition in a bounded least-recently-used cache shared across queries,
+so successive decisions from the same shoe reuse most of the work.
+"""
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from cards import CARD_POINTS
+from strategy import ACE_SLOT, DEALER_OUTCOMES, HARD_VALUES, card_slot, stand_ev
+
+DEFAULT_CACHE_SIZE = 200_000
+DEFAULT_BATCH_SIZE = 128  # compositions per vectorized dealer computation
+
+# Composition slot (2-9, ten-valued, ace) of every card id
+CARD_SLOTS = tuple(card_slot(points) for points in CARD_POINTS)
+
+
+class DistributionCache(OrderedDict):
+    """Dealer distributions keyed by (composition, upcard slot), LRU-evicted."""
+
+    def __init__(self, capacity=DEFAULT_CACHE_SIZE):
+        super().__init__()
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        value = super().get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if len(self) > self.capacity:
+            self.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            'size': len(self),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+def composition(cards):
+    """Rank-count vector (2-9, ten-valued, ace) of an iterable of card ids."""
+    counts = [0] * 10
+    for card in cards:
+        counts[CARD_SLOTS[card]] += 1
+    return tuple(counts)
+
+
+def unseen_composition(game_state):
+    """Cards the player cannot see: the undealt shoe plus the dealer's hole card."""
+    shoe = game_state['shoe']
+    counts = list(composition(shoe.cards[shoe.cursor:]))
+    dealer_hand = game_state['dealerHand']
+    if len(dealer_hand) > 1:
+        counts[CARD_SLOTS[dealer_hand[1]]] += 1
+    return tuple(counts)
+
+
+def _soft_total(hard, has_ace):
+    return hard + 10 if has_ace and hard <= 11 else hard
+
+
+class DealerHands:
+    """Every multiset of cards the dealer can draw behind one upcard.
+
+    For multiset ``i``, ``orders[i]`` is how many draw orders reach it (orders
+    that would have stopped earlier are excluded) and row ``i`` of
+    ``outcome_matrix`` marks its outcome in DEALER_OUTCOMES. ``factors[:, i]`` indexes the falling factorials
+    ``counts[slot] * (counts[slot] - 1) * ...`` it needs in the flattened
+    (slot, cards drawn) table built by ``distribution``; unused entries point
+    at the table's constant 1.
+    """
+
+    def __init__(self, upcard_slot, hits_soft_17=False):
+        self.hits_soft_17 = hits_soft_17
+        orders = Counter()
+        self._walk(HARD_VALUES[upcard_slot], upcard_slot == ACE_SLOT, [], orders)
+        multisets = list(orders)
+        self.max_draws = max(map(len, multisets))
+        self.steps = np.arange(self.max_draws)
+        self.lengths = np.array([len(m) for m in multisets], dtype=np.intp)
+        self.orders = np.array([orders[m] for m in multisets], dtype=np.float64)
+        outcomes = [self._outcome(upcard_slot, m) for m in multisets]
+        self.outcome_matrix = np.zeros((len(multisets), len(DEALER_OUTCOMES)))
+        self.outcome_matrix[np.arange(len(multisets)), outcomes] = 1.0
+
+        width = max(len(set(m)) for m in multisets)
+        self.factors = np.zeros((width, len(multisets)), dtype=np.intp)
+        for i, multiset in enumerate(multisets):
+            for row, (slot, drawn) in enumerate(Counter(multiset).items()):
+                self.factors[row, i] = slot * (self.max_draws + 1) + drawn
+
+    def _walk(self, hard, has_ace, path, orders):
+        total = _soft_total(hard, has_ace)
+        if total >= 17 and not (self.hits_soft_17 and total == 17 and has_ace and hard == 7):
+            orders[tuple(sorted(path))] += 1
+            return
+        for slot in range(10):
+            path.append(slot)
+            self._walk(hard + HARD_VALUES[slot], has_ace or slot == ACE_SLOT, path, orders)
+            path.pop()
+
+    @staticmethod
+    def _outcome(upcard_slot, multiset):
+        hard = HARD_VALUES[upcard_slot] + sum(HARD_VALUES[slot] for slot in multiset)
+        total = _soft_total(hard, upcard_slot == ACE_SLOT or ACE_SLOT in multiset)
+        return total - 17 if total <= 21 else len(DEALER_OUTCOMES) - 1
+
+    def distributions(self, counts):
+        """Dealer outcome probabilities for each row of an (n, 10) array of compositions."""
+        counts = np.asarray(counts, dtype=np.float64)
+        available = np.maximum(counts[:, :, None] - self.steps, 0)
+        falling = np.ones((len(counts), 10, self.max_draws + 1))
+        falling[:, :, 1:] = np.cumprod(available, axis=2)
+        ways = falling.reshape(len(counts), -1)[:, self.factors].prod(axis=1)
+
+        remaining = np.ones((len(counts), self.max_draws + 1))
+        remaining[:, 1:] = np.cumprod(np.maximum(counts.sum(axis=1)[:, None] - self.steps, 0), axis=1)
+        sequences = remaining[:, self.lengths]
+        p = self.orders * ways / np.where(sequences > 0, sequences, 1)
+        dist = p @ self.outcome_matrix
+        # Nearly empty shoes cannot complete every hand; renormalize over those that can.
+        total = dist.sum(axis=1, keepdims=True)
+        return dist / np.where(total > 0, total, 1)
+
+
+class ExactEVCalculator:
+    """Exact per-unit EVs of each action for a hand against an upcard and a composition.
+
+    A query first walks the player's decision tree to collect every
+    composition the player could stand on, computes the uncached dealer
+    distributions for them in batches, then evaluates the tree.
+    """
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, batch_size=DEFAULT_BATCH_SIZE, hits_soft_17=False):
+        self.cache = DistributionCache(cache_size)
+        self.batch_size = batch_size
+        self.hits_soft_17 = hits_soft_17
+        self.dealer_hands = [DealerHands(slot, hits_soft_17) for slot in range(10)]
+        self._lock = threading.Lock()
+
+    def dealer_distributions(self, compositions, upcard_slot):
+        """Fill the cache with the dealer distributions of ``compositions``."""
+        compositions = list(compositions)
+        hands = self.dealer_hands[upcard_slot]
+        for start in range(0, len(compositions), self.batch_size):
+            batch = compositions[start:start + self.batch_size]
+            dists = hands.distributions(batch).tolist()
+            with self._lock:
+                for counts, dist in zip(batch, dists):
+                    self.cache[(counts, upcard_slot)] = dist
+
+    def dealer_distribution(self, counts, upcard_slot):
+        """Probability of each dealer outcome (see strategy.DEALER_OUTCOMES)."""
+        key = (counts, upcard_slot)
+        with self._lock:
+            dist = self.cache.get(key)
+        if dist is None:
+            dist = self.dealer_hands[upcard_slot].distributions([counts])[0].tolist()
+            with self._lock:
+                self.cache[key] = dist
+        return dist
+
+    def action_evs(self, counts, hard, has_ace, upcard_slot, can_double=True):
+        """EV per unit bet of each allowed action, drawing from ``counts``."""
+        missing = set()
+
+        def plan(counts_, total):
+            if total <= 21 and (counts_, upcard_slot) not in self.cache:
+                missing.add(counts_)
+            return 0.0
+
+        def stand(counts_, total):
+            if total > 21:
+                return -1.0
+            return stand_ev(total, self.dealer_distribution(counts_, upcard_slot))
+
+        # The tree's shape does not depend on the values, so a dry run finds
+        # every composition that needs a dealer distribution.
+        _player_evs(counts, hard, has_ace, can_double, plan)
+        self.dealer_distributions(missing, upcard_slot)
+        return _player_evs(counts, hard, has_ace, can_double, stand)
+
+    def best_action(self, counts, hand, upcard, can_double=True):
+        """Name of the highest-EV action and the EVs of the allowed actions for a Hand."""
+        evs = self.action_evs(counts, hand.hard, hand.aces > 0, CARD_SLOTS[upcard], can_double)
+        return max(evs, key=evs.get), evs
+
+    def dealer_outcomes(self, counts, upcard):
+        """Dealer outcome probabilities for an upcard card drawing from ``counts``."""
+        return dict(zip(DEALER_OUTCOMES, self.dealer_distribution(counts, CARD_SLOTS[upcard])))
+
+
+def _draws(counts):
+    """(slot, probability, composition after the draw) for every card that can be drawn."""
+    remaining = sum(counts)
+    for slot, count in enumerate(counts):
+        if count:
+            yield slot, count / remaining, counts[:slot] + (count - 1,) + counts[slot + 1:]
+
+
+def _player_evs(counts, hard, has_ace, can_double, stand):
+    """Stand, hit and double EVs, with ``stand(counts, total)`` valuing each final hand."""
+    memo = {}
+
+    def hit(counts_, hard_, ace_):
+        key = (counts_, hard_, ace_)
+        ev = memo.get(key)
+        if ev is None:
+            ev = 0.0
+            for slot, p, drawn in _draws(counts_):
+                new_hard = hard_ + HARD_VALUES[slot]
+                if new_hard > 21:
+                    ev -= p
+                    continue
+                new_ace = ace_ or slot == ACE_SLOT
+                total = _soft_total(new_hard, new_ace)
+                if total == 21:
+                    ev += p * stand(drawn, total)
+                elif total <= 11:
+                    # Another card cannot bust, and by symmetry it leaves the
+                    # dealer's chances unchanged, so hitting beats standing.
+                    ev += p * hit(drawn, new_hard, new_ace)
+                else:
+                    ev += p * max(stand(drawn, total), hit(drawn, new_hard, new_ace))
+            memo[key] = ev
+        return ev
+
+    def double(counts_, hard_, ace_):
+        ev = 0.0
+        for slot, p, drawn in _draws(counts_):
+            ev += p * stand(drawn, _soft_total(hard_ + HARD_VALUES[slot], ace_ or slot == ACE_SLOT))
+        return 2 * ev
+
+    evs = {'stand': stand(counts, _soft_total(hard, has_ace)), 'hit': hit(counts, hard, has_ace)}
+    if can_double:
+        evs['double'] = double(counts, hard, has_ace)
+    return evs
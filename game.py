@@ -1,148 +1,92 @@
-import random, sys
+import sys
 
-def create_deck():
-    """Create a deck of cards."""
-    suits = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
-    values = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace']
-    return [{'value': v, 'suit': s} for s in suits for v in values]
+from blackjack_logic import ACTIONS, next_round, place_bet, start_game
+from cards import card_name
+from rng import create_rng, rng_settings
+from rules import rules_from_env
 
-def shuffle_deck(deck):
-    """Shuffle the deck of cards."""
-    random.shuffle(deck)
-    return deck
+# Number of decks in the shoe
+DECKS = 1
 
-def deal_card(deck):
-    """Deal one card from the deck."""
-    return deck.pop()
+# Payout and dealer rules, shared with the web game (BLACKJACK_RULES)
+RULES = rules_from_env()
 
-def calculate_hand(hand):
-    """Calculate the total value of a hand."""
-    total = 0
-    aces = 0
-    for card in hand:
-        if card['value'] in ['Jack', 'Queen', 'King']:
-            total += 10
-        elif card['value'] == 'Ace':
-            aces += 1
-            total += 11
-        else:
-            total += int(card['value'])
-    while total > 21 and aces:
-        total -= 10
-        aces -= 1
-    return total
+# What a settled hand prints, by outcome
+RESULTS = {'win': "You win!", 'lose': "You lose.", 'push': "Push (tie)."}
 
 def show_hand(hand, total, hidden=False):
     """Print out the hand."""
     if hidden:
-        print("[" + hand[0]['value'] + " of " + hand[0]['suit'] + ", Hidden]")
+        print("[" + card_name(hand[0]) + ", Hidden]")
     else:
         for card in hand:
-            print("[" + card['value'] + " of " + card['suit'] + "]", end=" ")
+            print("[" + card_name(card) + "]", end=" ")
         print("= ", total)
 
+def choose_action(player):
+    """Ask for one of the actions the engine currently allows."""
+    options = ['hit', 'stand']
+    if player['canDoubleDown']:
+        options.append('double')
+    if player['canSplit']:
+        options.append('split')
+    if player['canInsure']:
+        options.append('insurance')
+    while True:
+        choice = input(f"Type {', '.join(options[:-1])} or {options[-1]}: ").lower()
+        if choice in options:
+            return choice
+
 def play_blackjack():
     print("Welcome to Blackjack!")
     balance = int(input("Insert dollars: "))
+    # Shuffle backend from BLACKJACK_RNG / BLACKJACK_RNG_SEED (secure by default)
+    game_state, response = start_game({'playerNames': ['You'], 'balance': balance, 'decks': DECKS},
+                                      create_rng(*rng_settings()), RULES)
+    if game_state is None:
+        print("You're out of quarters! Game over." if balance <= 0 else response['message'])
+        return
+    player = game_state['players'][0]
 
-    while balance > 0:
-        deck = create_deck()
-        shuffle_deck(deck)
-        
-        player_hand = [deal_card(deck), deal_card(deck)]
-        dealer_hand = [deal_card(deck), deal_card(deck)]
-        
-        print(f"Your balance: ${balance}")
+    while player['balance'] > 0:
+        print(f"Your balance: ${player['balance']}")
         bet = int(input("Place your bet, 0 to cash out: "))
 
         if bet == 0:
-            print(f"Your balance: ${balance}")
+            print(f"Your balance: ${player['balance']}")
             sys.exit()
-        
-        if bet > balance:
+
+        if not place_bet(game_state, {'playerId': player['id'], 'bet': bet})['success']:
             print("You do not have enough balance.")
             continue
-        
-        print("Dealer's hand:")
-        dealer_total = calculate_hand(dealer_hand)
-        show_hand(dealer_hand, dealer_total, hidden=True)
-        
-        print("Your hand:")
-        player_total = calculate_hand(player_hand)
-        show_hand(player_hand, player_total)
 
-        CanDoubledDown = True
-        
-        while True:
-            if player_total == 21:
-                print("Blackjack! You win!")
-                balance += int(2 * bet)
-                break
+        print("Dealer's hand:")
+        show_hand(game_state['dealerHand'], game_state['dealerTotal'], hidden=True)
 
-            if balance >= bet * 2 and CanDoubledDown:
-                if input("Do you want to double down? (yes/no): ").lower() == 'yes':
-                    if balance >= bet * 2:
-                        bet *= 2
-                        new_card = deal_card(deck)
-                        player_hand.append(new_card)
-                        print("You drew: [" + new_card['value'] + " of " + new_card['suit'] + "]")
-                        player_total = calculate_hand(player_hand)
-                        show_hand(player_hand, player_total)
-                        if player_total > 21:
-                            print("Bust! You lose.")
-                            balance -= bet
-                            break
-                        else:
-                            print("Dealer's turn")
-                            show_hand(dealer_hand, dealer_total)
-                            while dealer_total < 17:
-                                new_card = deal_card(deck)
-                                dealer_hand.append(new_card)
-                                dealer_total = calculate_hand(dealer_hand)
-                            show_hand(dealer_hand, dealer_total)
-                            if dealer_total > 21 or dealer_total < player_total:
-                                print("You win!")
-                                balance += bet
-                            elif dealer_total > player_total:
-                                print("You lose.")
-                                balance -= bet
-                            else:
-                                print("Push (tie).")
-                            break
-                    else:
-                        print("Not enough balance to double down.")
-            
-            CanDoubledDown = False
+        while game_state['gamePhase'] == 'playing':
+            if len(player['hands']) > 1:
+                print(f"Your hand {player['handIndex'] + 1} of {len(player['hands'])}:")
+            else:
+                print("Your hand:")
+            show_hand(player['hand'], player['total'])
+            handler, _ = ACTIONS[choose_action(player)]
+            print(handler(game_state, {'playerId': player['id']}).get('message') or game_state['message'])
 
-            choice = input("Type 'hit' to take another card, or 'stand' to hold: ").lower()
-            if choice == 'hit':
-                new_card = deal_card(deck)
-                player_hand.append(new_card)
-                print("You drew: [" + new_card['value'] + " of " + new_card['suit'] + "]")
-                player_total = calculate_hand(player_hand)
-                show_hand(player_hand, player_total)
-                if player_total > 21:
-                    print("Bust! You lose.")
-                    balance -= bet
-                    break
-            elif choice == 'stand':
-                print("Dealer's turn")
-                show_hand(dealer_hand, dealer_total)
-                while dealer_total < 17:
-                    new_card = deal_card(deck)
-                    dealer_hand.append(new_card)
-                    dealer_total = calculate_hand(dealer_hand)
-                show_hand(dealer_hand, dealer_total)
-                if dealer_total > 21 or dealer_total < player_total:
-                    print("You win!")
-                    balance += bet
-                elif dealer_total > player_total:
-                    print("You lose.")
-                    balance -= bet
-                else:
-                    print("Push (tie).")
-                break
-        print(f"New balance: ${balance}")
+        print("Dealer's hand:")
+        show_hand(game_state['dealerHand'], game_state['dealerTotal'])
+        for number, hand in enumerate(player['hands'], 1):
+            print(f"Hand {number}:" if len(player['hands']) > 1 else "Your hand:")
+            show_hand(hand, hand.total)
+            if hand.is_bust:
+                print("Bust! You lose.")
+            elif hand.is_blackjack and hand.outcome == 'win':
+                print("Blackjack! You win!")
+            else:
+                print(RESULTS[hand.outcome])
+        if player['insurance']:
+            print("Insurance pays." if game_state['dealerHand'].is_blackjack else "Insurance lost.")
+        print(f"New balance: ${player['balance']}")
+        next_round(game_state, {})
 
     print("You're out of quarters! Game over.")
 
@@ -0,0 +1,184 @@
+"""Append-only binary hand history.
+
+Every event is one fixed-size little-endian record (see ``RECORD``), so the
+request path only packs 32 bytes into an in-memory batch. A background
+thread flushes batches to segment files and starts a new segment once the
+current one reaches ``segment_bytes``. Readers memory-map segments and
+stream records through a generator.
+"""
+import argparse
+import atexit
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import Counter, namedtuple
+
+from rules import Rules
+
+MAGIC = b'BJHH'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sHH')  # magic, version, record size
+RECORD = struct.Struct('<BBHIQqd')  # event, seat, value, round, table, amount, timestamp
+Record = namedtuple('Record', 'event seat value round table amount timestamp')
+
+EVENTS = ['shuffle', 'bet', 'deal', 'hit', 'stand', 'double', 'payout', 'start', 'split', 'insurance', 'rules']
+SHUFFLE, BET, DEAL, HIT, STAND, DOUBLE, PAYOUT, START, SPLIT, INSURANCE, RULES = range(len(EVENTS))
+DEALER_SEAT = 255
+NO_SEAT = 254
+# Payout record values
+OUTCOME_CODES = {'lose': 0, 'push': 1, 'win': 2}
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_BATCH_RECORDS = 4096
+
+
+def pack_rules(rules, decks):
+    """(value, amount) of the RULES record that follows a table's START.
+
+    The value holds the deck count with the dealer's soft-17 rule and double
+    after split as flag bits; the amount holds the blackjack payout's
+    numerator and denominator, 32 bits each.
+    """
+    numerator, denominator = rules.blackjack_payout
+    value = decks | rules.dealer_hits_soft_17 << 8 | rules.double_after_split << 9
+    return value, numerator << 32 | denominator
+
+
+def unpack_rules(value, amount):
+    """(rules, decks) from a RULES record."""
+    rules = Rules(blackjack_payout=(amount >> 32, amount & 0xFFFFFFFF), dealer_hits_soft_17=bool(value & 1 << 8),
+                  double_after_split=bool(value & 1 << 9))
+    return rules, value & 0xFF
+
+
+class HandHistoryWriter:
+    """Buffers packed records and writes them to rotating segment files."""
+
+    def __init__(self, directory, segment_bytes=DEFAULT_SEGMENT_BYTES,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, batch_records=DEFAULT_BATCH_RECORDS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.batch_records = batch_records
+        self.records_written = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._segment = 0
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name='hand-history', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, table, round_id, event, seat=NO_SEAT, value=0, amount=0):
+        """Queue one event; cheap enough for the request path."""
+        record = RECORD.pack(event, seat, value, round_id, table, amount, time.time())
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_records:
+                self._wake.set()
+
+    def flush(self):
+        """Write all queued records to the current segment."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        with self._io_lock:
+            if self._file is None or self._file.tell() >= self.segment_bytes:
+                self._rotate()
+            self._file.write(b''.join(batch))
+            self._file.flush()
+            self.records_written += len(batch)
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        self._segment += 1
+        name = f'history-{int(time.time())}-{os.getpid()}-{self._segment:06d}.bin'
+        self._file = open(os.path.join(self.directory, name), 'ab')
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Flush remaining records and stop the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def iter_segment(path):
+    """Yield the records of one segment file through a memory map."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < FILE_HEADER.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, record_size = FILE_HEADER.unpack_from(mm)
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                raise ValueError(f'{path} is not a hand-history segment')
+            # A partially written trailing record is ignored.
+            end = size - (size - FILE_HEADER.size) % RECORD.size
+            unpack_from = RECORD.unpack_from
+            for offset in range(FILE_HEADER.size, end, RECORD.size):
+                yield Record._make(unpack_from(mm, offset))
+
+
+def segment_paths(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith('history-') and name.endswith('.bin'))
+
+
+def read_history(directory):
+    """Yield every record in a history directory, segment by segment."""
+    for path in segment_paths(directory):
+        yield from iter_segment(path)
+
+
+def create_hand_history():
+    """Writer for BLACKJACK_HISTORY_DIR, or None when recording is disabled."""
+    directory = os.environ.get('BLACKJACK_HISTORY_DIR')
+    if not directory:
+        return None
+    segment_bytes = int(os.environ.get('BLACKJACK_HISTORY_SEGMENT_BYTES', DEFAULT_SEGMENT_BYTES))
+    return HandHistoryWriter(directory, segment_bytes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize a hand-history directory.')
+    parser.add_argument('directory')
+    args = parser.parse_args(argv)
+
+    counts = Counter()
+    rounds = set()
+    start = time.perf_counter()
+    for record in read_history(args.directory):
+        counts[EVENTS[record.event]] += 1
+        rounds.add((record.table, record.round))
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(f'{total} records, {len(rounds)} rounds in {elapsed:.2f}s')
+    for event in EVENTS:
+        print(f'  {event:<8}{counts[event]:>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Load test for the game API in Flask (WSGI), ASGI and sharded modes.
+
+Each virtual client plays full rounds at its own table, sending the table id
+from /api/start with every call.
+
+    python loadtest.py --mode flask --mode asgi --mode sharded --clients 32 --duration 10
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+SERVER_COMMANDS = {
+    'flask': [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--with-threads',
+              '--no-reload', '--no-debugger', '--port', '{port}'],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--log-level', 'warning', '--port', '{port}'],
+    'sharded': [sys.executable, 'router.py', '--workers', '{workers}', '--port', '{port}'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/state')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+class Client:
+    """One player pair at one table, recording the latency of every request."""
+
+    def __init__(self, host, port):
+        self.conn = http.client.HTTPConnection(host, port, timeout=10)
+        self.table_id = None
+        self.latencies = []
+        self.errors = 0
+
+    def call(self, method, path, payload=None):
+        body = json.dumps(payload) if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body else {}
+        if self.table_id:
+            headers['X-Table-Id'] = self.table_id
+        start = time.perf_counter()
+        self.conn.request(method, path, body, headers)
+        data = json.loads(self.conn.getresponse().read())
+        self.latencies.append(time.perf_counter() - start)
+        if not data.get('success'):
+            self.errors += 1
+        return data
+
+    def play(self, stop):
+        state = self.call('POST', '/api/start', {'player1Name': 'A', 'player2Name': 'B', 'balance': 10 ** 9})
+        self.table_id = state['tableId']
+        while not stop.is_set():
+            state = state['gameState']
+            for player in state['players']:
+                state = self.call('POST', '/api/bet', {'playerId': player['id'], 'bet': 10})
+            while state['gameState']['gamePhase'] == 'playing':
+                game = state['gameState']
+                player = game['players'][game['currentPlayerIndex']]
+                action = 'hit' if player['total'] < 17 else 'stand'
+                state = self.call('POST', f'/api/{action}', {'playerId': player['id']})
+            self.call('GET', '/api/state')
+            state = self.call('POST', '/api/next-round', {})
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_load(host, port, clients, duration):
+    stop = threading.Event()
+    workers = [Client(host, port) for _ in range(clients)]
+    threads = [threading.Thread(target=worker.play, args=(stop,), daemon=True) for worker in workers]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for worker in workers for latency in worker.latencies)
+    return {
+        'requests': len(latencies),
+        'errors': sum(worker.errors for worker in workers),
+        'requestsPerSecond': len(latencies) / elapsed,
+        'p50Ms': percentile(latencies, 0.50) * 1000,
+        'p99Ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_mode(mode, clients, duration, workers):
+    port = free_port()
+    command = [part.format(port=port, workers=workers) for part in SERVER_COMMANDS[mode]]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(port)
+        return run_load('127.0.0.1', port, clients, duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the blackjack API.')
+    parser.add_argument('--mode', action='append', choices=sorted(SERVER_COMMANDS),
+                        help='server mode to start and test (repeatable; default: all)')
+    parser.add_argument('--url', help='test an already running server at host:port instead')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes in sharded mode')
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.url:
+        host, _, port = args.url.rpartition(':')
+        results[args.url] = run_load(host, int(port), args.clients, args.duration)
+    else:
+        for mode in args.mode or sorted(SERVER_COMMANDS):
+            results[mode] = run_mode(mode, args.clients, args.duration, args.workers)
+
+    print(f'{"mode":<24}{"requests":>10}{"errors":>8}{"req/s":>10}{"p50 ms":>9}{"p99 ms":>9}')
+    for mode, r in results.items():
+        print(f'{mode:<24}{r["requests"]:>10}{r["errors"]:>8}{r["requestsPerSecond"]:>10.0f}'
+              f'{r["p50Ms"]:>9.2f}{r["p99Ms"]:>9.2f}')
+    return results
+
+
+if __name__ == '__main__':
+    main()
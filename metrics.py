@@ -0,0 +1,128 @@
+"""Counters and latency histograms in the Prometheus text format.
+
+Recording is a clock read, a bisect and a few integer increments under a
+lock; nothing is formatted until ``/metrics`` is scraped, and gauges such as
+the number of active tables are computed only at scrape time. Metrics are
+per process, so scrape every worker.
+"""
+import threading
+from bisect import bisect_left
+
+# Upper bounds in seconds; API calls are sub-millisecond to tens of milliseconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _register(metric):
+    with _registry_lock:
+        _registry[metric.name] = metric
+    return metric
+
+
+class Counter:
+    """Monotonic count, optionally split by label values."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # An unlabelled counter is reported from zero, before its first increment
+        self._values = {} if self.labelnames else {(): 0}
+        self._lock = threading.Lock()
+        _register(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Gauge:
+    """Value read from a callback when metrics are collected."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, read):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        _register(self)
+
+    def samples(self):
+        yield self.name, '', self.read()
+
+
+class Histogram:
+    """Observation counts per bucket, with their sum, optionally split by label values."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [count per bucket (+Inf last), sum]
+        self._lock = threading.Lock()
+        _register(self)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield (f'{self.name}_bucket', _labels(self.labelnames + ('le',), labels + (le,)),
+                       cumulative)
+            yield f'{self.name}_sum', _labels(self.labelnames, labels), total
+            yield f'{self.name}_count', _labels(self.labelnames, labels), cumulative
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, labels, value in metric.samples():
+            lines.append(f'{name}{labels} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# Metrics shared by the game logic and both servers
+REQUEST_SECONDS = Histogram('blackjack_request_seconds', 'API request latency by route.', ['route', 'method'])
+SERIALIZATION_SECONDS = Histogram('blackjack_serialization_seconds', 'Time spent encoding JSON responses.')
+SETTLEMENT_SECONDS = Histogram('blackjack_settlement_seconds',
+                               'Time spent finishing a round, by step.', ['step'])
+ROUNDS = Counter('blackjack_rounds_total', 'Rounds played to settlement.')
+COUNT_FLAGS = Counter('blackjack_count_flagged_seats_total', 'Seats flagged for bets that follow the count.')
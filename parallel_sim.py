@@ -0,0 +1,207 @@
+"""Headless multi-process simulation runner.
+
+Rounds are split across a process pool. Each worker plays its share with
+the scalar game rules from blackjack_logic.py, drawing from its own RNG
+stream spawned from one master seed. Workers return integer totals only, so
+the merged result is bit-for-bit reproducible for a given seed and worker
+count.
+
+    python parallel_sim.py --rounds 10000000 --workers 64 --seed 1 --strategy basic
+"""
+import argparse
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from blackjack_logic import MAX_SPLIT_HANDS, create_player, dealer_play, determine_winners, strategy_for
+from cards import CARD_IS_ACE, Hand, SeatHand
+from rng import create_rng
+from rules import DEFAULT_RULES
+from shoe import Shoe
+from simulator import OUTCOMES
+
+DEFAULT_CONFIG = {
+    'decks': 6,
+    'penetration': 0.75,
+    'bet': 10,
+    # Shuffle backend; 'numpy' shuffles a 6-deck shoe an order of magnitude faster
+    'rng': 'random',
+}
+
+
+def basic_strategy(hand, upcard, can_double, shoe, can_split):
+    """Play the precomputed basic-strategy table."""
+    pair = hand[0] if can_split else None
+    return strategy_for(DEFAULT_RULES).best_action(hand.total, hand.is_soft, upcard, shoe.decks, can_double,
+                                                   pair, DEFAULT_RULES.double_after_split)[0]
+
+
+def mimic_dealer(hand, upcard, can_double, shoe, can_split):
+    """Hit below 17, never double or split."""
+    return 'hit' if hand.total < 17 else 'stand'
+
+
+STRATEGIES = {
+    'basic': basic_strategy,
+    'dealer': mimic_dealer,
+}
+
+
+def resolve_strategy(name):
+    """A registered strategy name or a 'module:function' path."""
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    module, _, attr = name.partition(':')
+    return getattr(importlib.import_module(module), attr)
+
+
+def worker_seeds(seed, workers):
+    """Independent integer seeds for each worker, derived from the master seed."""
+    return [int.from_bytes(child.generate_state(4, np.uint64).tobytes(), 'little')
+            for child in np.random.SeedSequence(seed).spawn(workers)]
+
+
+def play_rounds(rounds, seed, strategy, config):
+    """Play ``rounds`` rounds against one shoe and return integer statistics."""
+    config = {**DEFAULT_CONFIG, **config}
+    bet = config['bet']
+    shoe = Shoe(config['decks'], config['penetration'], rng=create_rng(config['rng'], seed))
+    # A bankroll large enough that doubling and splitting are never refused.
+    bankroll = bet * 4 * MAX_SPLIT_HANDS
+    stats = {'rounds': rounds, 'hands': 0, 'net': 0, 'netSquared': 0, 'wagered': 0}
+    stats.update((outcome, 0) for outcome in OUTCOMES)
+
+    for _ in range(rounds):
+        if shoe.needs_shuffle:
+            shoe.shuffle()
+        player = create_player(1, 'Sim', bankroll)
+        player['bet'] = bet
+        game_state = {'shoe': shoe, 'players': [player], 'rules': DEFAULT_RULES}
+        game_state['dealerHand'] = Hand([shoe.deal(), shoe.deal()])
+        hands = player['hands'] = [SeatHand([shoe.deal(), shoe.deal()], bet)]
+        upcard = game_state['dealerHand'][0]
+
+        # Split hands are played in order; split aces get one card each
+        index = 0
+        while index < len(hands) and not hands[0].is_blackjack:
+            hand = hands[index]
+            while hand.total < 21 and not (hand.split and CARD_IS_ACE[hand[0]]):
+                can_double = len(hand) == 2 and (not hand.split or DEFAULT_RULES.double_after_split)
+                can_split = hand.is_pair and len(hands) < MAX_SPLIT_HANDS
+                action = strategy(hand, upcard, can_double, shoe, can_split)
+                if action == 'split' and can_split:
+                    hands[index:index + 1] = hand.split_pair(shoe.deal(), shoe.deal())
+                    hand = hands[index]
+                    continue
+                if action == 'double' and can_double:
+                    hand.bet *= 2
+                    hand.append(shoe.deal())
+                    break
+                if action != 'hit':
+                    break
+                hand.append(shoe.deal())
+            index += 1
+        player['bet'] = sum(hand.bet for hand in hands)
+
+        dealer_play(game_state)
+        determine_winners(game_state)
+        net = player['balance'] - bankroll
+        stats['net'] += net
+        stats['netSquared'] += net * net
+        stats['wagered'] += player['bet']
+        stats['hands'] += len(hands)
+        for hand in hands:
+            if hand.is_bust:
+                stats['bust'] += 1
+            elif hand.outcome == 'win':
+                stats['blackjack' if hand.is_blackjack else 'win'] += 1
+            else:
+                stats[hand.outcome] += 1
+    return stats
+
+
+def _run_chunk(args):
+    rounds, seed, strategy_name, config = args
+    return play_rounds(rounds, seed, resolve_strategy(strategy_name), config)
+
+
+def merge(results):
+    """Sum per-worker integer statistics."""
+    merged = {}
+    for result in results:
+        for key, value in result.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def summarize(stats, bet):
+    rounds = stats['rounds']
+    ev = stats['net'] / rounds
+    variance = stats['netSquared'] / rounds - ev * ev
+    return {
+        'rounds': rounds,
+        'hands': stats['hands'],
+        'ev': ev,
+        'edge': ev / bet,
+        'variance': variance,
+        'stdError': (variance / rounds) ** 0.5,
+        'outcomes': {outcome: stats[outcome] for outcome in OUTCOMES},
+        'net': stats['net'],
+        'wagered': stats['wagered'],
+    }
+
+
+def run(rounds, strategy='basic', config=None, seed=0, workers=None):
+    """Simulate ``rounds`` rounds across ``workers`` processes and merge the results.
+
+    ``strategy`` is a name from STRATEGIES or a 'module:function' path to a
+    picklable callback ``(hand, upcard, can_double, shoe, can_split) -> action``.
+    """
+    if rounds <= 0:
+        raise ValueError('rounds must be positive')
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    workers = workers or os.cpu_count()
+    if workers < 1:
+        raise ValueError('workers must be positive')
+    shares = [rounds // workers + (i < rounds % workers) for i in range(workers)]
+    chunks = [(share, seed_, strategy, config)
+              for share, seed_ in zip(shares, worker_seeds(seed, workers)) if share]
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = [_run_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_run_chunk, chunks))
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(merge(results), config['bet'])
+    summary.update({'seed': seed, 'workers': workers, 'strategy': strategy, 'config': config,
+                    'seconds': elapsed, 'roundsPerSec': rounds / elapsed})
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parallel blackjack simulation runner.')
+    parser.add_argument('--rounds', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--strategy', default='basic', help='basic, dealer or module:function')
+    parser.add_argument('--decks', type=int, default=DEFAULT_CONFIG['decks'])
+    parser.add_argument('--penetration', type=float, default=DEFAULT_CONFIG['penetration'])
+    parser.add_argument('--bet', type=int, default=DEFAULT_CONFIG['bet'])
+    parser.add_argument('--rng', choices=['random', 'numpy'], default=DEFAULT_CONFIG['rng'])
+    args = parser.parse_args(argv)
+    if args.rounds < 1 or args.workers < 1:
+        parser.error('--rounds and --workers must be positive')
+
+    config = {'decks': args.decks, 'penetration': args.penetration, 'bet': args.bet, 'rng': args.rng}
+    print(json.dumps(run(args.rounds, args.strategy, config, args.seed, args.workers), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Replay recorded hands through the game rules and report divergent rounds.
+
+Rounds are rebuilt from a hand-history directory (see history.py): the
+cards each round dealt become a preset shoe, and the recorded bets and
+decisions are replayed through the same actions the API uses, so
+``dealer_play`` and ``determine_winners`` settle every seat again. Any round
+whose outcome or payout differs from the recorded one is reported, which
+verifies payouts against real traffic and shows what a rule change would
+have altered. Each table is replayed under the rules and deck count it
+recorded when it started; logs written before tables recorded them are
+replayed under the defaults.
+
+    python replay.py history/ --workers 4
+"""
+import argparse
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+
+from blackjack_logic import (DEFAULT_DECKS, create_game_state, create_player, double_down, hit, place_bet, split_hand,
+                             stand, take_insurance)
+from history import (BET, DEAL, DOUBLE, EVENTS, HIT, INSURANCE, OUTCOME_CODES, PAYOUT, RULES, SHUFFLE, SPLIT, STAND,
+                     START, read_history, unpack_rules)
+from rules import DEFAULT_RULES, rules_from_dict
+from shoe import Shoe
+
+DEFAULT_BATCH_ROUNDS = 1024
+MAX_REPORTED = 20
+
+# One recorded round: the table's rules, starting balances per seat, the
+# decisions in order as (event, seat, amount), the cards in deal order and
+# {seat: (outcome, delta)}.
+Round = namedtuple('Round', 'table round decks rules balances actions cards payouts')
+
+REPLAY_ACTIONS = {
+    BET: place_bet,
+    HIT: hit,
+    STAND: stand,
+    DOUBLE: double_down,
+    SPLIT: split_hand,
+    INSURANCE: take_insurance,
+}
+OUTCOME_NAMES = {code: outcome for outcome, code in OUTCOME_CODES.items()}
+
+
+class ReplayError(Exception):
+    """A recorded round cannot be replayed as recorded."""
+
+
+class RecordedShoe(Shoe):
+    """A shoe that deals a fixed card sequence and never reshuffles."""
+
+    __slots__ = ()
+
+    def __init__(self, decks, cards):
+        super().__init__(decks, 1, cards=cards)
+
+    def shuffle(self):
+        raise ReplayError(f'needed more than the {len(self.cards)} recorded cards')
+
+
+def iter_rounds(records, stats=None):
+    """Group a record stream into complete rounds, table by table.
+
+    Tables interleave in the log, so each table's current round is buffered
+    until a record from its next round (or a new start) arrives. Rounds from
+    tables whose START was not recorded, and rounds abandoned before every
+    seat was paid, are counted in ``stats['skipped']`` and not yielded.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault('skipped', 0)
+    tables = {}
+    pending = {}
+
+    def finish(key):
+        current = pending.pop(key, None)
+        if current is None:
+            return None
+        table = tables.get(key)
+        if table is None or len(current['payouts']) != len(table['balances']):
+            stats['skipped'] += 1
+            return None
+        round_ = Round(key, current['round'], table['decks'], table['rules'], list(table['balances']),
+                       current['actions'], current['cards'], current['payouts'])
+        for seat, (_, delta) in current['payouts'].items():
+            table['balances'][seat] += delta
+        return round_
+
+    for record in records:
+        key = record.table
+        current = pending.get(key)
+        if record.event == START or (current is not None and record.round != current['round']):
+            round_ = finish(key)
+            if round_ is not None:
+                yield round_
+            current = None
+        if record.event == START:
+            tables[key] = {'balances': [record.amount] * record.value, 'decks': DEFAULT_DECKS, 'rules': DEFAULT_RULES}
+            continue
+        if record.event == RULES:
+            if key in tables:
+                tables[key]['rules'], tables[key]['decks'] = unpack_rules(record.value, record.amount)
+            continue
+        if current is None:
+            current = pending[key] = {'round': record.round, 'actions': [], 'cards': [], 'payouts': {}}
+
+        event = record.event
+        if event == DEAL:
+            current['cards'].append(record.value)
+        elif event in REPLAY_ACTIONS:
+            current['actions'].append((event, record.seat, record.amount))
+        elif event == PAYOUT:
+            current['payouts'][record.seat] = (record.value, record.amount)
+        elif event == SHUFFLE and key in tables:
+            tables[key]['decks'] = record.value
+
+    for key in list(pending):
+        round_ = finish(key)
+        if round_ is not None:
+            yield round_
+
+
+def replay_round(round_, changes=None):
+    """Replay one round; returns None if it matches, else a description of the difference.
+
+    ``changes`` is a JSON rules object applied over the table's recorded rules.
+    """
+    rules = rules_from_dict(changes, round_.rules) if changes else round_.rules
+    game_state = create_game_state(round_.decks, rules=rules)
+    game_state['shoe'] = RecordedShoe(round_.decks, round_.cards)
+    game_state['players'] = [create_player(seat + 1, f'Seat {seat + 1}', balance)
+                             for seat, balance in enumerate(round_.balances)]
+    game_state['players'][0]['isActive'] = True
+    game_state['gamePhase'] = 'betting'
+    game_state['round'] = round_.round
+
+    try:
+        for event, seat, amount in round_.actions:
+            response = REPLAY_ACTIONS[event](game_state, {'playerId': seat + 1, 'bet': amount})
+            if not response['success']:
+                raise ReplayError(f'{EVENTS[event]} by seat {seat + 1} rejected: {response["message"]}')
+    except ReplayError as e:
+        return {'table': round_.table, 'round': round_.round, 'reason': str(e)}
+
+    if game_state['gamePhase'] != 'results':
+        return {'table': round_.table, 'round': round_.round,
+                'reason': f'round ended in the {game_state["gamePhase"]} phase'}
+
+    differences = []
+    for seat, player in enumerate(game_state['players']):
+        outcome, delta = round_.payouts[seat]
+        replayed_delta = player['balance'] - round_.balances[seat]
+        if player['winner'] != OUTCOME_NAMES[outcome] or replayed_delta != delta:
+            differences.append({'seat': seat + 1,
+                                'recorded': [OUTCOME_NAMES[outcome], delta],
+                                'replayed': [player['winner'], replayed_delta]})
+    shoe = game_state['shoe']
+    if not differences and shoe.cursor != len(shoe.cards):
+        return {'table': round_.table, 'round': round_.round,
+                'reason': f'dealt {shoe.cursor} of {len(shoe.cards)} recorded cards'}
+    if differences:
+        return {'table': round_.table, 'round': round_.round, 'seats': differences}
+    return None
+
+
+def replay_batch(rounds, changes=None):
+    """Replay a batch of rounds and return the mismatches."""
+    return [mismatch for mismatch in (replay_round(round_, changes) for round_ in rounds) if mismatch is not None]
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def replay(records, workers=1, batch_rounds=DEFAULT_BATCH_ROUNDS, max_reported=MAX_REPORTED, changes=None):
+    """Replay every complete round in ``records`` and summarize the differences.
+
+    Tables play under their recorded rules, with the JSON rules object
+    ``changes`` (e.g. ``{"dealerHitsSoft17": true}``) applied on top.
+
+    Rounds are streamed in batches of ``batch_rounds``; with several workers
+    the batches are replayed by a process pool.
+    """
+    stats = {'skipped': 0}
+    counts = {'rounds': 0, 'mismatched': 0}
+    mismatches = []
+
+    def consume(batch_results):
+        for batch_mismatches in batch_results:
+            counts['mismatched'] += len(batch_mismatches)
+            mismatches.extend(batch_mismatches[:max_reported - len(mismatches)])
+
+    def counted(rounds):
+        for batch in batches(rounds, batch_rounds):
+            counts['rounds'] += len(batch)
+            yield batch
+
+    start = time.perf_counter()
+    stream = counted(iter_rounds(records, stats))
+    if workers == 1:
+        consume(replay_batch(batch, changes) for batch in stream)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            consume(pool.map(replay_batch, stream, repeat(changes)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'rounds': counts['rounds'],
+        'matched': counts['rounds'] - counts['mismatched'],
+        'mismatched': counts['mismatched'],
+        'skipped': stats['skipped'],
+        'seconds': elapsed,
+        'roundsPerSec': counts['rounds'] / elapsed if elapsed else 0.0,
+        'mismatches': mismatches,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay recorded hands and report divergent rounds.')
+    parser.add_argument('directory', help='hand-history directory (BLACKJACK_HISTORY_DIR)')
+    parser.add_argument('--workers', type=int, default=1, help=f'processes (up to {os.cpu_count()} here)')
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH_ROUNDS, help='rounds per batch')
+    parser.add_argument('--show', type=int, default=MAX_REPORTED, help='mismatches to list')
+    parser.add_argument('--rules', type=json.loads, default={},
+                        help='rule changes to replay every table under, e.g. \'{"dealerHitsSoft17": true}\'')
+    args = parser.parse_args(argv)
+    try:
+        rules_from_dict(args.rules)
+    except ValueError as e:
+        parser.error(f'--rules: {e}')
+
+    report = replay(read_history(args.directory), args.workers, args.batch, args.show, args.rules)
+    print(json.dumps(report, indent=2))
+    return 1 if report['mismatched'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+"""Shuffle backends for the shoe.
+
+A backend is any object with a ``shuffle(cards)`` method that permutes the
+shoe's card array in place; ``random.Random`` already qualifies. Three modes
+are provided:
+
+    secure  OS CSPRNG (os.urandom); cannot be seeded. The default for live tables.
+    random  Python's Mersenne Twister; seedable.
+    numpy   NumPy Generator on the counter-based Philox bit generator; seedable
+            and the fastest for bulk simulation.
+
+The seedable modes derive a separate stream for every table from one master
+seed, so a table's shuffles are reproducible regardless of what other tables
+do. Every backend pickles, so seeded shoes survive shared session stores.
+The default secure mode needs only the standard library. NumPy is imported
+only by the numpy mode and by seeded tables, when first used, which keeps
+it off the start-up path of the servers.
+"""
+import os
+import random
+from array import array
+
+from sessions import table_key
+
+RNG_MODES = ('secure', 'random', 'numpy')
+DEFAULT_RNG_MODE = 'secure'
+
+
+class SecureShuffle:
+    """Uniform shuffle keyed by random 64-bit values from os.urandom.
+
+    Sorting by independent uniform keys gives every permutation equal
+    probability as long as the keys are distinct; the rare tie is redrawn.
+    One urandom call per shuffle is far cheaper than the per-swap calls of
+    random.SystemRandom.
+    """
+
+    __slots__ = ()
+
+    def shuffle(self, cards):
+        count = len(cards)
+        while True:
+            keys = memoryview(os.urandom(8 * count)).cast('Q').tolist()
+            if len(set(keys)) == count:
+                break
+        order = sorted(range(count), key=keys.__getitem__)
+        cards[:] = array('B', map(cards.__getitem__, order))
+
+
+class NumpyShuffle:
+    """NumPy Generator over Philox, shuffling the card array without copying it."""
+
+    __slots__ = ('generator',)
+
+    def __init__(self, seed=None):
+        import numpy as np
+        self.generator = np.random.Generator(np.random.Philox(seed))
+
+    def shuffle(self, cards):
+        import numpy as np
+        self.generator.shuffle(np.frombuffer(cards, dtype=np.uint8))
+
+
+def table_seed(seed, table):
+    """Seed for one table's stream, derived from the master seed and the table id."""
+    import numpy as np
+    state = np.random.SeedSequence([seed, table_key(table)]).generate_state(2, np.uint64)
+    return int.from_bytes(state.tobytes(), 'little')
+
+
+def create_rng(mode=DEFAULT_RNG_MODE, seed=None, table=None):
+    """Shuffle backend for ``mode``; with a seed and a table id, that table's own stream."""
+    if mode not in RNG_MODES:
+        raise ValueError(f'RNG mode must be one of {", ".join(RNG_MODES)}')
+    if mode == 'secure':
+        if seed is not None:
+            raise ValueError('the secure RNG cannot be seeded')
+        return SecureShuffle()
+    if seed is not None and table is not None:
+        seed = table_seed(seed, table)
+    if mode == 'random':
+        return random.Random(seed)
+    return NumpyShuffle(seed)
+
+
+def rng_settings():
+    """(mode, seed) from BLACKJACK_RNG and BLACKJACK_RNG_SEED."""
+    mode = os.environ.get('BLACKJACK_RNG', DEFAULT_RNG_MODE)
+    seed = os.environ.get('BLACKJACK_RNG_SEED')
+    return mode, int(seed) if seed else None
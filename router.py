@@ -0,0 +1,333 @@
+"""Shard tables across worker processes behind one HTTP front end.
+
+    python router.py --workers 4 --port 8000
+
+The router starts ``--workers`` copies of the ASGI app in asgi.py, each
+listening on its own Unix socket, and serves the public port itself. Every
+table belongs to exactly one worker, chosen by consistent hashing of its
+table id, and each /api/* request is forwarded to that worker over a pooled
+keep-alive connection. A worker's tables are only ever touched by that
+worker, so no lock is shared between processes and throughput grows with
+the number of workers. With the SQLite session store, changing the number
+of workers moves only about 1/N of the tables to a new owner.
+
+The router mints the id of a table started without one, so it knows the
+owner before the worker sees the request. Requests that name no table go to
+the first worker, which answers them as the single-process server would.
+``uvicorn router:app`` serves the same front end for workers started
+separately, listed in ``BLACKJACK_WORKER_SOCKETS`` (separated by ``os.pathsep``).
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from bisect import bisect_right
+from urllib.parse import parse_qs
+
+import uvicorn
+
+from asgi_http import lifespan, read_body, send_empty, send_json, table_id
+from metrics import CONTENT_TYPE, Histogram, render
+from sessions import TABLE_ID_HEADER, new_table_id, table_key
+
+SOCKETS_ENV = 'BLACKJACK_WORKER_SOCKETS'
+
+# Points per worker on the hash ring; more points spread tables more evenly
+RING_REPLICAS = 128
+
+# Idle connections kept open to each worker, and how long a worker keeps one open
+MAX_IDLE_CONNECTIONS = 64
+WORKER_KEEPALIVE_SECONDS = 300
+
+# Routes that may start a table and so get a minted id when they name none
+STARTING_ROUTES = {'/api/start', '/api/batch'}
+
+# Hop-by-hop headers, which apply to one connection and are not forwarded
+HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'content-length', 'host', 'upgrade'}
+
+FORWARD_SECONDS = Histogram('blackjack_router_forward_seconds',
+                            'Time to forward a request to its worker and relay the response.', ['worker'])
+
+
+class HashRing:
+    """Consistent hashing of table ids onto workers."""
+
+    def __init__(self, workers, replicas=RING_REPLICAS):
+        points = sorted((table_key(f'worker-{worker}-{replica}'), worker)
+                        for worker in range(workers) for replica in range(replicas))
+        self._keys = [key for key, _ in points]
+        self._workers = [worker for _, worker in points]
+
+    def owner(self, table_id):
+        """Index of the worker that holds ``table_id``."""
+        index = bisect_right(self._keys, table_key(table_id))
+        return self._workers[index % len(self._keys)]
+
+
+class Upstream:
+    """Keep-alive HTTP/1.1 connections to one worker's Unix socket."""
+
+    def __init__(self, path, max_idle=MAX_IDLE_CONNECTIONS):
+        self.path = path
+        self.max_idle = max_idle
+        self._idle = []
+
+    async def _send_request(self, method, target, headers, body):
+        """Write a request on an idle connection (or a new one) and read the response head.
+
+        A pooled connection the worker has since closed fails before any
+        response byte arrives; the request is then sent once more on a new
+        connection, since the worker never saw it.
+        """
+        request = [f'{method} {target} HTTP/1.1\r\nhost: worker\r\ncontent-length: {len(body)}\r\n'.encode()]
+        request += [name + b': ' + value + b'\r\n' for name, value in headers]
+        request.append(b'\r\n')
+        request.append(body)
+        request = b''.join(request)
+        while True:
+            reused = bool(self._idle)
+            reader, writer = self._idle.pop() if reused else await asyncio.open_unix_connection(self.path)
+            try:
+                writer.write(request)
+                head = await reader.readuntil(b'\r\n\r\n')
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                writer.close()
+                if reused and not getattr(e, 'partial', b''):
+                    continue
+                raise
+            return reader, writer, head
+
+    def _release(self, reader, writer):
+        if len(self._idle) < self.max_idle and not reader.at_eof():
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+
+    async def fetch(self, method, target, headers=(), body=b''):
+        """(status, headers, body) of a request with a fixed-length response."""
+        reader, writer, head = await self._send_request(method, target, headers, body)
+        status, response_headers, length, _ = parse_head(head)
+        body = await reader.readexactly(length) if length else b''
+        self._release(reader, writer)
+        return status, response_headers, body
+
+    async def forward(self, scope, receive, send, headers, body):
+        """Relay the request to the worker and its response, streamed or not, back to the client."""
+        target = scope['raw_path'].decode('latin-1') if scope.get('raw_path') else scope['path']
+        if scope.get('query_string'):
+            target += '?' + scope['query_string'].decode('latin-1')
+        reader, writer, head = await self._send_request(scope['method'], target, headers, body)
+        status, response_headers, length, chunked = parse_head(head)
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+
+        if not chunked:
+            body = await reader.readexactly(length) if length else b''
+            await send({'type': 'http.response.body', 'body': body})
+            return self._release(reader, writer)
+
+        # A streamed response (/api/stream) runs until the worker ends it or
+        # the client goes away, which closes the worker connection too
+        async def close_on_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            writer.close()
+
+        watcher = asyncio.ensure_future(close_on_disconnect())
+        try:
+            while size := int((await reader.readline()).split(b';')[0], 16):
+                chunk = await reader.readexactly(size + 2)
+                await send({'type': 'http.response.body', 'body': chunk[:-2], 'more_body': True})
+            await reader.readline()
+            await send({'type': 'http.response.body', 'body': b''})
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            watcher.cancel()
+            writer.close()
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+def parse_head(head):
+    """(status, ASGI headers without hop-by-hop ones, content length, chunked) from a response head."""
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = []
+    length = 0
+    chunked = False
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, _, value = line.partition(':')
+        name = name.strip().lower()
+        value = value.strip()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding':
+            chunked = 'chunked' in value.lower()
+        if name not in HOP_HEADERS:
+            headers.append((name.encode(), value.encode('latin-1')))
+    if length:
+        headers.append((b'content-length', str(length).encode()))
+    return status, headers, length, chunked
+
+
+upstreams = []
+ring = None
+
+
+def configure(paths):
+    """Route to the workers listening on ``paths``, in order."""
+    global ring
+    for upstream in upstreams:
+        upstream.close()
+    upstreams[:] = [Upstream(path) for path in paths]
+    ring = HashRing(len(paths))
+
+
+if os.environ.get(SOCKETS_ENV):
+    configure(os.environ[SOCKETS_ENV].split(os.pathsep))
+
+
+async def session_stats(send):
+    """Session-store counters summed over the workers, with each worker's own."""
+    workers = []
+    for upstream in upstreams:
+        _, _, body = await upstream.fetch('GET', '/api/sessions/stats')
+        workers.append(json.loads(body))
+    totals = {key: sum(stats[key] for stats in workers)
+              for key in ('size', 'capacity', 'hits', 'misses', 'evictions')}
+    await send_json(send, dict(workers[0], **totals, workers=workers))
+
+
+async def send_metrics(send):
+    body = render().encode()
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', CONTENT_TYPE.encode()),
+                    (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    method = scope['method']
+    path = scope['path']
+    if method == 'OPTIONS':
+        return await send_empty(send, 204)
+    if path == '/api/sessions/stats' and method == 'GET':
+        return await session_stats(send)
+    worker = None
+    if path == '/metrics' and method == 'GET':
+        # The router's own metrics; /metrics?worker=N relays worker N's
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        if 'worker' not in query:
+            return await send_metrics(send)
+        worker = int(query['worker'][0]) if query['worker'][0].isdigit() else -1
+        if not 0 <= worker < len(upstreams):
+            return await send_json(send, {'success': False, 'message': 'No such worker'}, 404)
+        scope = dict(scope, query_string=b'')
+
+    start = time.perf_counter()
+    table = table_id(scope)
+    if table is None and path in STARTING_ROUTES:
+        table = new_table_id()
+    if worker is None:
+        worker = ring.owner(table) if table is not None else 0
+    headers = [(name, value) for name, value in scope['headers']
+               if name.decode('latin-1') not in HOP_HEADERS and name != TABLE_ID_HEADER.lower().encode()]
+    if table is not None:
+        headers.append((TABLE_ID_HEADER.encode(), table.encode()))
+    body = await read_body(receive)
+    try:
+        await upstreams[worker].forward(scope, receive, send, headers, body)
+    finally:
+        FORWARD_SECONDS.observe(time.perf_counter() - start, str(worker))
+
+
+def wait_for_workers(processes, paths, timeout=60):
+    """Block until every worker accepts connections on its socket."""
+    deadline = time.monotonic() + timeout
+    for process, path in zip(processes, paths):
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f'worker for {path} exited with status {process.returncode}')
+            try:
+                with socket.socket(socket.AF_UNIX) as sock:
+                    sock.connect(path)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f'worker for {path} did not start') from None
+                time.sleep(0.05)
+
+
+def start_workers(count, directory, log_level='warning'):
+    """Start ``count`` asgi.py workers on Unix sockets in ``directory``; returns (processes, paths)."""
+    paths = [os.path.join(directory, f'worker-{index}.sock') for index in range(count)]
+    processes = [subprocess.Popen([sys.executable, '-m', 'uvicorn', 'asgi:app', '--uds', path,
+                                   '--log-level', log_level, '--timeout-keep-alive', str(WORKER_KEEPALIVE_SECONDS)])
+                 for path in paths]
+    try:
+        wait_for_workers(processes, paths)
+    except RuntimeError:
+        stop_workers(processes)
+        raise
+    return processes, paths
+
+
+def stop_workers(processes, timeout=5):
+    """Terminate the workers, killing any still shutting down after ``timeout`` seconds."""
+    for process in processes:
+        process.terminate()
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        try:
+            process.wait(max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the game API from table-sharded worker processes.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--log-level', default='warning')
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    directory = tempfile.mkdtemp(prefix='blackjack-workers-')
+    try:
+        processes, paths = start_workers(args.workers, directory, args.log_level)
+        try:
+            configure(paths)
+            # uvicorn re-raises the signal that stopped it; exit through the finally blocks instead
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+            uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level)
+        finally:
+            stop_workers(processes)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
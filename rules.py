@@ -0,0 +1,85 @@
+"""Table rules shared by the web game, the command-line game and the simulators.
+
+A ``Rules`` value travels with each table (``game_state['rules']``). Tables
+start from the server default, which ``BLACKJACK_RULES`` can override with a
+JSON object, and ``/api/start`` may override it again per table:
+
+    {"blackjackPayout": "6:5", "dealerHitsSoft17": true, "doubleAfterSplit": false}
+"""
+import json
+import os
+from collections import namedtuple
+
+# blackjack_payout is (numerator, denominator), so 3:2 pays bet * 3 // 2
+Rules = namedtuple('Rules', 'blackjack_payout dealer_hits_soft_17 double_after_split')
+
+DEFAULT_RULES = Rules(blackjack_payout=(3, 2), dealer_hits_soft_17=False, double_after_split=True)
+
+# Largest payout numerator or denominator; the hand history stores each in 32 bits
+MAX_PAYOUT_TERM = 1000
+
+# JSON field for each rule
+FIELDS = {
+    'blackjackPayout': 'blackjack_payout',
+    'dealerHitsSoft17': 'dealer_hits_soft_17',
+    'doubleAfterSplit': 'double_after_split',
+}
+
+
+def parse_payout(value):
+    """(numerator, denominator) from '3:2', '6:5' or a [3, 2] pair."""
+    if isinstance(value, str):
+        value = value.split(':')
+    try:
+        numerator, denominator = (int(part) for part in value)
+    except (TypeError, ValueError):
+        raise ValueError('blackjackPayout must look like "3:2"') from None
+    if not (0 < numerator <= MAX_PAYOUT_TERM and 0 < denominator <= MAX_PAYOUT_TERM):
+        raise ValueError(f'blackjackPayout terms must be between 1 and {MAX_PAYOUT_TERM}')
+    return numerator, denominator
+
+
+def rules_from_dict(data, base=DEFAULT_RULES):
+    """``base`` with the rules named in a JSON object replaced; raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError('rules must be an object')
+    unknown = set(data) - set(FIELDS)
+    if unknown:
+        raise ValueError(f'Unknown rules: {", ".join(sorted(unknown))}')
+    changes = {}
+    for field, value in data.items():
+        name = FIELDS[field]
+        if name == 'blackjack_payout':
+            changes[name] = parse_payout(value)
+        elif isinstance(value, bool):
+            changes[name] = value
+        else:
+            raise ValueError(f'{field} must be true or false')
+    return base._replace(**changes)
+
+
+def rules_to_dict(rules):
+    """JSON form of a Rules value, as accepted by ``rules_from_dict``."""
+    return {
+        'blackjackPayout': '{}:{}'.format(*rules.blackjack_payout),
+        'dealerHitsSoft17': rules.dealer_hits_soft_17,
+        'doubleAfterSplit': rules.double_after_split,
+    }
+
+
+def rules_from_env():
+    """DEFAULT_RULES overridden by the BLACKJACK_RULES JSON object, if set."""
+    config = os.environ.get('BLACKJACK_RULES')
+    return rules_from_dict(json.loads(config)) if config else DEFAULT_RULES
+
+
+def blackjack_win(bet, rules):
+    """Winnings on a natural blackjack."""
+    numerator, denominator = rules.blackjack_payout
+    return bet * numerator // denominator
+
+
+def dealer_hits(hand, rules):
+    """True while the dealer must draw: below 17, or on soft 17 under H17."""
+    total = hand.total
+    return total < 17 or (total == 17 and rules.dealer_hits_soft_17 and hand.is_soft)
@@ -0,0 +1,217 @@
+import secrets
+import threading
+import weakref
+
+from blackjack_logic import ACTIONS, format_game_state, get_state, record, set_hand_history, start_game
+from broadcast import Broadcaster
+from encoding import dumps
+from history import RULES, START, create_hand_history, pack_rules
+from metrics import Gauge
+from rng import create_rng, rng_settings
+from rules import rules_from_env
+from sessions import checked_table_id, create_session_store, table_key
+
+NOT_STARTED = {'success': False, 'message': 'Game not started'}
+NOT_AN_OBJECT = {'success': False, 'message': 'Expected a JSON object'}
+
+# Most actions, and most side tables, one /api/batch request may use
+MAX_BATCH_ACTIONS = 1000
+MAX_BATCH_TABLES = 100
+
+
+class GameService:
+    """Session lookup, persistence and broadcasting around the table actions.
+
+    Both the Flask app and the ASGI server route requests through this class,
+    so they return identical responses for the same moves.
+    """
+
+    def __init__(self, sessions=None, broadcaster=None, history=None, rng_mode=None, rng_seed=None,
+                 rules=None):
+        self.sessions = sessions if sessions is not None else create_session_store()
+        self.broadcaster = broadcaster if broadcaster is not None else Broadcaster()
+        # Hand history is recorded only when configured (BLACKJACK_HISTORY_DIR)
+        self.history = history if history is not None else create_hand_history()
+        set_hand_history(self.history)
+        # Shuffle backend for new tables (BLACKJACK_RNG, BLACKJACK_RNG_SEED);
+        # a seed gives every table its own reproducible stream.
+        env_mode, env_seed = rng_settings()
+        self.rng_mode = rng_mode or env_mode
+        self.rng_seed = rng_seed if rng_seed is not None else env_seed
+        create_rng(self.rng_mode, self.rng_seed)  # fail at startup on a bad setting
+        # Rules for tables whose /api/start does not override them (BLACKJACK_RULES)
+        self.rules = rules if rules is not None else rules_from_env()
+        # One lock per live table; entries vanish once no request holds them.
+        self._table_locks = weakref.WeakValueDictionary()
+        self._table_locks_guard = threading.Lock()
+        # Encoded /api/state bodies by table, as (ETag, body); see snapshot()
+        self._snapshots = {}
+        self._snapshots_guard = threading.Lock()
+        Gauge('blackjack_active_tables', 'Tables held in the session store.', lambda: len(self.sessions))
+
+    def table_lock(self, session_id):
+        """The lock serializing moves on one table."""
+        with self._table_locks_guard:
+            lock = self._table_locks.get(session_id)
+            if lock is None:
+                lock = self._table_locks[session_id] = threading.Lock()
+            return lock
+
+    def save(self, session_id, game_state):
+        """Store a changed game state and push the change to stream subscribers."""
+        game_state['version'] += 1
+        self.sessions.set(session_id, game_state)
+        if self.broadcaster.has_subscribers(session_id):
+            self.broadcaster.publish(session_id, format_game_state(game_state))
+
+    def new_table(self, session_id, data):
+        """Build a table from an /api/start payload; returns (game_state or None, response)."""
+        game_state, response = start_game(data, create_rng(self.rng_mode, self.rng_seed, session_id), self.rules)
+        if game_state is not None:
+            game_state['tableKey'] = table_key(session_id)
+            # Distinguishes this game's ETags from earlier games at the same table
+            game_state['epoch'] = secrets.randbits(32)
+            record(game_state, START, value=len(game_state['players']), amount=game_state['players'][0]['balance'])
+            value, amount = pack_rules(game_state['rules'], game_state['shoe'].decks)
+            record(game_state, RULES, value=value, amount=amount)
+        return game_state, response
+
+    def start(self, session_id, data):
+        """Handle /api/start; the response names the table for later calls."""
+        if not isinstance(data, dict):
+            return NOT_AN_OBJECT
+        game_state, response = self.new_table(session_id, data)
+        if game_state is not None:
+            with self.table_lock(session_id):
+                self.save(session_id, game_state)
+            response['tableId'] = session_id
+        return response
+
+    def perform(self, action, session_id, data):
+        """Handle /api/<action> for an existing table."""
+        if not isinstance(data, dict):
+            return NOT_AN_OBJECT
+        handler, mutates = ACTIONS[action]
+        with self.table_lock(session_id), self.sessions.transaction(session_id):
+            game_state = self.sessions.get(session_id)
+            if game_state is None:
+                return NOT_STARTED
+            response = handler(game_state, data)
+            if mutates and response['success']:
+                self.save(session_id, game_state)
+            return response
+
+    def perform_batch(self, session_id, actions, stop_on_error=False):
+        """Apply a list of actions to one table in order under a single lock acquisition.
+
+        Each item is an action payload plus its name, e.g. ``{'action': 'bet',
+        'playerId': 1, 'bet': 10}``; ``start`` begins a new game. Every action
+        is validated exactly as its own route would validate it. The table is
+        saved (and streamed) once at the end. Returns the per-action results,
+        without their game states, and the final state.
+        """
+        results = []
+        with self.table_lock(session_id), self.sessions.transaction(session_id):
+            game_state = self.sessions.get(session_id)
+            changed = False
+            for item in actions:
+                name = item.get('action') if isinstance(item, dict) else None
+                if name == 'start':
+                    new_state, response = self.new_table(session_id, item)
+                    if new_state is not None:
+                        game_state, changed = new_state, True
+                elif name not in ACTIONS:
+                    response = {'success': False, 'message': f'Unknown action: {name}'}
+                elif game_state is None:
+                    response = NOT_STARTED
+                else:
+                    handler, mutates = ACTIONS[name]
+                    response = handler(game_state, item)
+                    changed = changed or (mutates and response['success'])
+                results.append({key: value for key, value in response.items() if key != 'gameState'})
+                if stop_on_error and not response['success']:
+                    break
+            if changed:
+                self.save(session_id, game_state)
+        return {
+            'success': True,
+            'tableId': session_id,
+            'results': results,
+            'gameState': format_game_state(game_state) if game_state is not None else None
+        }
+
+    def batch(self, session_id, data):
+        """Handle /api/batch.
+
+        ``{"actions": [...]}`` runs against the caller's table.
+        ``{"tables": {"name": [...], ...}}`` runs each list against a named side
+        table belonging to the caller, so one client can drive many tables.
+        Side tables are stored as ``<table id>/<name>``, so names follow the
+        table id rules.
+        """
+        if not isinstance(data, dict):
+            return NOT_AN_OBJECT
+        tables = data.get('tables')
+        actions = data.get('actions')
+        if tables is None:
+            tables = {None: actions}
+        if not isinstance(tables, dict) or not all(isinstance(items, list) for items in tables.values()):
+            return {'success': False, 'message': 'Expected "actions" as a list or "tables" as lists by name'}
+        if sum(len(items) for items in tables.values()) > MAX_BATCH_ACTIONS:
+            return {'success': False, 'message': f'At most {MAX_BATCH_ACTIONS} actions per batch'}
+
+        stop_on_error = bool(data.get('stopOnError'))
+        if None in tables:
+            return self.perform_batch(session_id, tables[None], stop_on_error)
+        if len(tables) > MAX_BATCH_TABLES:
+            return {'success': False, 'message': f'At most {MAX_BATCH_TABLES} tables per batch'}
+        if not all(checked_table_id(name) for name in tables):
+            return {'success': False, 'message': 'Table names must be 1-64 letters, digits, "-" or "_"'}
+        return {
+            'success': True,
+            'tableId': session_id,
+            'tables': {name: self.perform_batch(f'{session_id}/{name}', items, stop_on_error)
+                       for name, items in tables.items()}
+        }
+
+    def snapshot(self, session_id):
+        """(ETag, encoded /api/state body) for a table, or None if it does not exist.
+
+        The body is encoded once per state version and cached in this process,
+        apart from the stored table, so polls only read the store and never
+        write to it.
+        """
+        with self.table_lock(session_id):
+            game_state = self.sessions.get(session_id)
+            if game_state is None:
+                return None
+            etag = f'{game_state["epoch"]:08x}-{game_state["version"]}'
+            cached = self._snapshots.get(session_id)
+            if cached is None or cached[0] != etag:
+                cached = (etag, dumps(get_state(game_state, {})))
+                with self._snapshots_guard:
+                    # Re-inserted so the oldest entries go first once the cache is full
+                    self._snapshots.pop(session_id, None)
+                    self._snapshots[session_id] = cached
+                    if len(self._snapshots) > self.sessions.capacity:
+                        del self._snapshots[next(iter(self._snapshots))]
+            return cached
+
+    def subscribe(self, session_id, loop=None):
+        """Subscribe to a table's changes: (subscriber, snapshot event), or None if it does not exist.
+
+        The snapshot is taken under the table lock, so it never shows a move
+        half applied. ``loop`` is as for ``Broadcaster.subscribe``.
+        """
+        with self.table_lock(session_id):
+            game_state = self.sessions.get(session_id)
+            if game_state is None:
+                return None
+            return self.broadcaster.subscribe(session_id, format_game_state(game_state), loop)
+
+    def stream(self, session_id):
+        """SSE generator for a table, or None if it does not exist."""
+        subscription = self.subscribe(session_id)
+        if subscription is None:
+            return None
+        return self.broadcaster.stream(session_id, *subscription)
@@ -0,0 +1,246 @@
+import abc
+import contextlib
+import hashlib
+import os
+import pickle
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CAPACITY = 10_000
+DEFAULT_TTL = 60 * 60  # seconds a table may sit idle before it is evicted
+SQLITE_EVICT_EVERY = 64  # writes between eviction sweeps of the shared database
+SQLITE_TOUCH_SECONDS = 60  # most a read lets last_used lag before writing it (at most a tenth of the TTL)
+
+# Where clients send the table id returned by /api/start; a table id chosen by
+# the client must be 1-64 URL-safe characters
+TABLE_ID_HEADER = 'X-Table-Id'
+TABLE_ID_PARAM = 'tableId'
+TABLE_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+def new_table_id():
+    """A fresh, unguessable table id."""
+    return secrets.token_urlsafe(12)
+
+
+def checked_table_id(table_id):
+    """``table_id`` if it is a well-formed id, else None."""
+    if isinstance(table_id, str) and TABLE_ID_PATTERN.fullmatch(table_id):
+        return table_id
+    return None
+
+
+def table_key(table_id):
+    """Stable 64-bit key for a table id, identical across processes."""
+    return int.from_bytes(hashlib.blake2b(str(table_id).encode(), digest_size=8).digest(), 'little')
+
+
+class SessionStore(abc.ABC):
+    """Interface for game-state storage keyed by session id.
+
+    ``get`` returns None for unknown or expired sessions. Callers mutate the
+    returned state and hand it back with ``set`` so that stores living
+    outside the process see the change, inside ``transaction`` so that no
+    other process changes the session in between.
+    """
+
+    # True when get/set do I/O that should be kept off an event loop
+    blocking = False
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, ttl=DEFAULT_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abc.abstractmethod
+    def get(self, session_id):
+        """The session's game state, or None."""
+
+    @abc.abstractmethod
+    def set(self, session_id, game_state):
+        """Store a session's game state."""
+
+    @abc.abstractmethod
+    def delete(self, session_id):
+        """Forget a session."""
+
+    @abc.abstractmethod
+    def __len__(self):
+        """Number of sessions held."""
+
+    @contextlib.contextmanager
+    def transaction(self, session_id):
+        """Make a get, change and set of one session atomic.
+
+        Callers in one process already serialize moves per table, so stores
+        that live in the process need nothing more.
+        """
+        yield
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+    def stats(self):
+        """Counters describing the store, for monitoring."""
+        return {
+            'backend': type(self).__name__,
+            'size': len(self),
+            'capacity': self.capacity,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store with least-recently-used and idle-time eviction."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, ttl=DEFAULT_TTL):
+        super().__init__(capacity, ttl)
+        self._entries = OrderedDict()  # session_id -> (last_used, game_state)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or now - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[session_id]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries[session_id] = (now, entry[1])
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, session_id, game_state):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[session_id] = (now, game_state)
+            self._entries.move_to_end(session_id)
+            self._evict(now)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def _evict(self, now):
+        # Oldest entries sit at the front, so stop at the first live one.
+        entries = self._entries
+        while entries:
+            session_id, (last_used, _) = next(iter(entries.items()))
+            if len(entries) <= self.capacity and now - last_used <= self.ttl:
+                break
+            del entries[session_id]
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Store backed by an SQLite file so several worker processes share tables.
+
+    States are pickled into a single row per session. Hit/miss/eviction
+    counters are per process; size reflects the shared database.
+
+    Reads refresh a session's last use like MemorySessionStore does, so a
+    table that is only polled stays alive and eviction drops the least
+    recently used. To keep most reads from writing, the refresh waits until
+    the stored time is SQLITE_TOUCH_SECONDS (or a tenth of the TTL) old.
+    """
+
+    blocking = True
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, ttl=DEFAULT_TTL):
+        super().__init__(capacity, ttl)
+        self.path = path
+        self.touch_after = min(SQLITE_TOUCH_SECONDS, ttl / 10)
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._connection()
+        conn.execute('CREATE TABLE IF NOT EXISTS sessions ('
+                     'id TEXT PRIMARY KEY, state BLOB NOT NULL, last_used REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)')
+
+    def _connection(self):
+        # sqlite3 connections may not be shared between threads.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute('SELECT state, last_used FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            if row is not None:
+                conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+                self.evictions += 1
+            self.misses += 1
+            return None
+        if now - row[1] > self.touch_after:
+            conn.execute('UPDATE sessions SET last_used = ? WHERE id = ?', (now, session_id))
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, session_id, game_state):
+        now = time.time()
+        conn = self._connection()
+        conn.execute('INSERT OR REPLACE INTO sessions (id, state, last_used) VALUES (?, ?, ?)',
+                     (session_id, pickle.dumps(game_state, pickle.HIGHEST_PROTOCOL), now))
+        self._writes += 1
+        if self._writes % SQLITE_EVICT_EVERY == 0:
+            self._evict(conn, now)
+
+    def delete(self, session_id):
+        self._connection().execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+
+    @contextlib.contextmanager
+    def transaction(self, session_id):
+        # BEGIN IMMEDIATE takes the database's write lock before the read, so
+        # no other process can change the row between get and set.
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _evict(self, conn, now):
+        expired = conn.execute('DELETE FROM sessions WHERE last_used < ?', (now - self.ttl,)).rowcount
+        overflow = conn.execute(
+            'DELETE FROM sessions WHERE id IN ('
+            'SELECT id FROM sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?)', (self.capacity,)).rowcount
+        self.evictions += expired + overflow
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+
+def create_session_store():
+    """Build the session store selected by the BLACKJACK_SESSION_* environment variables."""
+    backend = os.environ.get('BLACKJACK_SESSION_STORE', 'memory')
+    capacity = int(os.environ.get('BLACKJACK_SESSION_CAPACITY', DEFAULT_CAPACITY))
+    ttl = float(os.environ.get('BLACKJACK_SESSION_TTL', DEFAULT_TTL))
+    if backend == 'memory':
+        return MemorySessionStore(capacity, ttl)
+    if backend == 'sqlite':
+        path = os.environ.get('BLACKJACK_SESSION_DB', 'sessions.db')
+        return SQLiteSessionStore(path, capacity, ttl)
+    raise ValueError(f'Unknown session store: {backend}')
@@ -0,0 +1,60 @@
+import random
+from array import array
+
+from cards import create_deck
+
+MIN_DECKS = 1
+MAX_DECKS = 8
+
+
+class Shoe:
+    """A multi-deck shoe dealt from a cursor and reshuffled at the cut card.
+
+    The cards live in one preallocated array that is shuffled in place, so
+    dealing is an index bump and shuffling happens once per shoe rather than
+    once per round.
+    """
+
+    __slots__ = ('decks', 'penetration', 'cut_card', 'cursor', 'cards', '_rng')
+
+    def __init__(self, decks=1, penetration=0.75, rng=None, cards=None):
+        if not MIN_DECKS <= decks <= MAX_DECKS:
+            raise ValueError(f'decks must be between {MIN_DECKS} and {MAX_DECKS}')
+        if not 0 < penetration <= 1:
+            raise ValueError('penetration must be in (0, 1]')
+        self.decks = decks
+        self.penetration = penetration
+        self._rng = rng
+        if cards is None:
+            self.cards = array('B', create_deck() * decks)
+            self.shuffle()
+        else:
+            # A preset order (e.g. a recorded shoe) is dealt as-is.
+            self.cards = array('B', cards)
+            self.cursor = 0
+        self.cut_card = int(len(self.cards) * penetration)
+
+    def shuffle(self):
+        """Shuffle every card back into the shoe."""
+        # The module-level generator is used unless one was injected; keeping
+        # None here keeps the shoe picklable for shared session stores.
+        (self._rng or random).shuffle(self.cards)
+        self.cursor = 0
+
+    @property
+    def needs_shuffle(self):
+        """True once the cut card has come out."""
+        return self.cursor >= self.cut_card
+
+    @property
+    def remaining(self):
+        """Number of cards left to deal."""
+        return len(self.cards) - self.cursor
+
+    def deal(self):
+        """Deal the next card, reshuffling if the shoe runs out mid-round."""
+        if self.cursor >= len(self.cards):
+            self.shuffle()
+        card = self.cards[self.cursor]
+        self.cursor += 1
+        return card
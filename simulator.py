@@ -0,0 +1,186 @@
+import argparse
+import json
+
+import numpy as np
+
+# Point value of each rank code with aces counted as 1; the soft +10 is applied separately.
+HARD_VALUES = np.array([2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 1], dtype=np.int16)
+ACE = 12
+
+OUTCOMES = ['blackjack', 'win', 'push', 'lose', 'bust']
+BLACKJACK, WIN, PUSH, LOSE, BUST = range(len(OUTCOMES))
+
+
+def create_shoes(rounds, decks=1, rng=None):
+    """Create one freshly shuffled shoe of rank codes per round."""
+    rng = np.random.default_rng(rng)
+    base = np.tile(np.repeat(np.arange(13, dtype=np.int8), 4), decks)
+    return rng.permuted(np.tile(base, (rounds, 1)), axis=1)
+
+
+def hand_total(hard, aces):
+    """Best total for hands given their hard total and ace counts."""
+    return np.where((aces > 0) & (hard <= 11), hard + 10, hard)
+
+
+def play_rounds(shoes, bet=10, stand_on=17, double_on=(10, 11)):
+    """Play one round per shoe row and return (net winnings, outcome codes).
+
+    Cards are dealt from the front of each row in the same order as
+    ``blackjack_logic.place_bet``: two to the dealer, two to the player, then the
+    player's draws followed by the dealer's.
+    """
+    rounds = shoes.shape[0]
+    values = HARD_VALUES[shoes]
+    is_ace = shoes == ACE
+
+    dealer_hard = values[:, 0] + values[:, 1]
+    dealer_aces = is_ace[:, 0].astype(np.int16) + is_ace[:, 1]
+    player_hard = values[:, 2] + values[:, 3]
+    player_aces = is_ace[:, 2].astype(np.int16) + is_ace[:, 3]
+    pos = np.full(rounds, 4)
+
+    player_total = hand_total(player_hard, player_aces)
+    natural = player_total == 21
+
+    # Double down: exactly one more card on the opening two.
+    doubled = ~natural & np.isin(player_total, double_on)
+    idx = np.flatnonzero(doubled)
+    player_hard[idx] += values[idx, pos[idx]]
+    player_aces[idx] += is_ace[idx, pos[idx]]
+    pos[idx] += 1
+
+    # Hit until reaching the stand threshold or busting.
+    player_total = hand_total(player_hard, player_aces)
+    idx = np.flatnonzero(~natural & ~doubled & (player_total < stand_on))
+    while idx.size:
+        player_hard[idx] += values[idx, pos[idx]]
+        player_aces[idx] += is_ace[idx, pos[idx]]
+        pos[idx] += 1
+        player_total[idx] = hand_total(player_hard[idx], player_aces[idx])
+        idx = idx[player_total[idx] < stand_on]
+
+    # Dealer hits below 17; busted players lose regardless, so skip them.
+    busted = player_total > 21
+    dealer_total = hand_total(dealer_hard, dealer_aces)
+    idx = np.flatnonzero(~busted & (dealer_total < 17))
+    while idx.size:
+        dealer_hard[idx] += values[idx, pos[idx]]
+        dealer_aces[idx] += is_ace[idx, pos[idx]]
+        pos[idx] += 1
+        dealer_total[idx] = hand_total(dealer_hard[idx], dealer_aces[idx])
+        idx = idx[dealer_total[idx] < 17]
+
+    wager = np.where(doubled, 2 * bet, bet)
+    won = ~busted & ((dealer_total > 21) | (player_total > dealer_total))
+    lost = ~busted & ~won & (player_total < dealer_total)
+
+    net = np.zeros(rounds, dtype=np.int64)
+    net[won] = wager[won]
+    net[won & natural] = int(bet * 1.5)
+    net[lost | busted] = -wager[lost | busted]
+
+    outcome = np.full(rounds, PUSH, dtype=np.int8)
+    outcome[won] = WIN
+    outcome[won & natural] = BLACKJACK
+    outcome[lost] = LOSE
+    outcome[busted] = BUST
+    return net, outcome
+
+
+def simulate(rounds, decks=1, bet=10, stand_on=17, double_on=(10, 11), seed=None, batch_size=100_000):
+    """Simulate ``rounds`` independent rounds and return aggregate statistics."""
+    rng = np.random.default_rng(seed)
+    total = 0
+    total_sq = 0
+    outcome_counts = np.zeros(len(OUTCOMES), dtype=np.int64)
+    net_counts = {}
+
+    remaining = rounds
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        net, outcome = play_rounds(create_shoes(size, decks, rng), bet, stand_on, double_on)
+        total += int(net.sum())
+        total_sq += int((net * net).sum())
+        outcome_counts += np.bincount(outcome, minlength=len(OUTCOMES))
+        for value, count in zip(*np.unique(net, return_counts=True)):
+            net_counts[int(value)] = net_counts.get(int(value), 0) + int(count)
+        remaining -= size
+
+    ev = total / rounds if rounds else 0.0
+    variance = total_sq / rounds - ev * ev if rounds else 0.0
+    return {
+        'rounds': rounds,
+        'bet': bet,
+        'ev': ev,
+        'edge': ev / bet,
+        'variance': variance,
+        'stdError': (variance / rounds) ** 0.5 if rounds else 0.0,
+        'outcomes': dict(zip(OUTCOMES, outcome_counts.tolist())),
+        'netHistogram': dict(sorted(net_counts.items())),
+    }
+
+
+def verify_against_scalar(rounds=1000, decks=1, bet=10, stand_on=17, double_on=(10, 11), seed=0):
+    """Replay seeded shoes through the rules in blackjack_logic.py and return mismatched round indices."""
+    from blackjack_logic import can_double_down, create_player, deal_card, dealer_play, determine_winners
+    from cards import Hand, SeatHand
+    from rules import DEFAULT_RULES
+    from shoe import Shoe
+
+    shoes = create_shoes(rounds, decks, np.random.default_rng(seed))
+    net, _ = play_rounds(shoes, bet, stand_on, double_on)
+
+    mismatches = []
+    for i, ranks in enumerate(shoes):
+        # Rank codes match cards.py, so a rank is also the id of its Hearts card.
+        shoe = Shoe(decks, cards=ranks.tolist())
+        balance = bet * 4
+        player = create_player(1, 'Sim', balance)
+        player['bet'] = bet
+        game_state = {'shoe': shoe, 'players': [player], 'rules': DEFAULT_RULES}
+        game_state['dealerHand'] = Hand([deal_card(shoe), deal_card(shoe)])
+        game_state['dealerTotal'] = game_state['dealerHand'].total
+        hand = player['hand'] = SeatHand([deal_card(shoe), deal_card(shoe)], bet)
+        player['hands'] = [hand]
+
+        if not hand.is_blackjack:
+            if hand.total in double_on and can_double_down(player):
+                hand.bet *= 2
+                hand.append(deal_card(shoe))
+            else:
+                while hand.total < stand_on:
+                    hand.append(deal_card(shoe))
+
+        dealer_play(game_state)
+        determine_winners(game_state)
+        if player['balance'] - balance != net[i]:
+            mismatches.append(i)
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Vectorized blackjack Monte Carlo simulator.')
+    parser.add_argument('--rounds', type=int, default=1_000_000)
+    parser.add_argument('--decks', type=int, default=1)
+    parser.add_argument('--bet', type=int, default=10)
+    parser.add_argument('--stand-on', type=int, default=17, help='player hits below this total')
+    parser.add_argument('--double-on', type=int, nargs='*', default=[10, 11], help='opening totals to double on')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=100_000)
+    parser.add_argument('--verify', type=int, default=0, metavar='N',
+                        help='also check N seeded rounds against the scalar rules in blackjack_logic.py')
+    args = parser.parse_args(argv)
+
+    stats = simulate(args.rounds, args.decks, args.bet, args.stand_on, tuple(args.double_on),
+                     args.seed, args.batch_size)
+    if args.verify:
+        mismatches = verify_against_scalar(args.verify, args.decks, args.bet, args.stand_on,
+                                           tuple(args.double_on), args.seed or 0)
+        stats['verify'] = {'rounds': args.verify, 'mismatches': len(mismatches)}
+    print(json.dumps(stats, indent=2))
+    return 1 if stats.get('verify', {}).get('mismatches') else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,242 @@
+"""Import time and first-request latency of the servers, each in a fresh process.
+
+Autoscaled instances pay for start-up on every launch, so this measures it:
+
+    python startup_report.py                  # run, save startup_results.json
+    python startup_report.py --compare        # fail on regressions vs the baseline
+    python startup_report.py --save-baseline  # record a new baseline
+
+Import times are the median of ``--runs`` fresh interpreters importing the
+module, with the heaviest of its direct imports from ``-X importtime``. Each
+request is then timed twice in a fresh process: the first call of its kind,
+which pays for whatever loads lazily, and the same call on a second table.
+The servers index the built client in memory (BLACKJACK_STATIC=memory) for
+the static request. Bytecode is compiled beforehand so stale .pyc files do
+not count.
+"""
+import argparse
+import asyncio
+import compileall
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, 'startup_baseline.json')
+RESULTS_PATH = 'startup_results.json'
+
+# Modules timed on import, and the servers whose requests are timed
+IMPORT_MODULES = ('app', 'asgi', 'router')
+SERVERS = ('app', 'asgi')
+
+# Seeded shuffles, so every run deals the same cards
+CHILD_ENV = {'BLACKJACK_RNG': 'random', 'BLACKJACK_RNG_SEED': '1', 'BLACKJACK_SESSION_STORE': 'memory',
+             'BLACKJACK_STATIC': 'memory'}
+
+# Times an import in a bare interpreter, so nothing this script imports is preloaded
+IMPORT_TIMER = ('import sys, time; start = time.perf_counter(); __import__(sys.argv[1]); '
+                'print(time.perf_counter() - start)')
+
+# Requests timed in order: (name, method, path, payload)
+REQUESTS = (
+    ('start', 'POST', '/api/start', {'playerNames': ['Bot'], 'balance': 1000}),
+    ('bet', 'POST', '/api/bet', {'playerId': 1, 'bet': 10}),
+    ('hint', 'POST', '/api/hint', {'playerId': 1}),
+    ('exact-hint', 'POST', '/api/exact-hint', {'playerId': 1}),
+    ('state', 'GET', '/api/state', None),
+    ('static', 'GET', '/', None),
+)
+TABLES = ('startup-a', 'startup-b')
+
+# A slowdown is only flagged when it is also at least this many milliseconds
+MIN_REGRESSION_MS = 5
+
+
+class FlaskClient:
+    def __init__(self):
+        from app import app
+        self.client = app.test_client()
+
+    def request(self, method, path, payload, table):
+        response = self.client.open(path, method=method, json=payload, headers={'X-Table-Id': table})
+        return response.status_code, response.get_json(silent=True)
+
+
+class AsgiClient:
+    """Calls the ASGI app directly, on one event loop."""
+
+    def __init__(self):
+        from asgi import app
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+
+    def request(self, method, path, payload, table):
+        return self.loop.run_until_complete(self._request(method, path, payload, table))
+
+    async def _request(self, method, path, payload, table):
+        body = json.dumps(payload).encode() if payload is not None else b''
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+                 'headers': [(b'content-type', b'application/json'), (b'x-table-id', table.encode())]}
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        await self.app(scope, receive, send)
+        status = messages[0]['status']
+        content = b''.join(message.get('body', b'') for message in messages[1:])
+        try:
+            return status, json.loads(content)
+        except ValueError:
+            return status, None
+
+
+CLIENTS = {'app': FlaskClient, 'asgi': AsgiClient}
+
+
+def child_requests(server):
+    """Milliseconds of the first and second call of each request."""
+    client = CLIENTS[server]()
+    report = {}
+    for name, method, path, payload in REQUESTS:
+        if name == 'hint':
+            # Hints need a hand in play; deal again (untimed) after a blackjack
+            for table in TABLES:
+                for _ in range(20):
+                    _, body = client.request('GET', '/api/state', None, table)
+                    if body['gameState']['gamePhase'] == 'playing':
+                        break
+                    client.request('POST', '/api/next-round', {}, table)
+                    client.request('POST', '/api/bet', {'playerId': 1, 'bet': 10}, table)
+        timings = []
+        for table in TABLES:
+            start = time.perf_counter()
+            status, body = client.request(method, path, payload, table)
+            timings.append(1000 * (time.perf_counter() - start))
+        ok = status < 400 and (body is None or body.get('success', True))
+        report[name] = {'firstMs': timings[0], 'secondMs': timings[1], 'ok': bool(ok)}
+    return report
+
+
+def run_child(*args):
+    """Standard output of a fresh interpreter run with ``args``."""
+    return subprocess.run([sys.executable, *args], cwd=HERE, env=dict(os.environ, **CHILD_ENV),
+                          capture_output=True, text=True, check=True).stdout
+
+
+def heaviest_imports(module, count=5):
+    """(name, ms) of the direct imports of ``module`` that take longest, from -X importtime."""
+    lines = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=HERE,
+                           env=dict(os.environ, **CHILD_ENV), capture_output=True, text=True,
+                           check=True).stderr.splitlines()
+    # A module's imports are listed just before it, indented two spaces per level
+    end = max(i for i, line in enumerate(lines) if line.endswith(f'| {module}'))
+    direct = []
+    for line in reversed(lines[:end]):
+        _, cumulative, name = line.split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        if depth == 0:
+            break
+        if depth == 1:
+            direct.append((name.strip(), int(cumulative) / 1000))
+    return sorted(direct, key=lambda item: -item[1])[:count]
+
+
+def measure_imports(modules, runs):
+    results = {}
+    for module in modules:
+        samples = [1000 * float(run_child('-c', IMPORT_TIMER, module)) for _ in range(runs)]
+        heaviest = heaviest_imports(module)
+        results[module] = {
+            'medianMs': statistics.median(samples),
+            'minMs': min(samples),
+            'heaviest': [{'module': name, 'ms': ms} for name, ms in heaviest],
+        }
+        names = ', '.join(f'{name} {ms:.0f}' for name, ms in heaviest)
+        print(f'import {module:<8}{results[module]["medianMs"]:>8.1f} ms median  (heaviest, ms: {names})')
+    return results
+
+
+def measure_requests(servers):
+    results = {}
+    for server in servers:
+        results[server] = json.loads(run_child(os.path.abspath(__file__), '--child-requests', server))
+        print(f'{server}:')
+        for name, timing in results[server].items():
+            flag = '' if timing['ok'] else '  (failed)'
+            print(f'  {name:<12} first {timing["firstMs"]:>8.2f} ms   second {timing["secondMs"]:>8.2f} ms{flag}')
+    return results
+
+
+def timings(report):
+    """Flat {label: ms} of the figures compared against the baseline."""
+    flat = {f'import {module}': result['medianMs'] for module, result in report['imports'].items()}
+    for server, result in report['requests'].items():
+        for name, timing in result.items():
+            flat[f'{server} first {name}'] = timing['firstMs']
+    return flat
+
+
+def compare(report, baseline, threshold):
+    """Labels of the figures more than ``threshold`` (and MIN_REGRESSION_MS) slower than the baseline."""
+    regressions = []
+    base = timings(baseline)
+    for label, ms in timings(report).items():
+        if label not in base:
+            continue
+        change = ms / base[label] - 1
+        flag = 'REGRESSION' if change > threshold and ms - base[label] >= MIN_REGRESSION_MS else ''
+        print(f'{label:<28}{change:>+9.1%} vs baseline {flag}')
+        if flag:
+            regressions.append(label)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure server import time and first-request latency.')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per import timing')
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--compare', action='store_true', help='exit non-zero on regressions vs the baseline')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.20, help='allowed slowdown before flagging')
+    parser.add_argument('--child-requests', choices=SERVERS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child_requests:
+        print(json.dumps(child_requests(args.child_requests)))
+        return 0
+    if args.compare and not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f'no baseline at {args.baseline}; record one with --save-baseline')
+
+    compileall.compile_dir(HERE, maxlevels=0, quiet=1)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'imports': measure_imports(IMPORT_MODULES, args.runs),
+        'requests': measure_requests(SERVERS),
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
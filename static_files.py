@@ -0,0 +1,166 @@
+"""In-memory index of the built client, served without touching the disk.
+
+With ``BLACKJACK_STATIC=memory`` the servers read every file under
+``client/dist`` once at start-up and answer static requests from memory.
+Each file keeps its bytes, a gzip copy and, when the optional ``brotli``
+package is installed, a brotli copy; a ``.gz`` or ``.br`` file the build
+left next to it is used instead of compressing again. Every variant has its
+own ETag, so ``If-None-Match`` revalidation gets ``304 Not Modified``.
+
+Vite writes bundles to ``assets/`` with a content hash in the name, so those
+are cached by browsers for a year as immutable. Everything else, index.html
+included, must be revalidated. A path that names no file gets index.html,
+which lets the client route it.
+
+The default, ``BLACKJACK_STATIC=disk``, reads files per request as before,
+which suits development while the client is being rebuilt.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from collections import namedtuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_ENV = 'BLACKJACK_STATIC'
+STATIC_MODES = ('disk', 'memory')
+STATIC_DIR = 'client/dist'
+INDEX_FILE = 'index.html'
+
+# Content-hashed bundles never change under the same name
+IMMUTABLE_PREFIX = 'assets/'
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+# Smaller files gain too little from compression to be worth a variant
+MIN_COMPRESS_BYTES = 256
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+COMPRESSIBLE_TYPES = {'application/javascript', 'text/javascript', 'application/json', 'application/manifest+json',
+                      'application/xml', 'image/svg+xml', 'application/wasm'}
+
+# Content-Encoding -> file suffix of a precompressed copy, in order of preference
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+# One file: its identity bytes and ETag, plus encoding -> (bytes, ETag) for compressed copies
+StaticFile = namedtuple('StaticFile', 'content_type cache_control body etag variants')
+
+
+def compressible(content_type):
+    return content_type.startswith('text/') or content_type in COMPRESSIBLE_TYPES
+
+
+def compress(encoding, body):
+    """``body`` compressed with ``encoding``, or None if that encoder is unavailable."""
+    if encoding == 'gzip':
+        return gzip.compress(body, GZIP_LEVEL, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return None
+
+
+def accepted_encodings(value):
+    """Encodings an Accept-Encoding header allows, ignoring those given q=0."""
+    accepted = set()
+    for item in (value or '').split(','):
+        name, _, params = item.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q=') and params[2:].strip('0.') == '':
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def etag_listed(value, etag):
+    """True if an If-None-Match header value lists ``etag`` (or is ``*``)."""
+    if value is None:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in value.split(',')]
+    return '*' in tags or etag in tags
+
+
+class StaticIndex:
+    """Every file under a directory, with its compressed copies, read once."""
+
+    def __init__(self, root=STATIC_DIR):
+        self.root = root
+        self.files = {}
+        self.bytes = 0
+        if not os.path.isdir(root):
+            return
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.relpath(os.path.join(directory, name), root).replace(os.sep, '/')
+                if os.path.splitext(path)[1] in ENCODINGS.values() and os.path.exists(os.path.join(root, path[:-3])):
+                    continue
+                self.files[path] = self._load(path)
+
+    def _load(self, path):
+        full_path = os.path.join(self.root, path)
+        with open(full_path, 'rb') as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        variants = {}
+        for encoding, suffix in ENCODINGS.items():
+            if os.path.exists(full_path + suffix):
+                with open(full_path + suffix, 'rb') as f:
+                    compressed = f.read()
+            elif compressible(content_type) and len(body) >= MIN_COMPRESS_BYTES:
+                compressed = compress(encoding, body)
+            else:
+                compressed = None
+            if compressed is not None and len(compressed) < len(body):
+                variants[encoding] = (compressed, f'"{digest}-{encoding}"')
+                self.bytes += len(compressed)
+        self.bytes += len(body)
+        cache_control = IMMUTABLE_CACHE if path.startswith(IMMUTABLE_PREFIX) else REVALIDATE_CACHE
+        return StaticFile(content_type, cache_control, body, f'"{digest}"', variants)
+
+    def lookup(self, path):
+        """The file at a URL path, index.html for a path that names none, or None."""
+        path = path.lstrip('/')
+        return self.files.get(path or INDEX_FILE) or self.files.get(INDEX_FILE)
+
+    def respond(self, path, accept_encoding=None, if_none_match=None):
+        """(status, headers, body) for a GET of ``path``, or None if there is nothing to serve.
+
+        Headers are (name, value) string pairs; the body of a 304 is empty.
+        """
+        static_file = self.lookup(path)
+        if static_file is None:
+            return None
+        body, etag = static_file.body, static_file.etag
+        headers = [('Cache-Control', static_file.cache_control)]
+        if static_file.variants:
+            headers.append(('Vary', 'Accept-Encoding'))
+            accepted = accepted_encodings(accept_encoding)
+            for encoding in ENCODINGS:
+                if encoding in static_file.variants and encoding in accepted:
+                    body, etag = static_file.variants[encoding]
+                    headers.append(('Content-Encoding', encoding))
+                    break
+        headers.append(('ETag', etag))
+        if etag_listed(if_none_match, etag):
+            return 304, [header for header in headers if header[0] != 'Content-Encoding'], b''
+        headers += [('Content-Type', static_file.content_type), ('Content-Length', str(len(body)))]
+        return 200, headers, body
+
+
+def static_mode():
+    """Static file mode from BLACKJACK_STATIC: 'disk' (default) or 'memory'."""
+    mode = os.environ.get(STATIC_ENV, 'disk')
+    if mode not in STATIC_MODES:
+        raise ValueError(f'{STATIC_ENV} must be one of {", ".join(STATIC_MODES)}')
+    return mode
+
+
+def static_index_from_env():
+    """A StaticIndex of client/dist when BLACKJACK_STATIC=memory, else None."""
+    return StaticIndex() if static_mode() == 'memory' else None
@@ -0,0 +1,291 @@
+"""Basic-strategy and dealer-outcome tables.
+
+Dealer final-total distributions are computed exactly by memoized recursion
+over the shoe composition (full shoe minus the dealer's upcard), using the
+same rules as ``blackjack_logic.dealer_play``: the dealer stands on soft 17
+(S17) unless the tables are built for H17. Player hit/stand/double expected
+values follow from those distributions, as do split EVs for every pair,
+with and without doubling after a split (one split per pair, split aces
+take one card each). Everything is computed once and saved as packed
+float32 arrays, so the request path only does index arithmetic.
+"""
+import argparse
+import os
+import struct
+import sys
+from array import array
+
+from cards import CARD_POINTS
+
+MAGIC = b'BJST'
+VERSION = 2
+HEADER = struct.Struct('<4sHBBBBB')
+
+MAX_DECKS = 8
+NUM_TOTALS = 22  # indexed by total, 0-21
+NUM_UPCARDS = 10  # upcard points 2-11
+DEALER_OUTCOMES = ['17', '18', '19', '20', '21', 'bust']
+ACTIONS = ['stand', 'hit', 'double']
+STAND, HIT, DOUBLE = range(len(ACTIONS))
+SPLIT = 'split'
+
+# Point value per composition slot (2-9, ten-valued, ace) with aces counted as 1.
+HARD_VALUES = (2, 3, 4, 5, 6, 7, 8, 9, 10, 1)
+ACE_SLOT = 9
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'strategy.bin')
+
+
+def card_slot(points):
+    """Composition slot of a card with the given point value."""
+    return ACE_SLOT if points == 11 else points - 2
+
+
+def _full_shoe(decks):
+    return [4 * decks] * 8 + [16 * decks, 4 * decks]
+
+
+def _dealer_distribution(counts, hard, has_ace, memo, hits_soft_17=False):
+    """Probability of each dealer outcome when drawing from ``counts``."""
+    total = hard + 10 if has_ace and hard <= 11 else hard
+    if total >= 17 and not (hits_soft_17 and total == 17 and has_ace and hard == 7):
+        dist = [0.0] * len(DEALER_OUTCOMES)
+        dist[total - 17 if total <= 21 else 5] = 1.0
+        return dist
+    key = (counts, hard, has_ace)
+    cached = memo.get(key)
+    if cached is not None:
+        return cached
+
+    dist = [0.0] * len(DEALER_OUTCOMES)
+    remaining = sum(counts)
+    for slot, count in enumerate(counts):
+        if not count:
+            continue
+        drawn = counts[:slot] + (count - 1,) + counts[slot + 1:]
+        sub = _dealer_distribution(drawn, hard + HARD_VALUES[slot], has_ace or slot == ACE_SLOT, memo, hits_soft_17)
+        weight = count / remaining
+        for i, p in enumerate(sub):
+            dist[i] += weight * p
+    memo[key] = dist
+    return dist
+
+
+def stand_ev(total, dealer):
+    """EV per unit bet of standing on ``total`` against a distribution of dealer outcomes."""
+    if total > 21:
+        return -1.0
+    ev = dealer[5]
+    for i, p in enumerate(dealer[:5]):
+        dealer_total = 17 + i
+        if total > dealer_total:
+            ev += p
+        elif total < dealer_total:
+            ev -= p
+    return ev
+
+
+def _player_evs(dealer, probs):
+    """EV per unit bet of (stand, hit, double) for every (soft, total), and of splitting each pair.
+
+    Split EVs are keyed by (double after split, pair slot) and cover both
+    resulting hands, so they compare directly with the other actions.
+    """
+    memo = {}
+
+    def best(hard, has_ace):
+        if hard > 21:
+            return -1.0
+        total = hard + 10 if has_ace and hard <= 11 else hard
+        return max(stand_ev(total, dealer), hit(hard, has_ace))
+
+    def hit(hard, has_ace):
+        key = (hard, has_ace)
+        if key not in memo:
+            memo[key] = sum(p * best(hard + HARD_VALUES[slot], has_ace or slot == ACE_SLOT)
+                            for slot, p in enumerate(probs) if p)
+        return memo[key]
+
+    def double(hard, has_ace):
+        ev = 0.0
+        for slot, p in enumerate(probs):
+            new_hard = hard + HARD_VALUES[slot]
+            new_ace = has_ace or slot == ACE_SLOT
+            ev += p * stand_ev(new_hard + 10 if new_ace and new_hard <= 11 else new_hard, dealer)
+        return 2 * ev
+
+    def split(slot, double_after_split):
+        ev = 0.0
+        for drawn, p in enumerate(probs):
+            new_hard = HARD_VALUES[slot] + HARD_VALUES[drawn]
+            new_ace = slot == ACE_SLOT or drawn == ACE_SLOT
+            value = stand_ev(new_hard + 10 if new_ace and new_hard <= 11 else new_hard, dealer)
+            if slot != ACE_SLOT:
+                value = max(value, hit(new_hard, new_ace))
+                if double_after_split:
+                    value = max(value, double(new_hard, new_ace))
+            ev += p * value
+        return 2 * ev
+
+    evs = {}
+    for total in range(4, 22):
+        evs[(0, total)] = (stand_ev(total, dealer), hit(total, False), double(total, False))
+    for total in range(12, 22):
+        evs[(1, total)] = (stand_ev(total, dealer), hit(total - 10, True), double(total - 10, True))
+    splits = {(das, slot): split(slot, das) for das in (0, 1) for slot in range(len(HARD_VALUES))}
+    return evs, splits
+
+
+def compute_tables(max_decks=MAX_DECKS, hits_soft_17=False):
+    """Compute (player EVs, dealer outcomes, split EVs) as flat float32 arrays."""
+    player = array('f', bytes(4 * max_decks * 2 * NUM_TOTALS * NUM_UPCARDS * len(ACTIONS)))
+    dealer = array('f', bytes(4 * max_decks * NUM_UPCARDS * len(DEALER_OUTCOMES)))
+    split = array('f', bytes(4 * max_decks * 2 * NUM_UPCARDS * NUM_UPCARDS))
+    for decks in range(1, max_decks + 1):
+        memo = {}
+        for up in range(NUM_UPCARDS):
+            up_slot = card_slot(up + 2)
+            counts = _full_shoe(decks)
+            counts[up_slot] -= 1
+            counts = tuple(counts)
+            dist = _dealer_distribution(counts, HARD_VALUES[up_slot], up_slot == ACE_SLOT, memo, hits_soft_17)
+            offset = _dealer_index(decks, up)
+            dealer[offset:offset + len(dist)] = array('f', dist)
+
+            remaining = sum(counts)
+            probs = [count / remaining for count in counts]
+            evs, splits = _player_evs(dist, probs)
+            for (soft, total), action_evs in evs.items():
+                offset = _player_index(decks, soft, total, up)
+                player[offset:offset + len(ACTIONS)] = array('f', action_evs)
+            for (das, slot), ev in splits.items():
+                split[_split_index(decks, das, slot, up)] = ev
+    return player, dealer, split
+
+
+def _player_index(decks, soft, total, up):
+    return (((decks - 1) * 2 + soft) * NUM_TOTALS + total) * NUM_UPCARDS * len(ACTIONS) + up * len(ACTIONS)
+
+
+def _dealer_index(decks, up):
+    return ((decks - 1) * NUM_UPCARDS + up) * len(DEALER_OUTCOMES)
+
+
+def _split_index(decks, das, pair, up):
+    # Pairs are indexed by point value like upcards, 2-11
+    return (((decks - 1) * 2 + das) * NUM_UPCARDS + pair) * NUM_UPCARDS + up
+
+
+class StrategyTables:
+    """Precomputed tables with O(1) lookups by hand state and dealer upcard."""
+
+    __slots__ = ('max_decks', 'player', 'dealer', 'split')
+
+    def __init__(self, max_decks, player, dealer, split):
+        self.max_decks = max_decks
+        self.player = player
+        self.dealer = dealer
+        self.split = split
+
+    @classmethod
+    def build(cls, max_decks=MAX_DECKS, hits_soft_17=False):
+        """Compute the tables from scratch; the saved file holds the S17 tables."""
+        return cls(max_decks, *compute_tables(max_decks, hits_soft_17))
+
+    @classmethod
+    def load(cls, path):
+        """Load tables written by ``save``."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, max_decks, totals, upcards, actions, outcomes = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or (totals, upcards, actions, outcomes) != (
+                NUM_TOTALS, NUM_UPCARDS, len(ACTIONS), len(DEALER_OUTCOMES)):
+            raise ValueError(f'{path} is not a compatible strategy table file')
+        player = array('f')
+        dealer = array('f')
+        split = array('f')
+        dealer_start = HEADER.size + 4 * max_decks * 2 * NUM_TOTALS * NUM_UPCARDS * len(ACTIONS)
+        split_start = dealer_start + 4 * max_decks * NUM_UPCARDS * len(DEALER_OUTCOMES)
+        player.frombytes(data[HEADER.size:dealer_start])
+        dealer.frombytes(data[dealer_start:split_start])
+        split.frombytes(data[split_start:])
+        if len(split) != max_decks * 2 * NUM_UPCARDS * NUM_UPCARDS:
+            raise ValueError(f'{path} is truncated')
+        if sys.byteorder != 'little':
+            player.byteswap()
+            dealer.byteswap()
+            split.byteswap()
+        return cls(max_decks, player, dealer, split)
+
+    @classmethod
+    def load_or_build(cls, path=DEFAULT_TABLE_PATH):
+        """Load tables from ``path``, building and saving them if missing."""
+        try:
+            return cls.load(path)
+        except (OSError, ValueError, struct.error):
+            tables = cls.build()
+            try:
+                tables.save(path)
+            except OSError:
+                pass
+            return tables
+
+    def save(self, path):
+        """Write the tables in the packed little-endian format read by ``load``."""
+        player = array('f', self.player)
+        dealer = array('f', self.dealer)
+        split = array('f', self.split)
+        if sys.byteorder != 'little':
+            player.byteswap()
+            dealer.byteswap()
+            split.byteswap()
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.max_decks, NUM_TOTALS, NUM_UPCARDS,
+                                len(ACTIONS), len(DEALER_OUTCOMES)))
+            f.write(player.tobytes())
+            f.write(dealer.tobytes())
+            f.write(split.tobytes())
+
+    def _decks(self, decks):
+        return min(max(decks, 1), self.max_decks)
+
+    def action_evs(self, total, soft, upcard, decks=1):
+        """EV per unit bet of (stand, hit, double) for a hand against a dealer upcard card."""
+        up = CARD_POINTS[upcard] - 2
+        offset = _player_index(self._decks(decks), int(soft), total, up)
+        return tuple(self.player[offset:offset + len(ACTIONS)])
+
+    def split_ev(self, pair, upcard, decks=1, double_after_split=True):
+        """EV per unit of the original bet of splitting a pair of ``pair`` cards."""
+        offset = _split_index(self._decks(decks), int(double_after_split), CARD_POINTS[pair] - 2,
+                              CARD_POINTS[upcard] - 2)
+        return self.split[offset]
+
+    def best_action(self, total, soft, upcard, decks=1, can_double=True, pair=None, double_after_split=True):
+        """Name of the highest-EV action and the EVs of the allowed actions.
+
+        ``pair`` is a card of the pair when the hand may be split.
+        """
+        evs = self.action_evs(total, soft, upcard, decks)
+        allowed = ACTIONS if can_double else ACTIONS[:DOUBLE]
+        evs = dict(zip(allowed, evs))
+        if pair is not None:
+            evs[SPLIT] = self.split_ev(pair, upcard, decks, double_after_split)
+        return max(evs, key=evs.get), evs
+
+    def dealer_outcomes(self, upcard, decks=1):
+        """Probability of each dealer final total given the upcard card."""
+        offset = _dealer_index(self._decks(decks), CARD_POINTS[upcard] - 2)
+        return dict(zip(DEALER_OUTCOMES, self.dealer[offset:offset + len(DEALER_OUTCOMES)]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the basic-strategy table file.')
+    parser.add_argument('path', nargs='?', default=DEFAULT_TABLE_PATH)
+    args = parser.parse_args(argv)
+    StrategyTables.build().save(args.path)
+    print(f'Wrote {args.path} ({os.path.getsize(args.path)} bytes)')
+
+
+if __name__ == '__main__':
+    main()
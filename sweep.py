@@ -0,0 +1,285 @@
+"""House edge of basic strategy across a grid of table rules and deck counts.
+
+Every cell of the grid (blackjack payout x dealer soft-17 rule x double
+after split x decks) is simulated on NumPy arrays, one row per round. Each
+row keeps its own shoe as a rank-count vector and draws from it without
+replacement, so a round costs the same with one deck or eight. The player
+follows the basic-strategy tables from strategy.py built for the cell's
+dealer rule, splitting pairs into up to ``MAX_SPLIT_HANDS`` hands, and
+rounds are settled the same way as ``blackjack_logic.determine_winners``.
+
+    python sweep.py --rounds 2000000 --decks 1 2 6 8 --workers 8
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+
+from blackjack_logic import MAX_SPLIT_HANDS
+from rules import DEFAULT_RULES, blackjack_win, parse_payout, rules_to_dict
+from strategy import ACE_SLOT, ACTIONS, DOUBLE, HARD_VALUES, HIT, NUM_TOTALS, NUM_UPCARDS, STAND, StrategyTables
+
+# HARD_VALUES as an array, so whole arrays of slots can be looked up at once
+SLOT_VALUES = np.array(HARD_VALUES, dtype=np.int16)
+Z_95 = 1.96
+
+DEFAULT_PAYOUTS = ['3:2', '6:5']
+DEFAULT_DECKS = [1, 2, 6, 8]
+
+
+def strategy_arrays(decks, rules):
+    """Basic-strategy decisions as arrays for one cell.
+
+    Returns (best first action, hit-or-stand flags) indexed by [soft, total,
+    upcard slot] and split flags indexed by [may double, pair slot, upcard
+    slot]. Upcard and pair slots run 2-9, ten, ace, the same order as the
+    strategy tables.
+    """
+    tables = StrategyTables.build(decks, rules.dealer_hits_soft_17)
+    evs = np.frombuffer(tables.player, dtype=np.float32).reshape(
+        decks, 2, NUM_TOTALS, NUM_UPCARDS, len(ACTIONS))[decks - 1]
+    split_evs = np.frombuffer(tables.split, dtype=np.float32).reshape(
+        decks, 2, NUM_UPCARDS, NUM_UPCARDS)[decks - 1, int(rules.double_after_split)]
+
+    # The pair's own two-card hand: A,A is soft 12, any other pair a hard total
+    pair_soft = np.arange(NUM_UPCARDS) == ACE_SLOT
+    pair_total = np.where(pair_soft, 12, 2 * SLOT_VALUES)
+    pair_evs = evs[pair_soft.astype(np.intp), pair_total]
+    splits = np.stack([split_evs > pair_evs[..., :DOUBLE].max(axis=-1),
+                       split_evs > pair_evs.max(axis=-1)])
+    return evs.argmax(axis=-1), evs[..., HIT] > evs[..., STAND], splits
+
+
+def draw(counts, rows, rng):
+    """Deal one card to each of ``rows`` from its own shoe; returns the composition slots."""
+    cumulative = counts[rows].cumsum(axis=1)
+    position = rng.integers(0, cumulative[:, -1])
+    slots = (cumulative <= position[:, None]).sum(axis=1)
+    counts[rows, slots] -= 1
+    return slots
+
+
+def hand_total(hard, aces):
+    """Best totals and soft flags for hands given their hard totals and ace flags."""
+    soft = aces & (hard <= 11)
+    return np.where(soft, hard + 10, hard), soft
+
+
+def play_rounds(rounds, decks, rules, strategy, rng, bet=10):
+    """Play ``rounds`` fresh-shoe rounds of basic strategy and return each round's net winnings."""
+    counts = np.tile(np.array([4] * 8 + [16, 4], dtype=np.int32) * decks, (rounds, 1))
+    return play_hands(rounds, rules, strategy, lambda rows: draw(counts, rows, rng), bet)
+
+
+def play_hands(rounds, rules, strategy, deal, bet=10):
+    """Play one round of basic strategy per row and return each round's net winnings.
+
+    ``deal(rows)`` deals one card to each of ``rows`` and returns their
+    composition slots; ``bet`` is one wager for every row or one per row.
+    Hands are columns of (rounds, MAX_SPLIT_HANDS) arrays. They are played
+    one column at a time, so a draw never deals twice from the same shoe;
+    a split moves one card of the pair to the row's next free column.
+    """
+    first_action, hits, splits = strategy
+    das = rules.double_after_split
+    bet = np.broadcast_to(np.asarray(bet, dtype=np.int64), (rounds,))
+    every = np.arange(rounds)
+
+    # Same deal order as place_bet: two to the dealer, then two to the player
+    up = deal(every)
+    hole = deal(every)
+    dealer_hard = SLOT_VALUES[up] + SLOT_VALUES[hole]
+    dealer_aces = (up == ACE_SLOT) | (hole == ACE_SLOT)
+
+    shape = (rounds, MAX_SPLIT_HANDS)
+    first_card = np.zeros(shape, dtype=np.intp)
+    second_card = np.zeros(shape, dtype=np.intp)
+    hard = np.zeros(shape, dtype=np.int16)
+    aces = np.zeros(shape, dtype=bool)
+    wager = np.zeros(shape, dtype=np.int64)
+    split = np.zeros(shape, dtype=bool)
+    done = np.zeros(shape, dtype=bool)
+    hands = np.ones(rounds, dtype=np.intp)
+
+    first_card[:, 0] = deal(every)
+    second_card[:, 0] = deal(every)
+    hard[:, 0] = SLOT_VALUES[first_card[:, 0]] + SLOT_VALUES[second_card[:, 0]]
+    aces[:, 0] = (first_card[:, 0] == ACE_SLOT) | (second_card[:, 0] == ACE_SLOT)
+    wager[:, 0] = bet
+    natural = hand_total(hard[:, 0], aces[:, 0])[0] == 21
+
+    def deal_split(rows, columns, pair, slots):
+        first_card[rows, columns] = pair
+        second_card[rows, columns] = slots
+        hard[rows, columns] = SLOT_VALUES[pair] + SLOT_VALUES[slots]
+        aces[rows, columns] = (pair == ACE_SLOT) | (slots == ACE_SLOT)
+        wager[rows, columns] = bet[rows]
+        split[rows, columns] = True
+        # Split aces get one card each and are not played further
+        done[rows, columns] = pair == ACE_SLOT
+
+    for column in range(MAX_SPLIT_HANDS):
+        rows = np.flatnonzero((hands > column) & ~natural & ~done[:, column])
+
+        # Split (and re-split) while the strategy says so and there is room
+        idx = rows
+        while idx.size:
+            pair = first_card[idx, column]
+            may_double = (~split[idx, column] | das).astype(np.intp)
+            wanted = ((pair == second_card[idx, column]) & (hands[idx] < MAX_SPLIT_HANDS) &
+                      splits[may_double, pair, up[idx]])
+            idx = idx[wanted]
+            pair = pair[wanted]
+            deal_split(idx, column, pair, deal(idx))
+            deal_split(idx, hands[idx], pair, deal(idx))
+            hands[idx] += 1
+            idx = idx[~done[idx, column]]
+        rows = rows[~done[rows, column]]
+
+        total, soft = hand_total(hard[rows, column], aces[rows, column])
+        soft = soft.astype(np.intp)
+        action = first_action[soft, total, up[rows]]
+        # Without double after split, a split hand that should double hits or stands instead
+        refused = (action == DOUBLE) & split[rows, column] & (not das)
+        action[refused] = np.where(hits[soft[refused], total[refused], up[rows[refused]]], HIT, STAND)
+
+        idx = rows[action == DOUBLE]
+        slots = deal(idx)
+        hard[idx, column] += SLOT_VALUES[slots]
+        aces[idx, column] |= slots == ACE_SLOT
+        wager[idx, column] *= 2
+
+        # Hit while the tables say so; a hand stops drawing at 21
+        idx = rows[action == HIT]
+        while idx.size:
+            slots = deal(idx)
+            hard[idx, column] += SLOT_VALUES[slots]
+            aces[idx, column] |= slots == ACE_SLOT
+            total, soft = hand_total(hard[idx, column], aces[idx, column])
+            keep = total < 21
+            keep[keep] = hits[soft[keep].astype(np.intp), total[keep], up[idx[keep]]]
+            idx = idx[keep]
+
+    player_total, _ = hand_total(hard, aces)
+    played = np.arange(MAX_SPLIT_HANDS) < hands[:, None]
+    busted = played & (player_total > 21)
+
+    # Dealer draws while dealer_hits() would; rows whose every hand busted lose regardless
+    dealer_total, dealer_soft = hand_total(dealer_hard, dealer_aces)
+    hit_soft_17 = rules.dealer_hits_soft_17
+    drawing = (dealer_total < 17) | (hit_soft_17 & (dealer_total == 17) & dealer_soft)
+    idx = np.flatnonzero((played & ~busted).any(axis=1) & drawing)
+    while idx.size:
+        slots = deal(idx)
+        dealer_hard[idx] += SLOT_VALUES[slots]
+        dealer_aces[idx] |= slots == ACE_SLOT
+        total, total_soft = hand_total(dealer_hard[idx], dealer_aces[idx])
+        dealer_total[idx] = total
+        idx = idx[(total < 17) | (hit_soft_17 & (total == 17) & total_soft)]
+
+    dealer_total = dealer_total[:, None]
+    won = played & ~busted & ((dealer_total > 21) | (player_total > dealer_total))
+    lost = busted | played & (player_total < dealer_total) & ~won
+
+    net = (wager * won).sum(axis=1) - (wager * lost).sum(axis=1)
+    blackjacks = natural & won[:, 0]
+    net[blackjacks] = blackjack_win(bet[blackjacks], rules)
+    return net
+
+
+def run_cell(rounds, decks, rules, seed, bet=10, batch_size=200_000):
+    """Simulate one grid cell and return its house edge with a 95% confidence interval."""
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    strategy = strategy_arrays(decks, rules)
+    total = 0
+    total_sq = 0
+    remaining = rounds
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        net = play_rounds(size, decks, rules, strategy, rng, bet)
+        total += int(net.sum())
+        total_sq += int((net * net).sum())
+        remaining -= size
+
+    ev = total / rounds
+    std_error = ((total_sq / rounds - ev * ev) / rounds) ** 0.5
+    # House edge is the player's expected loss per unit bet
+    edge = -ev / bet
+    margin = Z_95 * std_error / bet
+    return {
+        'rules': rules_to_dict(rules),
+        'decks': decks,
+        'rounds': rounds,
+        'houseEdge': edge,
+        'ci95': [edge - margin, edge + margin],
+        'stdError': std_error / bet,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def _run_cell(args):
+    return run_cell(*args)
+
+
+def grid(payouts=DEFAULT_PAYOUTS, soft_17_rules=(False, True), double_after_split=(True, False),
+         decks=DEFAULT_DECKS):
+    """Every (Rules, decks) combination of the given variants."""
+    return [(DEFAULT_RULES._replace(blackjack_payout=parse_payout(payout), dealer_hits_soft_17=h17,
+                                    double_after_split=das), count)
+            for payout, h17, das, count in product(payouts, soft_17_rules, double_after_split, decks)]
+
+
+def sweep(cells, rounds, seed=0, bet=10, workers=1):
+    """Run every (Rules, decks) cell; cells get independent RNG streams spawned from ``seed``."""
+    seeds = np.random.SeedSequence(seed).spawn(len(cells))
+    jobs = [(rounds, count, rules, cell_seed, bet) for (rules, count), cell_seed in zip(cells, seeds)]
+    if workers == 1:
+        return [_run_cell(job) for job in jobs]
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(_run_cell, jobs))
+
+
+def format_table(results):
+    lines = [f'{"payout":>6} {"dealer":>6} {"DAS":>4} {"decks":>5} {"edge %":>8} {"95% CI %":>19}']
+    for result in results:
+        rules = result['rules']
+        low, high = result['ci95']
+        lines.append(f'{rules["blackjackPayout"]:>6} {"H17" if rules["dealerHitsSoft17"] else "S17":>6} '
+                     f'{"yes" if rules["doubleAfterSplit"] else "no":>4} '
+                     f'{result["decks"]:>5} {100 * result["houseEdge"]:>8.3f} '
+                     f'{100 * low:>9.3f} {100 * high:>9.3f}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='House edge of basic strategy across rule variants.')
+    parser.add_argument('--rounds', type=int, default=1_000_000, help='rounds per cell')
+    parser.add_argument('--payouts', nargs='*', default=DEFAULT_PAYOUTS, help='blackjack payouts, e.g. 3:2 6:5')
+    parser.add_argument('--dealer', nargs='*', choices=['S17', 'H17'], default=['S17', 'H17'])
+    parser.add_argument('--das', nargs='*', choices=['yes', 'no'], default=['yes', 'no'],
+                        help='whether doubling after a split is allowed')
+    parser.add_argument('--decks', type=int, nargs='*', default=DEFAULT_DECKS)
+    parser.add_argument('--bet', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', help='also write the results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    cells = grid(args.payouts, [dealer == 'H17' for dealer in args.dealer], [das == 'yes' for das in args.das],
+                 args.decks)
+    start = time.perf_counter()
+    results = sweep(cells, args.rounds, args.seed, args.bet, args.workers)
+    print(format_table(results))
+    print(f'{len(cells)} cells x {args.rounds} rounds in {time.perf_counter() - start:.1f}s')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
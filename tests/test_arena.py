@@ -0,0 +1,63 @@
+import numpy as np
+
+import arena
+from blackjack_logic import create_player
+from cards import Hand, make_card
+from counting import CountTracker
+from rules import DEFAULT_RULES
+from shoe import Shoe
+
+
+def card(value):
+    return make_card(value, 'Clubs')
+
+
+def rigged_table(cards, bots, rules=DEFAULT_RULES):
+    """A table like play_tables builds, whose shoe deals ``cards`` first (dealer, then two per seat)."""
+    return {
+        'shoe': Shoe(cards=[card(value) for value in cards] + [card('2')] * 40),
+        'rules': rules,
+        'count': CountTracker(1),
+        'players': [create_player(seat + 1, bot.name, 1000) for seat, bot in enumerate(bots)],
+        'dealerHand': Hand(),
+        'dealerTotal': 0,
+    }
+
+
+def test_a_round_settles_each_seat():
+    bots = [arena.Strategy(10), arena.Strategy(10), arena.MimicDealer(10)]
+    table = rigged_table(['10', '7', 'Ace', 'King', '10', '9', '10', '6', '5'], bots)
+    # Natural, a standing 19 and a 16 that hits to 21, all against the dealer's 17
+    assert arena.play_round(table, bots) == [15, 10, 10]
+    assert [player['balance'] for player in table['players']] == [1015, 1010, 1010]
+
+
+def test_naturals_pay_at_the_tables_rate():
+    bots = [arena.Strategy(10)]
+    table = rigged_table(['10', '7', 'Ace', 'King'], bots, DEFAULT_RULES._replace(blackjack_payout=(6, 5)))
+    assert arena.play_round(table, bots) == [12]
+
+
+def test_broke_seats_sit_out():
+    bots = [arena.Strategy(10), arena.Strategy(10)]
+    table = rigged_table(['10', '7', '10', '8', '10', '9'], bots)
+    table['players'][0]['balance'] = 0
+    assert arena.play_round(table, bots) == [None, 10]
+
+
+def test_martingale_doubles_after_a_loss():
+    bot = arena.Martingale(10)
+    bot.settled(None, None, -10)
+    bot.settled(None, None, -20)
+    assert bot.bet(None, None) == 40
+    bot.settled(None, None, 40)
+    assert bot.bet(None, None) == 10
+
+
+def test_seeded_tournaments_repeat_across_worker_counts():
+    strategies = ['basic', 'martingale', 'hi-lo']
+    report, samples = arena.run(4, 60, strategies, seed=5, points=6)
+    again, parallel = arena.run(4, 60, strategies, seed=5, points=6, workers=2)
+    assert np.array_equal(samples, parallel)
+    assert report['leaderboard'] == again['leaderboard']
+    assert report['seatRounds'] == 4 * 60 * len(strategies)
@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import pytest
+
+import app
+import asgi
+from service import MAX_BATCH_ACTIONS, MAX_BATCH_TABLES, NOT_AN_OBJECT, GameService
+from sessions import MemorySessionStore
+
+NOT_OBJECTS = ['[]', '1', 'null', '"start"']
+
+
+def round_actions(bet=10):
+    return [{'action': 'bet', 'playerId': 1, 'bet': bet}, {'action': 'stand', 'playerId': 1},
+            {'action': 'next-round'}]
+
+
+@pytest.fixture
+def service():
+    return GameService(sessions=MemorySessionStore(), rng_mode='random', rng_seed=1)
+
+
+def post_asgi(path, body):
+    """(status, decoded JSON body) of a POST to the ASGI app."""
+    messages = [{'type': 'http.request', 'body': body.encode(), 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'POST', 'path': path, 'query_string': b'', 'headers': []}
+    asyncio.run(asgi.app(scope, receive, send))
+    return sent[0]['status'], json.loads(sent[1]['body'])
+
+
+def test_a_batch_plays_rounds_on_the_callers_table(service):
+    start = {'action': 'start', 'playerNames': ['A'], 'balance': 100}
+    response = service.batch('t', {'actions': [start] + round_actions() * 3})
+    assert response['success'] and all(result['success'] for result in response['results'])
+    assert response['gameState']['gamePhase'] == 'betting'
+
+
+def test_failed_actions_are_reported_and_can_stop_the_batch(service):
+    actions = [{'action': 'bet', 'playerId': 1, 'bet': 10}, {'action': 'fold'}, {'action': 'hit'}]
+    results = service.batch('t', {'actions': actions})['results']
+    assert [result['message'] for result in results] == ['Game not started', 'Unknown action: fold',
+                                                        'Game not started']
+    assert len(service.batch('t', {'actions': actions, 'stopOnError': True})['results']) == 1
+
+
+def test_side_tables_are_stored_under_the_callers_table(service):
+    start = {'action': 'start', 'playerNames': ['A'], 'balance': 100}
+    response = service.batch('t', {'tables': {'one': [start], 'two': [start] + round_actions()}})
+    assert set(response['tables']) == {'one', 'two'}
+    assert all(result['success'] for result in response['tables']['two']['results'])
+    assert service.sessions.get('t/one') is not None and service.sessions.get('t') is None
+
+
+@pytest.mark.parametrize('name', ['', 'a/b', '../x', 'x' * 65, 'a b'])
+def test_side_table_names_follow_the_table_id_rules(service, name):
+    response = service.batch('t', {'tables': {name: []}})
+    assert not response['success']
+    assert len(service.sessions) == 0
+
+
+def test_batches_are_limited(service):
+    too_many = [{'action': 'state'}] * (MAX_BATCH_ACTIONS + 1)
+    assert not service.batch('t', {'actions': too_many})['success']
+    tables = {f't{i}': [] for i in range(MAX_BATCH_TABLES + 1)}
+    assert not service.batch('t', {'tables': tables})['success']
+
+
+@pytest.mark.parametrize('data', [None, [], 1, 'start'])
+def test_the_service_rejects_bodies_that_are_not_objects(service, data):
+    assert service.batch('t', data) == NOT_AN_OBJECT
+    assert service.start('t', data) == NOT_AN_OBJECT
+    assert service.perform('bet', 't', data) == NOT_AN_OBJECT
+    assert service.batch('t', {'actions': {'not': 'a list'}})['message'].startswith('Expected')
+
+
+@pytest.mark.parametrize('body', NOT_OBJECTS)
+@pytest.mark.parametrize('route', ['/api/batch', '/api/start', '/api/bet'])
+def test_flask_answers_bodies_that_are_not_objects(route, body):
+    response = app.app.test_client().post(route, data=body, content_type='application/json')
+    assert response.status_code == 200
+    assert response.get_json() == NOT_AN_OBJECT
+
+
+@pytest.mark.parametrize('body', NOT_OBJECTS)
+@pytest.mark.parametrize('route', ['/api/batch', '/api/start', '/api/bet'])
+def test_asgi_answers_bodies_that_are_not_objects(route, body):
+    assert post_asgi(route, body) == (200, NOT_AN_OBJECT)
@@ -0,0 +1,81 @@
+from blackjack_logic import ACTIONS, start_game
+from cards import make_card
+from shoe import Shoe
+
+
+def card(value):
+    return make_card(value, 'Spades')
+
+
+def rigged_table(cards, seats=1, balance=100):
+    """A table in its betting phase whose shoe deals ``cards`` first.
+
+    Cards are dealt dealer up card, dealer hole card, then two cards to each
+    seat in turn, then draws in the order they are made.
+    """
+    game_state, _ = start_game({'playerNames': [f'P{seat + 1}' for seat in range(seats)], 'balance': balance})
+    # Enough small cards after the rigged ones that the shoe never reshuffles them
+    game_state['shoe'] = Shoe(cards=[card(value) for value in cards] + [card('2')] * 40)
+    return game_state
+
+
+def act(game_state, action, player_id=1, **data):
+    response = ACTIONS[action][0](game_state, dict(data, playerId=player_id))
+    assert response['success'], response
+    return response
+
+
+def test_split_aces_end_the_seats_turn():
+    game_state = rigged_table(['10', '7', 'Ace', 'Ace', '10', '9', '9', '5'], seats=2)
+    act(game_state, 'bet', 1, bet=10)
+    act(game_state, 'bet', 2, bet=10)
+
+    act(game_state, 'split', 1)
+
+    first, second = game_state['players']
+    assert [hand.total for hand in first['hands']] == [20, 16]
+    assert first['handIndex'] == 1
+    assert first['isFinished'] and not first['isActive']
+    assert game_state['currentPlayerIndex'] == 1 and second['isActive']
+    assert first['balance'] - first['bet'] == 80
+
+
+def test_lost_insurance_is_taken_from_the_winnings():
+    game_state = rigged_table(['Ace', '7', '10', 'King'])
+    act(game_state, 'bet', bet=30)
+
+    act(game_state, 'insurance')
+    act(game_state, 'stand')
+
+    player = game_state['players'][0]
+    assert game_state['dealerTotal'] == 18 and not game_state['dealerHand'].is_blackjack
+    assert player['insurance'] == 15
+    assert player['winner'] == 'win'
+    assert player['balance'] == 100 + 30 - 15
+
+
+def test_insurance_pays_two_to_one_against_a_dealer_blackjack():
+    game_state = rigged_table(['Ace', 'King', '10', 'Queen'])
+    act(game_state, 'bet', bet=30)
+
+    act(game_state, 'insurance')
+    act(game_state, 'stand')
+
+    player = game_state['players'][0]
+    assert player['winner'] == 'lose'
+    assert player['balance'] == 100 - 30 + 2 * 15
+
+
+def test_21_on_a_split_hand_is_not_a_blackjack():
+    game_state = rigged_table(['10', '8', 'Ace', 'Ace', 'King', 'Queen'])
+    act(game_state, 'bet', bet=10)
+
+    act(game_state, 'split')
+
+    player = game_state['players'][0]
+    assert [hand.total for hand in player['hands']] == [21, 21]
+    assert not any(hand.is_blackjack for hand in player['hands'])
+    assert game_state['gamePhase'] == 'results'
+    # Each hand wins even money rather than the 3:2 blackjack payout
+    assert [hand.outcome for hand in player['hands']] == ['win', 'win']
+    assert player['balance'] == 100 + 10 + 10
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+from broadcast import MAX_PENDING_EVENTS, Broadcaster, diff_state
+from service import GameService
+from sessions import MemorySessionStore
+
+
+def parse(event):
+    """(id, event name, data) of one SSE event."""
+    fields = dict(line.split(': ', 1) for line in event.strip().split('\n'))
+    return int(fields['id']), fields['event'], json.loads(fields['data'])
+
+
+def state(phase='betting', message='', balances=(100, 100)):
+    return {'gamePhase': phase, 'message': message,
+            'players': [{'name': f'P{seat}', 'balance': balance} for seat, balance in enumerate(balances)]}
+
+
+def test_diff_state_sends_changed_fields_by_seat():
+    assert diff_state(state(), state('playing', balances=(100, 90))) == {
+        'gamePhase': 'playing', 'players': {'1': {'balance': 90}}}
+    assert diff_state(state(), state(balances=(100,)))['players'] == [{'name': 'P0', 'balance': 100}]
+    assert diff_state(state(), state()) == {}
+
+
+def test_subscribers_get_a_snapshot_then_deltas():
+    broadcaster = Broadcaster()
+    subscriber, snapshot = broadcaster.subscribe('t', state())
+    assert parse(snapshot) == (0, 'snapshot', state())
+
+    broadcaster.publish('t', state('playing'))
+    broadcaster.publish('t', state('playing'))  # unchanged: nothing is sent
+    broadcaster.publish('t', state('playing', 'go'))
+    assert parse(subscriber.get_nowait()) == (1, 'delta', {'gamePhase': 'playing'})
+    assert parse(subscriber.get_nowait()) == (2, 'delta', {'message': 'go'})
+    assert subscriber.empty()
+
+
+def test_a_late_subscriber_does_not_change_what_others_are_sent():
+    broadcaster = Broadcaster()
+    first, _ = broadcaster.subscribe('t', state())
+    # Joins from a state the first subscriber has not been sent
+    second, _ = broadcaster.subscribe('t', state('playing'))
+
+    broadcaster.publish('t', state('playing', 'go'))
+    assert parse(first.get_nowait())[2] == {'gamePhase': 'playing', 'message': 'go'}
+    assert parse(second.get_nowait())[2] == {'message': 'go'}
+
+    broadcaster.publish('t', state('results', 'go'))
+    assert parse(first.get_nowait()) == parse(second.get_nowait()) == (2, 'delta', {'gamePhase': 'results'})
+
+
+def test_a_stalled_subscriber_is_dropped():
+    broadcaster = Broadcaster()
+    subscriber, _ = broadcaster.subscribe('t', state())
+    for i in range(MAX_PENDING_EVENTS + 1):
+        broadcaster.publish('t', state(message=str(i)))
+    assert subscriber.get_nowait() is None
+    assert not broadcaster.has_subscribers('t')
+    broadcaster.unsubscribe('t', subscriber)
+
+
+def test_async_subscribers_receive_events_published_from_other_threads():
+    async def main():
+        broadcaster = Broadcaster()
+        subscriber, _ = broadcaster.subscribe('t', state(), asyncio.get_running_loop())
+        await asyncio.to_thread(broadcaster.publish, 't', state('playing'))
+        event = await subscriber.get(1)
+        subscriber.close()
+        return event, await subscriber.get(1)
+
+    event, end = asyncio.run(main())
+    assert parse(event)[2] == {'gamePhase': 'playing'}
+    assert end is None
+
+
+def test_service_streams_a_table_as_it_changes():
+    service = GameService(sessions=MemorySessionStore(), rng_mode='random', rng_seed=1)
+    assert service.stream('t') is None
+    service.start('t', {'playerNames': ['A'], 'balance': 100})
+
+    stream = service.stream('t')
+    _, name, snapshot = parse(next(stream))
+    assert name == 'snapshot' and snapshot['gamePhase'] == 'betting'
+    service.perform('bet', 't', {'playerId': 1, 'bet': 10})
+    _, name, delta = parse(next(stream))
+    assert name == 'delta' and delta['players']['0']['bet'] == 10
+    stream.close()
+    assert not service.broadcaster.has_subscribers('t')
@@ -0,0 +1,49 @@
+from cards import make_card
+from counting import MIN_FLAG_BETS, SYSTEM_NAMES, CountTracker
+
+
+def card(value):
+    return make_card(value, 'Hearts')
+
+
+def test_running_counts_follow_each_system():
+    tracker = CountTracker(1)
+    for value in ('2', '5', '7', '9', 'King', 'Ace'):
+        tracker.observe(card(value))
+
+    systems = tracker.to_dict()['systems']
+    assert {name: systems[name]['running'] for name in SYSTEM_NAMES} == {'hi-lo': 0, 'ko': 1, 'omega-ii': 1}
+    assert tracker.seen == 6
+
+
+def test_true_count_divides_by_the_decks_left():
+    tracker = CountTracker(2)
+    for _ in range(26):
+        tracker.observe(card('3'))
+
+    hi_lo, ko, _ = tracker.betting_counts()
+    assert hi_lo == 26 / 1.5
+    assert ko == 4 - 8 + 26
+
+
+def test_reset_starts_a_new_shoe():
+    tracker = CountTracker(6)
+    tracker.observe(card('4'))
+    tracker.reset()
+    assert tracker.seen == 0
+    assert tracker.running == [0, 4 - 24, 0]
+
+
+def test_a_bet_ramp_is_flagged_and_flat_betting_is_not():
+    tracker = CountTracker(6)
+    flagged = False
+    for i in range(2 * MIN_FLAG_BETS):
+        tracker.reset()
+        high = i % 2 == 0
+        for _ in range(40):
+            tracker.observe(card('5' if high else 'King'))
+        flagged |= tracker.observe_bet(0, 100 if high else 10)
+        flagged_flat = tracker.observe_bet(1, 10)
+        assert not flagged_flat
+    assert flagged and tracker.flagged == {0}
+    assert tracker.correlations(1) == [0.0] * len(SYSTEM_NAMES)
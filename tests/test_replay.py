@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from blackjack_logic import set_hand_history
+from history import HandHistoryWriter, pack_rules, read_history, unpack_rules
+from replay import replay
+from rules import DEFAULT_RULES, Rules
+from service import GameService
+from sessions import MemorySessionStore
+
+TABLE_RULES = {
+    'six-five': {'blackjackPayout': '6:5'},
+    'h17': {'dealerHitsSoft17': True},
+    'no-das': {'doubleAfterSplit': False},
+}
+
+
+@pytest.fixture
+def history_dir(tmp_path):
+    """A hand history of rounds played at tables with non-default rules."""
+    history = HandHistoryWriter(str(tmp_path))
+    service = GameService(sessions=MemorySessionStore(), history=history, rng_mode='random', rng_seed=7)
+    choices = random.Random(1)
+    try:
+        for table, rules in TABLE_RULES.items():
+            service.start(table, {'playerNames': ['A', 'B'], 'balance': 10_000, 'decks': 6, 'rules': rules})
+            for _ in range(60):
+                for player_id in (1, 2):
+                    service.perform('bet', table, {'playerId': player_id, 'bet': 10})
+                while (game_state := service.sessions.get(table))['gamePhase'] == 'playing':
+                    player = game_state['players'][game_state['currentPlayerIndex']]
+                    actions = ['hit', 'stand'] + ['double'] * player['canDoubleDown'] + ['split'] * player['canSplit']
+                    action = choices.choice(actions) if player['total'] < 19 else 'stand'
+                    service.perform(action, table, {'playerId': player['id']})
+                service.perform('next-round', table, {})
+    finally:
+        history.close()
+        set_hand_history(None)
+    return str(tmp_path)
+
+
+def test_rules_record_round_trips():
+    rules = Rules(blackjack_payout=(6, 5), dealer_hits_soft_17=True, double_after_split=False)
+    assert unpack_rules(*pack_rules(rules, 8)) == (rules, 8)
+    assert unpack_rules(*pack_rules(DEFAULT_RULES, 1)) == (DEFAULT_RULES, 1)
+
+
+def test_tables_replay_under_their_recorded_rules(history_dir):
+    report = replay(read_history(history_dir))
+    assert report['rounds'] == 60 * len(TABLE_RULES)
+    assert report['skipped'] == 0
+    assert report['mismatches'] == []
+
+
+def test_rule_changes_apply_over_the_recorded_rules(history_dir):
+    defaults = {'blackjackPayout': '3:2', 'dealerHitsSoft17': False, 'doubleAfterSplit': True}
+    assert replay(read_history(history_dir), changes=defaults)['mismatched'] > 0
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from router import HashRing, parse_head
+
+TABLE_IDS = [f'table-{i}' for i in range(4000)]
+
+
+def test_tables_spread_over_every_worker():
+    ring = HashRing(4)
+    owners = Counter(ring.owner(table_id) for table_id in TABLE_IDS)
+    assert set(owners) == {0, 1, 2, 3}
+    assert max(owners.values()) < 1.5 * len(TABLE_IDS) / 4
+
+
+def test_every_process_builds_the_same_ring():
+    ring = HashRing(4)
+    code = f'from router import HashRing; print([HashRing(4).owner(t) for t in {TABLE_IDS[:200]!r}])'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            env=dict(os.environ, PYTHONHASHSEED='12345')).stdout
+    assert output.strip() == str([ring.owner(table_id) for table_id in TABLE_IDS[:200]])
+
+
+def test_adding_a_worker_only_moves_tables_to_it():
+    before, after = HashRing(4), HashRing(5)
+    moved = [table_id for table_id in TABLE_IDS if before.owner(table_id) != after.owner(table_id)]
+    assert all(after.owner(table_id) == 4 for table_id in moved)
+    assert len(moved) < 0.3 * len(TABLE_IDS)
+
+
+def test_parse_head_drops_hop_by_hop_headers():
+    head = (b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: keep-alive\r\n'
+            b'Content-Length: 12\r\n\r\n')
+    status, headers, length, chunked = parse_head(head)
+    assert (status, length, chunked) == (200, 12, False)
+    assert headers == [(b'content-type', b'application/json'), (b'content-length', b'12')]
+    assert parse_head(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n')[3]
@@ -0,0 +1,56 @@
+import pytest
+
+from blackjack_logic import ACTIONS, start_game
+from cards import Hand, make_card
+from rules import DEFAULT_RULES, blackjack_win, dealer_hits, parse_payout, rules_from_dict, rules_to_dict
+from shoe import Shoe
+
+
+def card(value):
+    return make_card(value, 'Spades')
+
+
+def test_payouts_parse_from_text_or_pairs():
+    assert parse_payout('6:5') == parse_payout([6, 5]) == (6, 5)
+    for bad in ('3', '3:2:1', 'a:b', '0:1', '1:1001', None):
+        with pytest.raises(ValueError):
+            parse_payout(bad)
+
+
+def test_rules_round_trip_through_json():
+    rules = rules_from_dict({'blackjackPayout': '6:5', 'dealerHitsSoft17': True})
+    assert rules == DEFAULT_RULES._replace(blackjack_payout=(6, 5), dealer_hits_soft_17=True)
+    assert rules_from_dict(rules_to_dict(rules)) == rules
+    for bad in ([], {'surrender': True}, {'doubleAfterSplit': 'no'}):
+        with pytest.raises(ValueError):
+            rules_from_dict(bad)
+
+
+def test_blackjack_winnings_round_down():
+    assert blackjack_win(25, DEFAULT_RULES) == 37
+    assert blackjack_win(10, DEFAULT_RULES._replace(blackjack_payout=(6, 5))) == 12
+
+
+def test_only_h17_dealers_hit_soft_17():
+    soft_17, hard_17 = Hand([card('Ace'), card('6')]), Hand([card('10'), card('7')])
+    h17 = DEFAULT_RULES._replace(dealer_hits_soft_17=True)
+    assert not dealer_hits(soft_17, DEFAULT_RULES)
+    assert dealer_hits(soft_17, h17)
+    assert not dealer_hits(hard_17, h17)
+
+
+def test_a_table_pays_naturals_at_its_own_rate():
+    game_state, response = start_game({'playerNames': ['P1'], 'balance': 100,
+                                       'rules': {'blackjackPayout': '6:5'}})
+    assert response['success']
+    game_state['shoe'] = Shoe(cards=[card(value) for value in ('9', '7', 'Ace', 'King')] + [card('2')] * 40)
+
+    assert ACTIONS['bet'][0](game_state, {'playerId': 1, 'bet': 10})['success']
+    assert game_state['players'][0]['winner'] == 'win'
+    assert game_state['players'][0]['balance'] == 100 + 12
+
+
+def test_bad_rules_are_rejected_at_start():
+    game_state, response = start_game({'playerNames': ['P1'], 'balance': 100,
+                                       'rules': {'blackjackPayout': '0:2'}})
+    assert game_state is None and not response['success']
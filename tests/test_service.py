@@ -0,0 +1,53 @@
+import sqlite3
+
+import pytest
+
+import app
+from service import GameService
+from sessions import SQLiteSessionStore
+
+
+@pytest.fixture
+def sqlite_service(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    service = GameService(sessions=store, rng_mode='random', rng_seed=1)
+    service.start('t', {'playerNames': ['A'], 'balance': 100})
+    return service
+
+
+def test_snapshots_change_with_the_table(sqlite_service):
+    etag, body = sqlite_service.snapshot('t')
+    assert sqlite_service.snapshot('t') == (etag, body)
+    sqlite_service.perform('bet', 't', {'playerId': 1, 'bet': 10})
+    assert sqlite_service.snapshot('t')[0] != etag
+    assert sqlite_service.snapshot('missing') is None
+
+
+def test_snapshots_are_not_stored_with_the_table(sqlite_service):
+    sqlite_service.snapshot('t')
+    assert 'snapshot' not in sqlite_service.sessions.get('t')
+
+
+def test_polls_do_not_wait_for_the_write_lock(sqlite_service):
+    writer = sqlite3.connect(sqlite_service.sessions.path, timeout=0, isolation_level=None)
+    writer.execute('BEGIN IMMEDIATE')
+    try:
+        sqlite_service.sessions._connection().execute('PRAGMA busy_timeout = 0')
+        assert sqlite_service.snapshot('t') is not None
+    finally:
+        writer.execute('ROLLBACK')
+
+
+def test_state_answers_a_matching_etag_with_304():
+    client = app.app.test_client()
+    table_id = client.post('/api/start', json={'playerNames': ['A'], 'balance': 100}).get_json()['tableId']
+    headers = {'X-Table-Id': table_id}
+
+    first = client.get('/api/state', headers=headers)
+    assert first.status_code == 200 and first.get_json()['gameState']['gamePhase'] == 'betting'
+    again = client.get('/api/state', headers=dict(headers, **{'If-None-Match': first.headers['ETag']}))
+    assert again.status_code == 304
+
+    client.post('/api/bet', headers=headers, json={'playerId': 1, 'bet': 10})
+    changed = client.get('/api/state', headers=dict(headers, **{'If-None-Match': first.headers['ETag']}))
+    assert changed.status_code == 200 and changed.headers['ETag'] != first.headers['ETag']
@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+
+import sessions
+from sessions import MemorySessionStore, SessionStore, SQLiteSessionStore, checked_table_id
+
+
+class Clock:
+    """Stands in for time.time and time.monotonic."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions.time, 'time', clock)
+    monkeypatch.setattr(sessions.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path, monkeypatch):
+    """Builds a store of each kind; SQLite stores built by one test share a file."""
+    monkeypatch.setattr(sessions, 'SQLITE_EVICT_EVERY', 1)
+
+    def make(capacity=10, ttl=100):
+        if request.param == 'memory':
+            return MemorySessionStore(capacity, ttl)
+        return SQLiteSessionStore(str(tmp_path / 'sessions.db'), capacity, ttl)
+    return make
+
+
+def test_the_interface_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_set_get_delete(make_store):
+    store = make_store()
+    assert store.get('a') is None
+    store.set('a', {'round': 1})
+    assert store.get('a') == {'round': 1}
+    assert 'a' in store and len(store) == 1
+    store.delete('a')
+    assert store.get('a') is None
+    assert store.stats()['hits'] == 2 and store.stats()['misses'] == 2
+
+
+def test_idle_sessions_expire(make_store, clock):
+    store = make_store(ttl=100)
+    store.set('a', {})
+    clock.now += 101
+    assert store.get('a') is None
+    assert store.stats()['evictions'] == 1
+
+
+def test_reads_keep_a_polled_session_alive(make_store, clock):
+    store = make_store(ttl=100)
+    store.set('a', {})
+    for _ in range(5):
+        clock.now += 60
+        assert store.get('a') is not None
+
+
+def test_capacity_evicts_the_least_recently_used(make_store, clock):
+    store = make_store(capacity=2)
+    store.set('a', {})
+    clock.now += 20
+    store.set('b', {})
+    clock.now += 20
+    store.get('a')
+    clock.now += 20
+    store.set('c', {})
+    assert store.get('b') is None
+    assert store.get('a') is not None and store.get('c') is not None
+
+
+def test_sqlite_stores_share_sessions(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    SQLiteSessionStore(path).set('a', {'round': 3})
+    assert SQLiteSessionStore(path).get('a') == {'round': 3}
+
+
+def test_sqlite_transactions_roll_back_on_error(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    store.set('a', {'round': 1})
+    with pytest.raises(RuntimeError):
+        with store.transaction('a'):
+            store.set('a', {'round': 2})
+            raise RuntimeError
+    assert store.get('a') == {'round': 1}
+
+
+def test_sqlite_transactions_do_not_lose_updates(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    SQLiteSessionStore(path).set('a', {'n': 0})
+
+    def add(count):
+        # Each thread uses its own store, as separate worker processes would
+        store = SQLiteSessionStore(path)
+        for _ in range(count):
+            with store.transaction('a'):
+                state = store.get('a')
+                state['n'] += 1
+                store.set('a', state)
+
+    threads = [threading.Thread(target=add, args=(50,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert SQLiteSessionStore(path).get('a') == {'n': 200}
+
+
+def test_checked_table_id():
+    assert checked_table_id('table-1_A') == 'table-1_A'
+    assert checked_table_id('a' * 65) is None
+    assert checked_table_id('a/b') is None
+    assert checked_table_id(None) is None
@@ -0,0 +1,17 @@
+import numpy as np
+
+from simulator import create_shoes, verify_against_scalar
+
+
+def test_vectorized_rounds_match_scalar_rules():
+    assert verify_against_scalar(rounds=2000, seed=1) == []
+
+
+def test_vectorized_rounds_match_scalar_rules_on_a_multi_deck_shoe():
+    assert verify_against_scalar(rounds=500, decks=6, double_on=(9, 10, 11), seed=2) == []
+
+
+def test_seeded_shoes_repeat():
+    first = create_shoes(50, 1, np.random.default_rng(3))
+    second = create_shoes(50, 1, np.random.default_rng(3))
+    assert np.array_equal(first, second)